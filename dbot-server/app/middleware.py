@@ -10,6 +10,7 @@ from eth_utils import is_address, to_checksum_address
 from werkzeug.datastructures import EnvironHeaders
 
 from utils import remove_slash_prefix
+from microraiden import HTTPHeaders
 from .errors import InvalidUsage
 import dbot
 
@@ -52,6 +53,12 @@ def _make_response(environ, start_response, data, code, headers={}):
     response = Response(response=data, status=code, headers=headers)
     return response(environ, start_response)
 
+def _with_headers(start_response, headers):
+    def _start_response(status, response_headers, exc_info=None):
+        response_headers = list(response_headers) + [(k, str(v)) for k, v in headers.items()]
+        return start_response(status, response_headers, exc_info)
+    return _start_response
+
 class DbotMiddleware():
     def __init__(self, wsgi_app):
         self.app = wsgi_app
@@ -92,6 +99,13 @@ class DbotMiddleware():
                 ret, code, headers = dbot_service.paywall.access(price, EnvironHeaders(environ))
                 if code != 200:
                     return _make_response(environ, start_response, ret, code, headers)
+                # the session of a paid call is returned with the response of the API
+                session_headers = {
+                    k: v for k, v in headers.items()
+                    if k in (HTTPHeaders.SESSION_TICKET, HTTPHeaders.CREDIT)
+                }
+                if session_headers:
+                    start_response = _with_headers(start_response, session_headers)
 
             logger.info("Balance Proof check is ok.")
             middleware_cls = dbot_service.middleware
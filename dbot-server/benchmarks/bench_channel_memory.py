@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark the memory used by the in-memory channel set.
+
+Compares the previous `__dict__` based channel, which created a topup map for every
+channel, with the `__slots__` based `Channel`. Both are built from the same rows, which
+are freed afterwards, so the strings a channel keeps from its row are counted.
+
+    python -m benchmarks.bench_channel_memory --channels 100000
+"""
+import sys
+import time
+import tracemalloc
+import click
+from eth_utils import to_checksum_address
+
+from microraiden.channel_manager.channel import Channel, ChannelState
+
+RECEIVER = to_checksum_address('0x' + '11' * 20)
+
+
+class LegacyChannel(object):
+    """Channel as it was stored before, one instance `__dict__` per channel."""
+
+    def __init__(self, receiver, sender, deposit, open_block_number):
+        self.receiver = receiver
+        self.sender = sender
+        self.deposit = deposit
+        self.open_block_number = open_block_number
+        self.balance = 0
+        self.state = ChannelState.UNDEFINED
+        self.last_signature = None
+        self.settle_timeout = -1
+        self.ctime = time.time()
+        self.mtime = self.ctime
+        self.confirmed = False
+        self.unconfirmed_topups = {}
+
+
+def make_rows(n_channels, n_senders):
+    """Rows as returned by sqlite: fresh string objects for every column."""
+    rows = []
+    for i in range(n_channels):
+        rows.append({
+            'sender': to_checksum_address('0x{:040x}'.format(i % n_senders + 1)),
+            'open_block_number': i + 1,
+            'deposit': str(10 ** 18),
+            'balance': str(i * 10 ** 9),
+            'last_signature': '0x{:0130x}'.format(i),
+            'mtime': time.time(),
+            'ctime': time.time(),
+        })
+    return rows
+
+
+def build(cls, rows, intern):
+    channels = {}
+    for row in rows:
+        sender = sys.intern(row['sender']) if intern else row['sender']
+        c = cls(RECEIVER, sender, int(row['deposit']), row['open_block_number'])
+        c.balance = int(row['balance'])
+        c.state = ChannelState.OPEN
+        c.last_signature = row['last_signature']
+        c.mtime = row['mtime']
+        c.ctime = row['ctime']
+        c.confirmed = True
+        channels[sender, c.open_block_number] = c
+    return channels
+
+
+def measure(cls, n_channels, n_senders, intern):
+    """Returns the bytes kept by the channel set once the rows it was built from are freed."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    rows = make_rows(n_channels, n_senders)
+    channels = build(cls, rows, intern)
+    del rows
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(channels) == n_channels
+    return after - before
+
+
+@click.command()
+@click.option('--channels', default=100000, help='number of channels to build')
+@click.option('--senders', default=10000, help='number of distinct senders')
+def main(channels, senders):
+    for name, cls, intern in (('legacy', LegacyChannel, False), ('slots', Channel, True)):
+        size = measure(cls, channels, senders, intern)
+        click.echo('{:8} {:>8d} channels  {:>8.1f} MiB  {:>6d} bytes/channel'.format(
+            name, channels, size / 2 ** 20, size // channels))
+
+
+if __name__ == '__main__':
+    main()
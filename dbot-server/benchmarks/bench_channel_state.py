@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark loading the channel table of a ChannelManagerState.
+
+Compares the previous per-row materialization (one `metadata` and one `topups` query for
+every channel) with the bulk loading path used by `ChannelManagerState.load`.
+
+    python -m benchmarks.bench_channel_state --channels 50000
+"""
+import os
+import time
+import tempfile
+import click
+from eth_utils import to_checksum_address
+
+from microraiden.channel_manager.state import ChannelManagerState
+from microraiden.channel_manager.channel import Channel, ChannelState
+
+RECEIVER = to_checksum_address('0x' + '11' * 20)
+CONTRACT = to_checksum_address('0x' + '12' * 20)
+
+
+def make_state(filename, n_channels, topup_every):
+    state = ChannelManagerState(filename)
+    state.setup_db(1, CONTRACT, RECEIVER)
+    for i in range(n_channels):
+        sender = to_checksum_address('0x{:040x}'.format(i + 1))
+        c = Channel(RECEIVER, sender, 10 ** 18, i + 1)
+        c.state = ChannelState.OPEN
+        c.confirmed = True
+        c.balance = i
+        if topup_every and i % topup_every == 0:
+            c.unconfirmed_topups['0x{:064x}'.format(i)] = 10 ** 17
+        params = [c.sender, c.open_block_number, str(c.deposit), str(c.balance),
+                  c.last_signature, c.settle_timeout, c.mtime, c.ctime,
+                  c.state.value, c.confirmed]
+        state.conn.execute('INSERT INTO `channels` VALUES (?,?,?,?,?,?,?,?,?,?)', params)
+        rowid = state.get_channel_rowid(c.sender, c.open_block_number)
+        state.set_unconfirmed_topups(rowid, c.unconfirmed_topups)
+    state.conn.commit()
+    state.conn.close()
+
+
+def legacy_get_channels(state):
+    """Per-row materialization as done before the bulk loading path."""
+    ret = dict()
+    c = state.conn.cursor()
+    c.execute('SELECT rowid, * FROM `channels` WHERE `confirmed` = ?', [True])
+    for result in c.fetchall():
+        receiver = state.conn.execute('SELECT `receiver` FROM `metadata`;').fetchone()['receiver']
+        channel = Channel(receiver, result['sender'], int(result['deposit']),
+                          result['open_block_number'])
+        channel.balance = int(result['balance'])
+        channel.state = ChannelState(result['state'])
+        channel.last_signature = result['last_signature']
+        channel.settle_timeout = result['settle_timeout']
+        channel.mtime = result['mtime']
+        channel.ctime = result['ctime']
+        channel.unconfirmed_topups = state.get_unconfirmed_topups(result['rowid'])
+        channel.confirmed = result['confirmed']
+        ret[result['sender'], result['open_block_number']] = channel
+    return ret
+
+
+def measure(fn):
+    statements = []
+    start = time.perf_counter()
+    result = fn(statements.append)
+    return time.perf_counter() - start, len(statements), result
+
+
+@click.command()
+@click.option('--channels', default=50000, help='number of channels in the state file')
+@click.option('--topup-every', default=10, help='give every n-th channel an unconfirmed topup')
+def main(channels, topup_every):
+    filename = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    make_state(filename, channels, topup_every)
+
+    def legacy(trace):
+        state = ChannelManagerState(filename)
+        state.conn.set_trace_callback(trace)
+        return legacy_get_channels(state)
+
+    def bulk(trace):
+        state = ChannelManagerState(filename)
+        state.conn.set_trace_callback(trace)
+        state._load_metadata()
+        state._load_channels()
+        return state.channels
+
+    for name, fn in (('per-row', legacy), ('bulk', bulk)):
+        elapsed, n_statements, result = measure(fn)
+        assert len(result) == channels
+        click.echo('{:8} {:>8d} channels  {:>8d} statements  {:8.3f}s'.format(
+            name, len(result), n_statements, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Micro-benchmarks of the balance proof functions of `microraiden.utils.crypto`.
+
+Times every step of verifying a balance proof, the message hash with
+`get_balance_message` and with a `BalanceProofVerifier`, the signer recovery, and the
+complete verification, for distinct balances.
+
+    python -m benchmarks.bench_crypto --proofs 20000
+"""
+import time
+import click
+from eth_utils import to_checksum_address
+
+from microraiden.utils import (
+    pack,
+    keccak256,
+    get_balance_message,
+    sign_balance_proof,
+    verify_balance_proof,
+    addr_from_sig,
+    BalanceProofVerifier
+)
+
+PRIVATE_KEY = '0x' + '5a' * 32
+RECEIVER = to_checksum_address('0x' + '11' * 20)
+CONTRACT = to_checksum_address('0x' + '12' * 20)
+OPEN_BLOCK_NUMBER = 100
+
+
+def measure(name, func, args_list):
+    start = time.perf_counter()
+    results = [func(*args) for args in args_list]
+    elapsed = time.perf_counter() - start
+    n = len(args_list)
+    click.echo('{:32} {:>8d} ops  {:>10.0f} ops/s  {:>8.2f} us/op'.format(
+        name, n, n / elapsed, elapsed / n * 1e6))
+    return results
+
+
+@click.command()
+@click.option('--proofs', default=20000, help='number of balance proofs')
+def main(proofs):
+    balances = [10 ** 15 * (i + 1) for i in range(proofs)]
+    signatures = [
+        sign_balance_proof(PRIVATE_KEY, RECEIVER, OPEN_BLOCK_NUMBER, balance, CONTRACT)
+        for balance in balances
+    ]
+    verifier = BalanceProofVerifier(RECEIVER, CONTRACT)
+
+    measure('pack', lambda balance: pack(
+        'Sender balance proof signature', RECEIVER, (balance, 256), CONTRACT
+    ), [(balance,) for balance in balances])
+    measure('keccak256', keccak256, [(balance,) for balance in balances])
+    messages = measure('get_balance_message', lambda balance: get_balance_message(
+        RECEIVER, OPEN_BLOCK_NUMBER, balance, CONTRACT
+    ), [(balance,) for balance in balances])
+    verifier_messages = measure('BalanceProofVerifier message', verifier.get_balance_message,
+                                [(balance,) for balance in balances])
+    assert messages == verifier_messages
+    measure('addr_from_sig', addr_from_sig, list(zip(signatures, messages)))
+    senders = measure('verify_balance_proof', lambda balance, signature: verify_balance_proof(
+        RECEIVER, OPEN_BLOCK_NUMBER, balance, signature, CONTRACT
+    ), list(zip(balances, signatures)))
+    verifier_senders = measure('BalanceProofVerifier verify', verifier.verify_balance_proof,
+                               list(zip(balances, signatures)))
+    assert senders == verifier_senders
+
+
+if __name__ == '__main__':
+    main()
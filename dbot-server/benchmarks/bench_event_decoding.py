@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Benchmark decoding the channel events of a synthetic log corpus.
+
+Compares the previous path, web3's log formatter and `get_event_data` for every log, with
+the precompiled decoders of `get_event_decoders`. Both decode the same raw JSON-RPC logs.
+
+    python -m benchmarks.bench_event_decoding --logs 1000000
+"""
+import time
+import click
+from eth_utils import encode_hex, event_abi_to_log_topic
+from web3 import Web3
+from web3.utils.events import get_event_data
+from web3.middleware.pythonic import log_entry_formatter
+
+from microraiden import constants
+from microraiden.utils import get_event_decoders
+
+CONTRACT = Web3.toChecksumAddress('0x' + '12' * 20)
+ABI = constants.CONTRACT_METADATA[constants.CHANNEL_MANAGER_NAME]['abi']
+EVENT_ABIS = {
+    abi_element['name']: abi_element for abi_element in ABI if abi_element['type'] == 'event'
+}
+# share of the events in a busy channel contract
+EVENT_MIX = (
+    ('ChannelCreated', 4),
+    ('ChannelToppedUp', 2),
+    ('ChannelCloseRequested', 2),
+    ('ChannelSettled', 2),
+    ('ChannelWithdraw', 1)
+)
+
+
+def word(value: int):
+    return '{:064x}'.format(value)
+
+
+def make_logs(n_logs, n_senders, n_receivers):
+    """Raw logs as returned by `eth_getLogs`."""
+    events = [name for name, share in EVENT_MIX for _ in range(share)]
+    topics = {name: encode_hex(event_abi_to_log_topic(abi)) for name, abi in EVENT_ABIS.items()}
+    logs = []
+    for i in range(n_logs):
+        name = events[i % len(events)]
+        event_topics = [
+            topics[name],
+            '0x' + word(0x1000 + i % n_senders),
+            '0x' + word(0x2000 + i % n_receivers)
+        ]
+        if name != 'ChannelCreated':
+            event_topics.append('0x' + word(i // 10 + 1))
+        n_data = len([arg for arg in EVENT_ABIS[name]['inputs'] if not arg['indexed']])
+        logs.append({
+            'address': CONTRACT,
+            'blockNumber': hex(i // 10 + 1),
+            'blockHash': '0x' + word(i // 10 + 1),
+            'transactionHash': '0x' + word(i),
+            'transactionIndex': '0x0',
+            'logIndex': hex(i % 10),
+            'removed': False,
+            'topics': event_topics,
+            'data': '0x' + ''.join(word(10 ** 18 + i + j) for j in range(n_data))
+        })
+    return logs
+
+
+def decode_legacy(logs):
+    event_abis = {event_abi_to_log_topic(abi): abi for abi in ABI if abi['type'] == 'event'}
+    decoded = []
+    for log in logs:
+        log = log_entry_formatter(log)
+        event_abi = event_abis[bytes(log['topics'][0])]
+        log = dict(log)
+        log['args'] = get_event_data(event_abi, log)['args']
+        log['event'] = event_abi['name']
+        decoded.append(log)
+    return decoded
+
+
+def decode_compiled(logs):
+    decoders = get_event_decoders(Web3().eth.contract(abi=ABI, address=CONTRACT))
+    return [decoders.decode(log) for log in logs]
+
+
+@click.command()
+@click.option('--logs', default=1000000, help='number of logs to decode')
+@click.option('--senders', default=10000, help='number of distinct senders')
+@click.option('--receivers', default=100, help='number of distinct receivers')
+def main(logs, senders, receivers):
+    corpus = make_logs(logs, senders, receivers)
+    results = {}
+    for name, decode in (('legacy', decode_legacy), ('compiled', decode_compiled)):
+        start = time.perf_counter()
+        results[name] = decode(corpus)
+        elapsed = time.perf_counter() - start
+        click.echo('{:8} {:>8d} logs  {:>8.2f} s  {:>8.0f} logs/s  {:>6.1f} us/log'.format(
+            name, logs, elapsed, logs / elapsed, elapsed / logs * 1e6))
+    assert all(
+        dict(legacy['args']) == compiled['args']
+        for legacy, compiled in zip(results['legacy'], results['compiled'])
+    )
+
+
+if __name__ == '__main__':
+    main()
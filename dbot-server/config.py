@@ -16,6 +16,44 @@ class Config(object):
     TEMPLATE_FOLDER = os.path.join(PROJECT_ROOT, 'templates')
     DB_ROOT = os.path.join(PROJECT_ROOT, 'data')
     WEB3_PROVIDER_DEFAULT = "http://0.0.0.0:4545"
+    # keep-alive connections to the node shared by all dbots, and seconds to wait for a
+    # response; WEB3_METHOD_TIMEOUTS overrides the timeout of single methods,
+    # e.g. {'eth_getLogs': 120}
+    WEB3_POOL_SIZE = 16
+    WEB3_TIMEOUT = 10
+    WEB3_METHOD_TIMEOUTS = {}
+    # 'strict': commit every payment before it is accepted
+    # 'group': WAL journal, commit payments together every CHANNEL_STATE_COMMIT_INTERVAL
+    #          seconds, a crash can lose the payments of the last interval
+    # 'journal': append every payment to the payment journal, fold the journal into the
+    #            channels table every CHANNEL_STATE_COMPACT_INTERVAL seconds
+    CHANNEL_STATE_WRITE_MODE = 'strict'
+    CHANNEL_STATE_COMMIT_INTERVAL = 0.05
+    CHANNEL_STATE_COMPACT_INTERVAL = 10
+    # keep the channel state of all dbots in one database (channels/channels.db) instead
+    # of one database per dbot, existing per-dbot databases are not migrated
+    CHANNEL_STATE_CONSOLIDATED = False
+    # poll the channel contract once for all dbots, a new dbot polls alone until its
+    # initial sync is finished
+    CHAIN_WATCHER_SHARED = True
+    # WebSocket (ws://, wss://) or IPC endpoint of the node to subscribe to new blocks,
+    # events are processed as soon as a block arrives instead of every 2 seconds;
+    # the node is polled while the subscription is down
+    NEW_HEADS_URI = None
+    # threads that recover and sign balance proofs for all dbots, so that a burst of paid
+    # requests doesn't block other requests; 0 computes them in the request greenlet
+    CRYPTO_THREADS = 0
+    # allow a balance proof sent with the RDN-Session header to pay for several calls; the
+    # response has a session ticket (RDN-Session-Ticket) that pays the next call from the
+    # credit, RDN-Credit is the credit left. A ticket is used once, every call returns the
+    # ticket of the next one, and expires after PAYWALL_SESSION_TTL seconds.
+    # A balance proof counted from the consumed balance (RDN-Sender-Balance minus
+    # RDN-Credit) ends the session and returns the unused credit to the sender; a proof
+    # above RDN-Sender-Balance keeps the credit. A registered proof is never accepted again.
+    # Sessions are kept in memory only: when the server stops, the unused credit of open
+    # sessions stays with the receiver, which holds the balance proof that prepaid it
+    PAYWALL_SESSIONS = False
+    PAYWALL_SESSION_TTL = 600
 
 
 class Development(Config):
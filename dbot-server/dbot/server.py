@@ -4,12 +4,15 @@
 import os
 import click
 import logging
-from web3 import Web3, HTTPProvider
+from web3 import Web3
 from web3.middleware import geth_poa_middleware
 from eth_account import Account
 from requests.exceptions import HTTPError
 
 from microraiden.config import NETWORK_CFG
+from microraiden.channel_manager import WriteMode, ChannelStateStore, ChainWatcher, NewHeads
+from microraiden.make_helpers import make_channel_manager_contract
+from microraiden.utils import PooledHTTPProvider, CryptoExecutor, ThreadPoolCryptoExecutor
 
 from .service import DBotService
 from .metric import DBotApiMetric
@@ -37,10 +40,14 @@ class DBotServer:
 
         return cls.instance
 
-    def init(self, app, private_key, http_provider=None):
+    def init(self, app, private_key, http_provider=None, new_heads_uri=None):
         self.account = Account.privateKeyToAccount(private_key)
-        self.web3 = Web3(HTTPProvider(
-            app.config['WEB3_PROVIDER_DEFAULT'] if http_provider is None else http_provider))
+        self.web3 = Web3(PooledHTTPProvider(
+            app.config['WEB3_PROVIDER_DEFAULT'] if http_provider is None else http_provider,
+            pool_size=app.config['WEB3_POOL_SIZE'],
+            timeout=app.config['WEB3_TIMEOUT'],
+            method_timeouts=app.config['WEB3_METHOD_TIMEOUTS']
+        ))
         self.web3.middleware_stack.inject(geth_poa_middleware, layer=0)
         try:
             NETWORK_CFG.set_defaults(int(self.web3.version.network))
@@ -51,6 +58,36 @@ class DBotServer:
         self.state_path = os.path.join(app.config['DB_ROOT'], 'channels')
         if not os.path.exists(self.state_path):
             os.makedirs(self.state_path)
+        self.state_options = {
+            'write_mode': WriteMode(app.config['CHANNEL_STATE_WRITE_MODE']),
+            'commit_interval': app.config['CHANNEL_STATE_COMMIT_INTERVAL'],
+            'compact_interval': app.config['CHANNEL_STATE_COMPACT_INTERVAL']
+        }
+        self.state_store = None
+        if app.config['CHANNEL_STATE_CONSOLIDATED']:
+            self.state_store = ChannelStateStore(os.path.join(self.state_path, 'channels.db'),
+                                                 **self.state_options)
+        if new_heads_uri is None:
+            new_heads_uri = app.config['NEW_HEADS_URI']
+        self.new_heads = None
+        if new_heads_uri:
+            self.new_heads = NewHeads(new_heads_uri)
+            self.new_heads.start()
+        self.paywall_options = {
+            'sessions': app.config['PAYWALL_SESSIONS'],
+            'session_ttl': app.config['PAYWALL_SESSION_TTL']
+        }
+        self.crypto_executor = CryptoExecutor()
+        if app.config['CRYPTO_THREADS'] > 0:
+            self.crypto_executor = ThreadPoolCryptoExecutor(app.config['CRYPTO_THREADS'])
+        self.chain_watcher = None
+        if app.config['CHAIN_WATCHER_SHARED']:
+            self.chain_watcher = ChainWatcher(
+                self.web3,
+                make_channel_manager_contract(self.web3, NETWORK_CFG.channel_manager_address),
+                self.new_heads
+            )
+            self.chain_watcher.start()
 
         logger.info("load all exist dbot service")
         dbot_address_list = db.dbots.keys()
@@ -80,7 +117,10 @@ class DBotServer:
         dbot_address = data['info']['addr']
         state_file = os.path.join(self.state_path, '{}.db'.format(dbot_address))
         logger.info('instantiate a dbot service: {}({})'.format(name, dbot_address))
-        dbot_service = DBotService(self.account.privateKey.hex(), self.web3, state_file, data, middleware)
+        dbot_service = DBotService(self.account.privateKey.hex(), self.web3, state_file, data,
+                                   middleware, self.state_options, self.state_store,
+                                   self.chain_watcher, self.new_heads,
+                                   self.crypto_executor, self.paywall_options)
         dbot_service.start()
         self.services[dbot_address] = dbot_service
 
@@ -93,7 +133,7 @@ class DBotServer:
         return self.services.get(dbot_address)
 
     def remove_service(self, dbot_address):
-        dbot_service = self.get_service(dbot_address)
+        dbot_service = self.services.pop(dbot_address, None)
         if dbot_service:
             dbot_service.stop()
 
@@ -103,5 +143,12 @@ class DBotServer:
 
     def stop(self):
         DBotMetricsCollector().Stop()
+        if self.chain_watcher is not None:
+            self.chain_watcher.stop()
+        if self.new_heads is not None:
+            self.new_heads.stop()
         for k in self.services:
             self.services[k].stop()
+        if self.state_store is not None:
+            self.state_store.close()
+        self.crypto_executor.close()
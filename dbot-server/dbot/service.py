@@ -16,7 +16,11 @@ from microraiden import HTTPHeaders
 from microraiden.make_helpers import make_channel_manager
 from microraiden.channel_manager import (
     ChannelManager,
+    ChannelStateStore,
+    ChainWatcher,
+    NewHeads
 )
+from microraiden.utils import CryptoExecutor
 from microraiden.exceptions import (
     NoOpenChannel,
     InvalidBalanceProof,
@@ -29,6 +33,7 @@ from microraiden.proxy.resources import (
     ChannelManagementListChannels,
     ChannelManagementChannelInfo
 )
+from .session import PaidSessions
 
 
 logger = logging.getLogger('dbot.' + os.path.splitext(os.path.basename(__file__))[0])
@@ -41,7 +46,13 @@ class DBotService():
                  web3: Web3,
                  state_file_path: str,
                  dbot_data: dict,
-                 middleware: None = None
+                 middleware: None = None,
+                 state_options: dict = None,
+                 state_store: ChannelStateStore = None,
+                 chain_watcher: ChainWatcher = None,
+                 new_heads: NewHeads = None,
+                 crypto_executor: CryptoExecutor = None,
+                 paywall_options: dict = None
                  ) -> None:
 
         self.name = dbot_data['info']['name']
@@ -59,9 +70,14 @@ class DBotService():
             private_key,
             NETWORK_CFG.channel_manager_address,
             state_file_path,
-            web3
+            web3,
+            state_options,
+            state_store,
+            chain_watcher,
+            new_heads,
+            crypto_executor
         )
-        self.paywall = Paywall(self.channel_manager)
+        self.paywall = Paywall(self.channel_manager, **(paywall_options or {}))
         self.channel_list = ChannelManagementListChannels(self.channel_manager)
         self.channel_detail = ChannelManagementChannelInfo(self.channel_manager)
 
@@ -75,6 +91,8 @@ class DBotService():
     def stop(self):
         logger.info('stop dbot service, address = {}'.format(self.address))
         self.enable = False
+        # unsubscribes from the chain watcher and releases the state
+        self.channel_manager.stop()
 
     def update(self, dbot_data, middleware):
         logger.info('update dbot service, address = {}'.format(self.address))
@@ -89,7 +107,9 @@ class DBotService():
 
 class Paywall(object):
     def __init__(self,
-                 channel_manager: ChannelManager
+                 channel_manager: ChannelManager,
+                 sessions: bool = False,
+                 session_ttl: float = 600
                  ) -> None:
         super().__init__()
         assert is_address(channel_manager.channel_manager_contract.address)
@@ -98,6 +118,10 @@ class Paywall(object):
         self.receiver_address = channel_manager.receiver
         self.channel_manager = channel_manager
         self.count = 0
+        # a request with the RDN-Session header may pay for several calls with one balance
+        # proof, the following calls spend the credit with the returned session tickets
+        self.sessions = sessions
+        self.paid_sessions = PaidSessions(session_ttl)
 
     def access(self, price, req_headers):
         if self.channel_manager.node_online() is False:
@@ -120,10 +144,20 @@ class Paywall(object):
         """Check if the resource can be sent to the client.
         """
         headers = self.generate_headers(price)
+        if self.sessions and data.session_ticket:
+            return self.check_session_ticket(price, data.session_ticket, headers)
         if not data.balance_signature:
             logger.warning('No balance signature in headers')
             return True, 'No balance signature', headers
 
+        # payments on the same channel are checked and registered one at a time
+        with self.channel_manager.lock_channel(data.sender_address, data.open_block_number):
+            return self.check_balance_proof(price, data, headers)
+
+    def check_balance_proof(self, price, data, headers):
+        """Verify the balance proof of a request and register the payment.
+        The caller must hold the lock of the channel.
+        """
         # try to get an existing channel
         try:
             channel = self.channel_manager.verify_balance_proof(
@@ -158,29 +192,92 @@ class Paywall(object):
         if channel.last_signature is not None:
             headers.update({HTTPHeaders.BALANCE_SIGNATURE: channel.last_signature})
 
-        amount_sent = data.balance - channel.balance
+        channel_balance = channel.balance
+        session = self.paid_sessions.get(channel.sender, data.open_block_number)
+        if session is not None:
+            headers[HTTPHeaders.CREDIT] = session.credit
+        # a proof between the consumed and the signed balance of the open session settles
+        # it and pays from the consumed balance, the unused credit returns to the sender
+        settles = session is not None and session.consumed < data.balance < session.signed
+        if data.balance <= channel_balance and not settles:
+            # the proof, or one with a higher balance, has been registered already
+            logger.info('Invalid Balance Amount')
+            return True, 'Invalid Balance Amount', headers
+        paid_balance = session.consumed if settles else channel_balance
+        amount_sent = data.balance - paid_balance
 
-        if amount_sent != 0 and amount_sent != price:
+        opens_session = self.sessions and data.session
+        if amount_sent != price and not (opens_session and amount_sent > price):
             headers[HTTPHeaders.INVALID_AMOUNT] = 1
-            #  if difference is 0, it will be handled by channel manager
             logger.info('Invalid ammount')
             return True, 'Invalid ammount', headers
 
+        # tickets of the open session are refused until the payment is registered
+        if session is not None:
+            self.paid_sessions.settle(channel.sender, data.open_block_number)
         # set the headers to reflect actual state of a channel
         try:
             self.channel_manager.register_payment(
                 channel.sender,
                 data.open_block_number,
                 data.balance,
-                data.balance_signature)
+                data.balance_signature,
+                expected_balance=channel_balance,
+                min_balance=paid_balance)
         except (InvalidBalanceAmount, InvalidBalanceProof):
             # balance sent to the proxy is less than in the previous proof
+            if session is not None:
+                self.paid_sessions.restore(channel.sender, data.open_block_number, session)
             logger.info('Invalid Balance Amount')
             return True, 'Invalid Balance Amount', headers
 
+        # the call is paid, the rest of the payment is credit of the session; a proof
+        # above the signed balance carries the credit of the open session over
+        credit = amount_sent - price
+        if session is not None and not settles:
+            credit += session.credit
+        if opens_session or (session is not None and not settles):
+            ticket = self.paid_sessions.open(channel.sender, data.open_block_number,
+                                             data.balance - credit, data.balance)
+            headers.update({
+                HTTPHeaders.SESSION_TICKET: ticket,
+                HTTPHeaders.CREDIT: credit
+            })
+        else:
+            headers.pop(HTTPHeaders.CREDIT, None)
+
         # all ok, return premium content
         return False, 'ok', headers
 
+    def check_session_ticket(self, price, ticket, headers):
+        """Pay a call with the credit of the paid session of a ticket."""
+        channel_id = self.paid_sessions.check(ticket)
+        if channel_id is None:
+            logger.info('Refused payment: Invalid, used or expired session ticket')
+            headers.update({HTTPHeaders.INVALID_PROOF: 1})
+            return True, 'Invalid session ticket', headers
+        sender, open_block_number = channel_id
+        channel = self.channel_manager.channels.get(channel_id)
+        if channel is None or channel.is_closed:
+            self.paid_sessions.settle(sender, open_block_number)
+            logger.info('Refused payment: Channel of session does not exist (sender={})'.format(sender))
+            headers.update({HTTPHeaders.NONEXISTING_CHANNEL: "1"})
+            return True, 'Channel does not exist', headers
+        headers.update(
+            {
+                HTTPHeaders.SENDER_ADDRESS: channel.sender,
+                HTTPHeaders.SENDER_BALANCE: channel.balance,
+                HTTPHeaders.OPEN_BLOCK: open_block_number
+            })
+        next_ticket = self.paid_sessions.spend(sender, open_block_number, price)
+        headers[HTTPHeaders.CREDIT] = self.paid_sessions.get(sender, open_block_number).credit
+        if next_ticket is None:
+            # a balance proof from the consumed balance settles the session and pays the call
+            logger.info('Refused payment: Insufficient session credit (sender={})'.format(sender))
+            return True, 'Insufficient credit', headers
+        headers[HTTPHeaders.SESSION_TICKET] = next_ticket
+        return False, 'ok', headers
+
     # when are these generated?
     def generate_headers(self, price: int):
         assert price > 0
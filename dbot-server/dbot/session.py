@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Paid sessions: prepaid channel credit spent with single-use tickets."""
+import os
+import hmac
+import time
+import hashlib
+
+
+class Session(object):
+    """Credit of a channel, prepaid by the balance proof that opened the session."""
+    __slots__ = ('id', 'signed', 'consumed', 'seq')
+
+    def __init__(self, signed: int, consumed: int):
+        self.id = os.urandom(8).hex()
+        # balance of the proof that opened the session
+        self.signed = signed
+        # balance the calls of the session have consumed
+        self.consumed = consumed
+        # number of the ticket that pays the next call
+        self.seq = 0
+
+    @property
+    def credit(self):
+        return self.signed - self.consumed
+
+
+class PaidSessions(object):
+    """Open paid sessions of a paywall, at most one per channel.
+
+    A session is opened by a balance proof that pays for more than one call. Every call
+    of the session returns a ticket, an HMAC-SHA256 authenticated (channel, session,
+    sequence number, expiry) tuple that pays the next call once. The ticket is only valid
+    for the session of the channel that issued it, so it can't be replayed.
+
+    The session ends with a balance proof that pays the consumed balance, and the price
+    of its own call, instead of the signed balance: the unused credit stays with the
+    sender. Sessions are kept in memory, with a key that is created when the paywall
+    starts.
+    """
+
+    def __init__(self, ttl: float, key: bytes = None):
+        """
+        Args:
+            ttl (float): seconds a ticket is valid
+            key (bytes, optional): MAC key, random if not given
+        """
+        self.ttl = ttl
+        self.key = key or os.urandom(32)
+        # (sender, open_block_number) => Session
+        self._sessions = dict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, sender: str, open_block_number: int):
+        """
+        Returns:
+            Session: open session of the channel, None if there is none
+        """
+        return self._sessions.get((sender, open_block_number))
+
+    def open(self, sender: str, open_block_number: int, consumed: int, signed: int) -> str:
+        """Open a session of a channel, replacing the one that is open.
+
+        Args:
+            consumed (int): balance of the channel including the price of the current call
+            signed (int): balance of the proof that opened the session
+        Returns:
+            str: ticket of the next call
+        """
+        session = Session(signed, consumed)
+        self._sessions[sender, open_block_number] = session
+        return self._issue(sender, open_block_number, session)
+
+    def settle(self, sender: str, open_block_number: int):
+        """End the session of a channel.
+
+        Returns:
+            Session: the ended session, None if there was none
+        """
+        return self._sessions.pop((sender, open_block_number), None)
+
+    def restore(self, sender: str, open_block_number: int, session: Session):
+        """Reopen a session whose settlement failed, unless another one has been opened."""
+        self._sessions.setdefault((sender, open_block_number), session)
+
+    def check(self, ticket: str):
+        """
+        Returns:
+            tuple: (sender, open_block_number) of the channel of a valid ticket, None if
+                the ticket is forged, malformed, used, expired or its session has ended
+        """
+        payload, _, mac = ticket.rpartition(':')
+        if not hmac.compare_digest(self._mac(payload).encode(), mac.encode()):
+            return None
+        sender, open_block_number, session_id, seq, expiry = payload.split(':')
+        session = self._sessions.get((sender, int(open_block_number)))
+        if session is None or session.id != session_id or session.seq != int(seq):
+            return None
+        if int(expiry) < time.time():
+            return None
+        return sender, int(open_block_number)
+
+    def spend(self, sender: str, open_block_number: int, amount: int):
+        """Pay a call with the credit of a channel's session.
+
+        Returns:
+            str: ticket of the next call, None if the credit is less than `amount`
+        """
+        session = self._sessions[sender, open_block_number]
+        if session.credit < amount:
+            return None
+        session.consumed += amount
+        session.seq += 1
+        return self._issue(sender, open_block_number, session)
+
+    def _issue(self, sender: str, open_block_number: int, session: Session) -> str:
+        payload = '{}:{}:{}:{}:{}'.format(sender, open_block_number, session.id, session.seq,
+                                          int(time.time() + self.ttl))
+        return '{}:{}'.format(payload, self._mac(payload))
+
+    def _mac(self, payload: str) -> str:
+        return hmac.new(self.key, payload.encode(), hashlib.sha256).hexdigest()
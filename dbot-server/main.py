@@ -28,7 +28,8 @@ import dbot
 dbot_server = dbot.get_server()
 logging.info('Start dbot server ...')
 http_provider = os.environ.get('WEB3_PROVIDER', app.config['WEB3_PROVIDER_DEFAULT'])
-dbot_server.init(app, private_key, http_provider)
+new_heads_uri = os.environ.get('NEW_HEADS_URI')
+dbot_server.init(app, private_key, http_provider, new_heads_uri)
 logging.info('waiting for all dbot service sync info with block chain')
 
 host = app.config['HOST']
@@ -10,6 +10,9 @@ import json
 import signal
 import logging
 import logging.config
+import filelock
+from web3 import Web3, HTTPProvider
+from web3.middleware import geth_poa_middleware
 
 from app import create_app
 from utils import get_private_key
@@ -76,6 +79,113 @@ def run_server(host, port, pk_file, pw_file, http_provider):
     app.run(host=host, port=port, debug=app.config['DEBUG'], use_reloader=False)
 
 
+def _dbot_state(dbot_address, network_id=None, contract_address=None):
+    """Open the channel state of a dbot where `DBotServer` keeps it.
+
+    A state is created only if `network_id` and `contract_address` are given, otherwise
+    None is returned if the dbot has no state yet.
+    """
+    from app import db
+    from eth_utils import is_same_address
+    from microraiden.channel_manager import ChannelManagerState, ChannelStateStore
+    from microraiden.exceptions import StateFileLocked
+    # state files are named after the address the dbot was registered with
+    for address in db.dbots.keys():
+        if is_same_address(address, dbot_address):
+            dbot_address = address
+            break
+    state_path = os.path.join(app.config['DB_ROOT'], 'channels')
+    if not os.path.exists(state_path):
+        os.makedirs(state_path)
+    if app.config['CHANNEL_STATE_CONSOLIDATED']:
+        store = ChannelStateStore(os.path.join(state_path, 'channels.db'))
+        receiver = Web3.toChecksumAddress(dbot_address)
+        if network_id is None and not store.has_state(receiver):
+            return None
+        return store.open_state(receiver, network_id, contract_address)
+    state_file = os.path.join(state_path, '{}.db'.format(dbot_address))
+    # kept with the state until the command exits, a running server holds it as well
+    lock = filelock.FileLock(state_file + '.lock')
+    try:
+        lock.acquire(timeout=0)
+    except filelock.Timeout:
+        raise StateFileLocked('state file {} is locked by another process'.format(state_file))
+    if os.path.isfile(state_file):
+        state = ChannelManagerState.load(state_file)
+    elif network_id is None:
+        return None
+    else:
+        state = ChannelManagerState(state_file)
+        state.setup_db(network_id, contract_address, Web3.toChecksumAddress(dbot_address))
+    state.lock_state = lock
+    return state
+
+
+@cli.command()
+@click.option(
+    '--dbot-address',
+    required=True,
+    help='address of the dbot'
+)
+@click.option(
+    '--output',
+    required=True,
+    help='snapshot file to write'
+)
+def export_snapshot(dbot_address, output):
+    """Export the confirmed channels and sync head of a dbot, the server must be stopped."""
+    from microraiden.channel_manager import export_snapshot
+    from microraiden.exceptions import StateFileException
+    try:
+        state = _dbot_state(dbot_address)
+        if state is None:
+            raise click.ClickException('no channel state of dbot {}'.format(dbot_address))
+        snapshot = export_snapshot(state, output)
+    except StateFileException as e:
+        raise click.ClickException(str(e))
+    click.echo('exported {} channels at block {} to {}'.format(
+        len(snapshot['body']['channels']), snapshot['body']['confirmed_head_number'], output))
+
+
+@cli.command()
+@click.option(
+    '--snapshot',
+    required=True,
+    help='snapshot file written by export-snapshot'
+)
+@click.option(
+    '--http-provider',
+    default=None,
+    help='node to check the checkpoint block with'
+)
+@click.option(
+    '--skip-chain-check',
+    is_flag=True,
+    help='do not check that the checkpoint block is on the canonical chain'
+)
+def import_snapshot(snapshot, http_provider, skip_chain_check):
+    """Restore the channel state of a dbot from a snapshot, the server must be stopped.
+
+    The dbot resumes syncing from the block after the checkpoint.
+    """
+    from microraiden.channel_manager import read_snapshot, verify_snapshot_chain, import_snapshot
+    from microraiden.exceptions import StateFileException
+    try:
+        body = read_snapshot(snapshot)
+        if not skip_chain_check:
+            web3 = Web3(HTTPProvider(
+                app.config['WEB3_PROVIDER_DEFAULT'] if http_provider is None else http_provider
+            ))
+            web3.middleware_stack.inject(geth_poa_middleware, layer=0)
+            verify_snapshot_chain(web3, body)
+        state = _dbot_state(body['receiver'], body['network_id'], body['contract_address'])
+        import_snapshot(state, body)
+    except StateFileException as e:
+        raise click.ClickException(str(e))
+    click.echo('imported {} channels of {}, syncing resumes at block {}'.format(
+        len(body['channels']), body['receiver'], body['confirmed_head_number'] + 1))
+
+
 if __name__ == '__main__':
     signal.signal(signal.SIGHUP, handle_quit)
     signal.signal(signal.SIGTERM, handle_quit)
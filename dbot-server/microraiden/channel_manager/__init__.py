@@ -1,12 +1,24 @@
 from .manager import ChannelManager
 from .blockchain import Blockchain
-from .state import ChannelManagerState
+from .watcher import ChainWatcher
+from .heads import NewHeads
+from .state import ChannelManagerState, WriteMode
+from .store import ChannelStateStore
 from .channel import Channel, ChannelState
+from .snapshot import export_snapshot, read_snapshot, verify_snapshot_chain, import_snapshot
 
 __all__ = [
     ChannelManager,
     Blockchain,
+    ChainWatcher,
+    NewHeads,
     ChannelManagerState,
+    WriteMode,
+    ChannelStateStore,
     Channel,
-    ChannelState
+    ChannelState,
+    export_snapshot,
+    read_snapshot,
+    verify_snapshot_chain,
+    import_snapshot
 ]
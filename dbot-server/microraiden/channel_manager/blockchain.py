@@ -1,22 +1,223 @@
 import requests
 import sys
+import time
 import gevent
 import logging
 
 from ethereum.exceptions import InsufficientBalance
 from web3 import Web3
 from web3.contract import Contract
-from web3.exceptions import BadFunctionCallOutput
 from eth_utils import is_same_address, to_checksum_address
 
 from microraiden.config import NETWORK_CFG
 from microraiden.constants import PROXY_BALANCE_LIMIT
-from microraiden.utils import get_logs
+from microraiden.utils import (
+    get_contract_logs,
+    make_contract_logs_filter,
+    decode_contract_logs,
+    supports_batch,
+    batch_request
+)
+from .headers import HeaderCache, Header, make_header
+from .channel_info import ChannelInfoCache
+
+# events relevant for the channel manager, fetched together on every poll
+CHANNEL_EVENTS = (
+    'ChannelCreated',
+    'ChannelToppedUp',
+    'ChannelCloseRequested',
+    'ChannelSettled'
+)
+
+
+def select_logs(logs: list, event_name: str, filters: dict):
+    """Logs of one event within the block range of `filters`, in their original order."""
+    return [
+        log for log in logs
+        if log['event'] == event_name and
+        filters['from_block'] <= log['blockNumber'] <= filters['to_block']
+    ]
+
+
+def select_range(logs: list, from_block: int, to_block: int):
+    """Logs of the blocks `from_block` to `to_block`, in their original order."""
+    return [log for log in logs if from_block <= log['blockNumber'] <= to_block]
+
+
+def fetch_head_and_logs(contract: Contract, from_block: int, receivers):
+    """Fetch the latest header and the channel events of `receivers` from `from_block` up to
+    the latest block with one batch request.
+
+    Returns:
+        tuple: (Header, logs), logs is None if the node didn't return them
+    """
+    logs_filter = make_contract_logs_filter(
+        contract,
+        CHANNEL_EVENTS,
+        from_block=from_block,
+        to_block='latest',
+        argument_filters={'_receiver_address': receivers}
+    )
+    head, logs = batch_request(contract.web3, [
+        ('eth_getBlockByNumber', ['latest', False]),
+        ('eth_getLogs', [logs_filter])
+    ])
+    if not head.get('result'):
+        raise ValueError(head.get('error', 'no latest block'))
+    if logs.get('result') is None:
+        # e.g. `from_block` is after the latest block
+        return make_header(head['result']), None
+    return make_header(head['result']), decode_contract_logs(contract, logs['result'])
+
+
+class UnconfirmedEvents(object):
+    """Decoded events of the unconfirmed blocks of a receiver, indexed by block number.
+
+    Holds all events of the blocks `start_block` to `end_block`, so that they can be
+    applied as confirmed once their blocks are deep enough, without fetching them again.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.start_block = None
+        self.end_block = None
+        # block number => (block hash, logs of the block)
+        self.blocks = dict()
+
+    def add(self, logs: list, from_block: int, to_block: int):
+        """Buffer the events of the blocks `from_block` to `to_block`.
+
+        Blocks that are buffered already keep their events. The buffer is restarted if the
+        blocks neither overlap nor adjoin the buffered ones.
+        """
+        if from_block > to_block:
+            return
+        if (self.end_block is None or
+                from_block > self.end_block + 1 or to_block < self.start_block - 1):
+            self.clear()
+            buffered = range(0)
+            self.start_block, self.end_block = from_block, to_block
+        else:
+            buffered = range(self.start_block, self.end_block + 1)
+            self.start_block = min(self.start_block, from_block)
+            self.end_block = max(self.end_block, to_block)
+        for log in logs:
+            number = log['blockNumber']
+            if from_block <= number <= to_block and number not in buffered:
+                _, block_logs = self.blocks.setdefault(log['blockNumber'], (log['blockHash'], []))
+                block_logs.append(log)
+
+    def covers(self, from_block: int, to_block: int) -> bool:
+        """
+        Returns:
+            bool: True if all events of the blocks `from_block` to `to_block` are buffered
+        """
+        if from_block > to_block:
+            return True
+        return (self.end_block is not None and
+                self.start_block <= from_block and to_block <= self.end_block)
+
+    def select(self, from_block: int, to_block: int):
+        """Buffered events of the blocks `from_block` to `to_block`, in their original order."""
+        if self.end_block is None:
+            return []
+        return [
+            log
+            for number in sorted(self.blocks) if from_block <= number <= to_block
+            for log in self.blocks[number][1]
+        ]
+
+    def prune(self, confirmed_block: int):
+        """Forget the events of the blocks up to `confirmed_block`."""
+        if self.end_block is None:
+            return
+        if confirmed_block >= self.end_block:
+            self.clear()
+            return
+        for number in [number for number in self.blocks if number <= confirmed_block]:
+            del self.blocks[number]
+        self.start_block = max(self.start_block, confirmed_block + 1)
+
+    def check(self, headers: HeaderCache) -> bool:
+        """
+        Returns:
+            bool: True if the blocks of all buffered events are still canonical
+        """
+        return all(
+            headers.is_canonical(number, block_hash)
+            for number, (block_hash, _) in self.blocks.items()
+        )
+
+
+class SyncProgress(object):
+    """Progress of the initial sync of a receiver."""
+
+    def __init__(self):
+        self.start_block = None
+        self.synced_block = None
+        self.head_block = None
+        self.start_time = None
+
+    def start(self, start_block: int, head_block: int):
+        self.start_block = start_block
+        self.synced_block = start_block - 1
+        self.head_block = head_block
+        self.start_time = time.time()
+
+    def update(self, synced_block: int):
+        self.synced_block = synced_block
+
+    @property
+    def progress(self):
+        """float: synced fraction of the blocks to sync, None before the sync started"""
+        if self.start_block is None:
+            return None
+        n_blocks = self.head_block - self.start_block + 1
+        if n_blocks <= 0:
+            return 1.0
+        return (self.synced_block - self.start_block + 1) / n_blocks
+
+    @property
+    def eta(self):
+        """float: estimated seconds until the sync is finished, None if unknown"""
+        if self.start_block is None:
+            return None
+        synced = self.synced_block - self.start_block + 1
+        elapsed = time.time() - self.start_time
+        if synced <= 0 or elapsed <= 0:
+            return None
+        return (self.head_block - self.synced_block) * elapsed / synced
+
+    def to_dict(self):
+        return {
+            'start_block': self.start_block,
+            'synced_block': self.synced_block,
+            'head_block': self.head_block,
+            'progress': self.progress,
+            'eta': self.eta
+        }
 
 
 class Blockchain(gevent.Greenlet):
-    """Class that watches the blockchain and relays events to the channel manager."""
+    """Class that watches the blockchain and relays events to the channel manager.
+
+    The initial sync fetches up to `sync_concurrency` block ranges at once and applies
+    them in block order. The range size adapts to the node: it doubles while ranges return
+    less than half of `sync_target_logs` logs, halves when they return more, and ranges
+    the node rejects or times out on are split in two and fetched again; the size never
+    grows back to that of a rejected range.
+
+    Events are fetched once, when their block enters the unconfirmed range. They are kept
+    in `unconfirmed_events` and applied as confirmed from there, unless a chain
+    reorganization has replaced their block.
+    """
     poll_interval = 2
+    sync_concurrency = 4
+    sync_target_logs = 1000
+    max_sync_chunk_size = 1000 * 1000
+    header_cache_size = 128
 
     def __init__(
             self,
@@ -24,7 +225,9 @@ class Blockchain(gevent.Greenlet):
             channel_manager_contract: Contract,
             channel_manager,
             n_confirmations,
-            sync_chunk_size=100 * 1000
+            sync_chunk_size=100 * 1000,
+            watcher=None,
+            new_heads=None
     ):
         gevent.Greenlet.__init__(self)
         self.web3 = web3
@@ -35,6 +238,10 @@ class Blockchain(gevent.Greenlet):
         self.wait_sync_event = gevent.event.Event()
         self.is_connected = gevent.event.Event()
         self.sync_chunk_size = sync_chunk_size
+        # shared `ChainWatcher` that relays new events once the initial sync is finished
+        self.watcher = watcher
+        # `NewHeads` subscription that triggers an update as soon as a block arrives
+        self.new_heads = new_heads
         self.running = False
         #  insufficient_balance
         #  - set to true if for some reason tx can't be send
@@ -43,20 +250,32 @@ class Blockchain(gevent.Greenlet):
         #     has ether to spend again
         self.insufficient_balance = False
         self.sync_start_block = NETWORK_CFG.start_sync_block
+        self.sync_progress = SyncProgress()
+        self.unconfirmed_events = UnconfirmedEvents()
+        self.headers = HeaderCache(web3, self.header_cache_size)
+        # the watcher reads the channel infos of all its receivers in one batch
+        self.channel_info = watcher.channel_info if watcher is not None else \
+            ChannelInfoCache(channel_manager_contract)
+        # largest range size the node has not rejected so far
+        self.sync_chunk_limit = self.max_sync_chunk_size
 
     def _run(self):
         self.running = True
         self.log.info('starting polling channel info (receiver: {}) from blockchain, interval {}s'.format(
             self.cm.receiver,
             self.poll_interval))
+        latest = None
         while self.running:
             if self.insufficient_balance:
                 self.insufficient_balance_recover()
             try:
-                self._update()
+                self._update(latest)
+                latest = None
                 self.is_connected.set()
                 if self.wait_sync_event.is_set():
-                    gevent.sleep(self.poll_interval)
+                    if self.watcher is not None:
+                        break
+                    latest = self.wait_for_head()
             except requests.exceptions.ConnectionError as e:
                 endpoint = self.web3.currentProvider.endpoint_uri
                 self.log.warning(
@@ -65,53 +284,191 @@ class Blockchain(gevent.Greenlet):
                 )
                 gevent.sleep(self.poll_interval)
                 self.is_connected.clear()
+        if self.running and self.watcher is not None:
+            self.log.info('channel info (receiver: {}) synced, '
+                          'following the shared chain watcher'.format(self.cm.receiver))
+            self.watcher.subscribe(self)
+            return
         self.log.info('stopped polling channel info (receiver: {}) from blockchain'.format(self.cm.receiver))
 
     def stop(self):
         self.running = False
+        if self.watcher is not None:
+            self.watcher.unsubscribe(self)
 
     def wait_sync(self):
         """Block until event polling is up-to-date with a most recent block of the blockchain"""
         self.wait_sync_event.wait()
 
-    def _update(self):
-        current_block = self.web3.eth.blockNumber
+    def wait_for_head(self):
+        """Wait for the next block, `poll_interval` seconds without a newHeads subscription.
+
+        Returns:
+            Header: header of the new block, None if it has to be polled for
+        """
+        if self.new_heads is None:
+            gevent.sleep(self.poll_interval)
+            return None
+        return self.new_heads.wait(self.headers.latest, self.poll_interval)
+
+    def _update(self, latest: Header = None):
+        prefetched_logs = None
+        if latest is None and self.wait_sync_event.is_set() and supports_batch(self.web3):
+            # the events of new blocks usually start after the unconfirmed head
+            prefetch_from = self.cm.state.unconfirmed_head_number + 1
+            latest, prefetched_logs = fetch_head_and_logs(
+                self.channel_manager_contract,
+                prefetch_from,
+                self.cm.state.receiver
+            )
+        current_block = self.headers.update(self.n_confirmations + 1, latest).number
+        if not self.wait_sync_event.is_set():
+            self._sync(current_block)
+            return
+        filters = self.get_update_filters(current_block, self.headers)
+        if filters is None:
+            return
+        fetch_range = self.get_fetch_range(filters)
+        logs = []
+        if fetch_range is not None and prefetched_logs is not None and \
+                fetch_range[0] >= prefetch_from:
+            logs = prefetched_logs
+        elif fetch_range is not None:
+            # fetch all events that aren't buffered with one request before touching the state
+            logs = get_contract_logs(
+                self.channel_manager_contract,
+                CHANNEL_EVENTS,
+                from_block=fetch_range[0],
+                to_block=fetch_range[1],
+                argument_filters={'_receiver_address': self.cm.state.receiver}
+            )
+        self.apply_update(current_block, filters, logs, self.headers)
+
+    def _sync(self, current_block: int):
+        """Sync up to `current_block`, fetching ranges concurrently and applying them in order."""
+        self._init_sync_state()
+        next_block = min(self.cm.state.confirmed_head_number,
+                         self.cm.state.unconfirmed_head_number) + 1
+        self.sync_progress.start(next_block, current_block)
+        self.log.info('syncing channel info (receiver: {}) from block {} to {}'.format(
+            self.cm.receiver, next_block, current_block))
+        pending = []
+        try:
+            while self.running and (pending or next_block <= current_block):
+                while len(pending) < self.sync_concurrency and next_block <= current_block:
+                    to_block = min(next_block + self.sync_chunk_size - 1, current_block)
+                    fetch = gevent.spawn(self._fetch_range, next_block, to_block)
+                    pending.append((to_block, fetch))
+                    next_block = to_block + 1
+                to_block, fetch = pending.pop(0)
+                logs = fetch.get()
+                filters = self.get_update_filters(current_block, self.headers, to_block)
+                if filters is not None:
+                    # the confirmed range starts with the tail of the previous chunk, whose
+                    # events are taken from `unconfirmed_events`
+                    self.apply_update(current_block, filters, logs, self.headers)
+                self.sync_progress.update(to_block)
+                self.log.debug('synced channel info (receiver: %s) to block %d, %.1f%%, '
+                               'eta %s s, chunk size %d',
+                               self.cm.receiver, to_block, 100 * self.sync_progress.progress,
+                               self.sync_progress.eta, self.sync_chunk_size)
+        finally:
+            gevent.killall([fetch for _, fetch in pending])
+        if (not self.wait_sync_event.is_set() and
+                self.cm.state.unconfirmed_head_number >= current_block):
+            self.log.info('Channel info (recever: {}) sync finished, continue listen ...'.format(self.cm.receiver))
+            self.wait_sync_event.set()
+
+    def _fetch_range(self, from_block: int, to_block: int):
+        """Fetch the logs of a block range, splitting the range while the node rejects it.
+
+        Adapts `sync_chunk_size` to the number of logs returned and to rejected ranges.
+        """
+        try:
+            logs = get_contract_logs(
+                self.channel_manager_contract,
+                CHANNEL_EVENTS,
+                from_block=from_block,
+                to_block=to_block,
+                argument_filters={'_receiver_address': self.cm.state.receiver}
+            )
+        except requests.exceptions.ConnectionError:
+            raise
+        except (ValueError, requests.exceptions.Timeout) as e:
+            if from_block == to_block:
+                raise
+            middle = (from_block + to_block) // 2
+            # do not grow to the size of a rejected range again
+            self.sync_chunk_limit = min(self.sync_chunk_limit, middle - from_block + 1)
+            self.sync_chunk_size = min(self.sync_chunk_size, self.sync_chunk_limit)
+            self.log.warning('fetching events of blocks %d-%d failed (%s), '
+                             'retrying in two ranges' % (from_block, to_block, e))
+            return self._fetch_range(from_block, middle) + self._fetch_range(middle + 1, to_block)
+        if len(logs) > self.sync_target_logs:
+            self.sync_chunk_size = max(self.sync_chunk_size // 2, 1)
+        elif (len(logs) < self.sync_target_logs // 2 and
+                to_block - from_block + 1 >= self.sync_chunk_size):
+            self.sync_chunk_size = min(self.sync_chunk_size * 2, self.sync_chunk_limit)
+        return logs
+
+    def _init_sync_state(self):
+        if self.cm.state.confirmed_head_number is None:
+            self.cm.state.update_sync_state(confirmed_head_number=self.sync_start_block)
+        if self.cm.state.unconfirmed_head_number is None:
+            self.cm.state.update_sync_state(unconfirmed_head_number=self.sync_start_block)
+
+    def get_update_filters(self, current_block: int, headers: HeaderCache, to_block: int = None):
+        """Check for chain reorganizations and compute the block ranges of the next update.
+
+        Args:
+            current_block (int): current block number of the node
+            headers (HeaderCache): recent headers, updated up to `current_block`
+            to_block (int, optional): end the update at this block instead of
+                `sync_chunk_size` blocks after the unconfirmed head
+        Returns:
+            tuple: log filters (confirmed, unconfirmed), or None if there is nothing to do
+        """
         # reset unconfirmed channels in case of reorg
         if self.wait_sync_event.is_set():  # but not on first sync
             if current_block < self.cm.state.unconfirmed_head_number:
                 self.log.info('chain reorganization detected. '
                               'Resyncing unconfirmed events (unconfirmed_head=%d) [@%d]' %
                               (self.cm.state.unconfirmed_head_number, self.web3.eth.blockNumber))
-                self.cm.reset_unconfirmed()
-            try:
-                # raises if hash doesn't exist (i.e. block has been replaced)
-                self.web3.eth.getBlock(self.cm.state.unconfirmed_head_hash)
-            except ValueError:
+                self._reset_unconfirmed()
+            if not headers.is_canonical(self.cm.state.unconfirmed_head_number,
+                                        self.cm.state.unconfirmed_head_hash):
+                self.log.info('chain reorganization detected. '
+                              'Resyncing unconfirmed events (unconfirmed_head=%d) [@%d]. '
+                              '(unconfirmed head block has been replaced)' %
+                              (self.cm.state.unconfirmed_head_number, current_block))
+                self._reset_unconfirmed()
+
+            if not self.unconfirmed_events.check(headers):
                 self.log.info('chain reorganization detected. '
                               'Resyncing unconfirmed events (unconfirmed_head=%d) [@%d]. '
-                              '(getBlock() raised ValueError)' %
+                              '(block of an unconfirmed event has been replaced)' %
                               (self.cm.state.unconfirmed_head_number, current_block))
-                self.cm.reset_unconfirmed()
+                self._reset_unconfirmed()
 
             # in case of reorg longer than confirmation number fail
-            try:
-                self.web3.eth.getBlock(self.cm.state.confirmed_head_hash)
-            except ValueError:
+            if not headers.is_canonical(self.cm.state.confirmed_head_number,
+                                        self.cm.state.confirmed_head_hash):
                 self.log.critical('events considered confirmed have been reorganized')
                 assert False  # unreachable as long as confirmation level is set high enough
 
-        if self.cm.state.confirmed_head_number is None:
-            self.cm.state.update_sync_state(confirmed_head_number=self.sync_start_block)
-        if self.cm.state.unconfirmed_head_number is None:
-            self.cm.state.update_sync_state(unconfirmed_head_number=self.sync_start_block)
-        new_unconfirmed_head_number = self.cm.state.unconfirmed_head_number + self.sync_chunk_size
-        new_unconfirmed_head_number = min(new_unconfirmed_head_number, current_block)
-        new_confirmed_head_number = max(new_unconfirmed_head_number - self.n_confirmations, 0)
+        self._init_sync_state()
+        if to_block is None:
+            to_block = self.cm.state.unconfirmed_head_number + self.sync_chunk_size
+        new_unconfirmed_head_number = min(to_block, current_block)
+        new_unconfirmed_head_number = max(new_unconfirmed_head_number,
+                                          self.cm.state.unconfirmed_head_number)
+        new_confirmed_head_number = max(new_unconfirmed_head_number - self.n_confirmations,
+                                        self.cm.state.confirmed_head_number)
 
         # return if blocks have already been processed
         if (self.cm.state.confirmed_head_number >= new_confirmed_head_number and
                 self.cm.state.unconfirmed_head_number >= new_unconfirmed_head_number):
-            return
+            return None
 
         # filter for events after block_number
         filters_confirmed = {
@@ -136,153 +493,104 @@ class Blockchain(gevent.Greenlet):
             filters_confirmed['to_block'],
             current_block
         )
+        return filters_confirmed, filters_unconfirmed
 
-        # unconfirmed channel created
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelCreated',
-            **filters_unconfirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            deposit = log['args']['_deposit']
-            open_block_number = log['blockNumber']
-            self.log.debug(
-                'received unconfirmed ChannelCreated event (sender %s, block number %s)',
-                sender,
-                open_block_number
-            )
-            self.cm.unconfirmed_event_channel_opened(sender, open_block_number, deposit)
+    def _reset_unconfirmed(self):
+        self.unconfirmed_events.clear()
+        self.cm.reset_unconfirmed()
 
-        # channel created
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelCreated',
-            **filters_confirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            deposit = log['args']['_deposit']
-            open_block_number = log['blockNumber']
-            self.log.debug('received ChannelOpened event (sender %s, block number %s)',
-                           sender, open_block_number)
-            self.cm.event_channel_opened(sender, open_block_number, deposit)
-
-        # unconfirmed channel top ups
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelToppedUp',
-            **filters_unconfirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            txhash = log['transactionHash']
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            open_block_number = log['args']['_open_block_number']
-            added_deposit = log['args']['_added_deposit']
-            self.log.debug(
-                'received top up event (sender %s, block number %s, deposit %s)',
-                sender,
-                open_block_number,
-                added_deposit
-            )
-            self.cm.unconfirmed_event_channel_topup(
-                sender,
-                open_block_number,
-                txhash,
-                added_deposit
-            )
+    def get_fetch_range(self, filters: tuple):
+        """Block range of the logs that `apply_update` needs for `filters`.
 
-        # confirmed channel top ups
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelToppedUp',
-            **filters_confirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            txhash = log['transactionHash']
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            open_block_number = log['args']['_open_block_number']
-            added_deposit = log['args']['_added_deposit']
-            self.log.debug(
-                'received top up event (sender %s, block number %s, added deposit %s)',
-                sender,
-                open_block_number,
-                added_deposit
-            )
-            self.cm.event_channel_topup(sender, open_block_number, txhash, added_deposit)
+        The confirmed range is left out if its events are buffered in `unconfirmed_events`.
 
-        # channel settled event
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelSettled',
-            **filters_confirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            open_block_number = log['args']['_open_block_number']
-            self.log.debug('received ChannelSettled event (sender %s, block number %s)',
-                           sender, open_block_number)
-            self.cm.event_channel_settled(sender, open_block_number)
-
-        # channel close requested
-        logs = get_logs(
-            self.channel_manager_contract,
-            'ChannelCloseRequested',
-            **filters_confirmed
-        )
-        for log in logs:
-            assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
-            sender = log['args']['_sender_address']
-            sender = to_checksum_address(sender)
-            open_block_number = log['args']['_open_block_number']
-            if (sender, open_block_number) not in self.cm.channels:
-                continue
-            balance = log['args']['_balance']
-            try:
-                timeout = self.channel_manager_contract.call().getChannelInfo(
-                    sender,
-                    self.cm.state.receiver,
-                    open_block_number
-                )[2]
-            except BadFunctionCallOutput:
-                self.log.warning(
-                    'received ChannelCloseRequested event for a channel that doesn\'t '
-                    'exist or has been closed already (sender=%s open_block_number=%d)'
-                    % (sender, open_block_number))
-                self.cm.force_close_channel(sender, open_block_number)
-                continue
-            self.log.debug('received ChannelCloseRequested event (sender %s, block number %s)',
-                           sender, open_block_number)
-            try:
-                self.cm.event_channel_close_requested(sender, open_block_number, balance, timeout)
-            except InsufficientBalance:
-                self.log.fatal('Insufficient ETH balance of the receiver. '
-                               "Can't close the channel. "
-                               'Will retry once the balance is sufficient')
-                self.insufficient_balance = True
+        Returns:
+            tuple: (from_block, to_block), or None if there is nothing to fetch
+        """
+        filters_confirmed, filters_unconfirmed = filters
+        from_block = filters_unconfirmed['from_block']
+        if not self.unconfirmed_events.covers(filters_confirmed['from_block'],
+                                              filters_confirmed['to_block']):
+            from_block = min(from_block, filters_confirmed['from_block'])
+        if from_block > filters_unconfirmed['to_block']:
+            return None
+        return from_block, filters_unconfirmed['to_block']
+
+    def get_confirmed_logs(self, filters: tuple, logs: list):
+        """Logs of the confirmed range of an update, taken from `unconfirmed_events` for the
+        blocks it holds and from the fetched `logs` for the others.
+
+        During the initial sync the confirmed range of a chunk starts with the last
+        `n_confirmations` blocks of the previous chunk, which are only buffered.
+        """
+        filters_confirmed = filters[0]
+        from_block, to_block = filters_confirmed['from_block'], filters_confirmed['to_block']
+        buffered = self.unconfirmed_events
+        if buffered.end_block is None:
+            return select_range(logs, from_block, to_block)
+        return (select_range(logs, from_block, min(to_block, buffered.start_block - 1)) +
+                buffered.select(max(from_block, buffered.start_block),
+                                min(to_block, buffered.end_block)) +
+                select_range(logs, max(from_block, buffered.end_block + 1), to_block))
 
-        # update head hash and number
+    def _close_requests(self, close_requested_logs: list):
+        return [
+            (to_checksum_address(log['args']['_sender_address']), self.cm.state.receiver,
+             log['args']['_open_block_number'], log['blockNumber'])
+            for log in close_requested_logs
+        ]
+
+    def get_close_requests(self, filters: tuple, logs: list):
+        """Channels whose `getChannelInfo` `apply_update` reads for the update.
+
+        Returns:
+            list: channels of the confirmed close requests, see `ChannelInfoCache.get_many`
+        """
+        return self._close_requests(select_logs(
+            self.get_confirmed_logs(filters, logs), 'ChannelCloseRequested', filters[0]))
+
+    def apply_update(self, current_block: int, filters: tuple, logs: list,
+                     headers: HeaderCache):
+        """Apply the events of an update and advance the sync state.
+
+        Args:
+            current_block (int): current block number of the node
+            filters (tuple): log filters returned by `get_update_filters`
+            logs (list): decoded logs of the receiver, covering the range returned by
+                `get_fetch_range`
+            headers (HeaderCache): recent headers, updated up to `current_block`
+        """
+        filters_confirmed, filters_unconfirmed = filters
+        new_unconfirmed_head_number = filters_unconfirmed['to_block']
+        new_confirmed_head_number = filters_confirmed['to_block']
+        fetched_from_block = filters_unconfirmed['from_block']
+        if not self.unconfirmed_events.covers(filters_confirmed['from_block'],
+                                              filters_confirmed['to_block']):
+            fetched_from_block = min(fetched_from_block, filters_confirmed['from_block'])
+        confirmed_logs = self.get_confirmed_logs(filters, logs)
+        unconfirmed_created_logs = select_logs(logs, 'ChannelCreated', filters_unconfirmed)
+        created_logs = select_logs(confirmed_logs, 'ChannelCreated', filters_confirmed)
+        unconfirmed_topup_logs = select_logs(logs, 'ChannelToppedUp', filters_unconfirmed)
+        topup_logs = select_logs(confirmed_logs, 'ChannelToppedUp', filters_confirmed)
+        settled_logs = select_logs(confirmed_logs, 'ChannelSettled', filters_confirmed)
+        close_requested_logs = select_logs(confirmed_logs, 'ChannelCloseRequested',
+                                           filters_confirmed)
+        # settle blocks of the closed channels, read with one batch request
+        channel_infos = self.channel_info.get_many(
+            self._close_requests(close_requested_logs), current_block)
+
+        # new head hash and number
         try:
-            new_unconfirmed_head_hash = self.web3.eth.getBlock(new_unconfirmed_head_number).hash
+            new_unconfirmed_head_hash = headers.header(new_unconfirmed_head_number).hash
         except AttributeError:
             self.log.info('chain reorganization detected. '
                             'Resyncing unconfirmed events (unconfirmed_head=%d) [@%d]. ' %
                             new_unconfirmed_head_number)
-            self.cm.reset_unconfirmed()
+            self._reset_unconfirmed()
             new_unconfirmed_head_number = self.cm.state.unconfirmed_head_number
         try:
-            new_unconfirmed_head_hash = self.web3.eth.getBlock(new_unconfirmed_head_number).hash
-            new_confirmed_head_hash = self.web3.eth.getBlock(new_confirmed_head_number).hash
+            new_unconfirmed_head_hash = headers.header(new_unconfirmed_head_number).hash
+            new_confirmed_head_hash = headers.header(new_confirmed_head_number).hash
         except AttributeError:
             self.log.critical("RPC endpoint didn't return proper info for an existing block "
                               "(%d,%d)" % (new_unconfirmed_head_number, new_confirmed_head_number))
@@ -290,12 +598,133 @@ class Blockchain(gevent.Greenlet):
                               "This often happens when Parity is run with --fast or --warp sync.")
             self.log.critical("Can't continue - check status of the ethereum node.")
             sys.exit(1)
-        self.cm.set_head(
-            new_unconfirmed_head_number,
-            new_unconfirmed_head_hash,
-            new_confirmed_head_number,
-            new_confirmed_head_hash
-        )
+        # channels to close on-chain once the events are committed: (close method, sender,
+        # open block number); the transactions are not sent while the state is locked
+        closes = []
+        # apply all events of the range and the new head in one transaction
+        with self.cm.state.transaction():
+            # unconfirmed channel created
+            for log in unconfirmed_created_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                deposit = log['args']['_deposit']
+                open_block_number = log['blockNumber']
+                self.log.debug(
+                    'received unconfirmed ChannelCreated event (sender %s, block number %s)',
+                    sender,
+                    open_block_number
+                )
+                self.cm.unconfirmed_event_channel_opened(sender, open_block_number, deposit)
+
+            # channel created
+            for log in created_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                deposit = log['args']['_deposit']
+                open_block_number = log['blockNumber']
+                self.log.debug('received ChannelOpened event (sender %s, block number %s)',
+                               sender, open_block_number)
+                self.cm.event_channel_opened(sender, open_block_number, deposit)
+
+            # unconfirmed channel top ups
+            for log in unconfirmed_topup_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                txhash = log['transactionHash']
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                open_block_number = log['args']['_open_block_number']
+                added_deposit = log['args']['_added_deposit']
+                self.log.debug(
+                    'received top up event (sender %s, block number %s, deposit %s)',
+                    sender,
+                    open_block_number,
+                    added_deposit
+                )
+                self.cm.unconfirmed_event_channel_topup(
+                    sender,
+                    open_block_number,
+                    txhash,
+                    added_deposit
+                )
+
+            # confirmed channel top ups
+            for log in topup_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                txhash = log['transactionHash']
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                open_block_number = log['args']['_open_block_number']
+                added_deposit = log['args']['_added_deposit']
+                self.log.debug(
+                    'received top up event (sender %s, block number %s, added deposit %s)',
+                    sender,
+                    open_block_number,
+                    added_deposit
+                )
+                self.cm.event_channel_topup(sender, open_block_number, txhash, added_deposit)
+
+            # channel settled event
+            for log in settled_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                open_block_number = log['args']['_open_block_number']
+                self.log.debug('received ChannelSettled event (sender %s, block number %s)',
+                               sender, open_block_number)
+                self.cm.event_channel_settled(sender, open_block_number)
+
+            # channel close requested
+            for log in close_requested_logs:
+                assert is_same_address(log['args']['_receiver_address'], self.cm.state.receiver)
+                sender = log['args']['_sender_address']
+                sender = to_checksum_address(sender)
+                open_block_number = log['args']['_open_block_number']
+                if (sender, open_block_number) not in self.cm.channels:
+                    continue
+                balance = log['args']['_balance']
+                channel_info = channel_infos[sender, self.cm.state.receiver, open_block_number]
+                if channel_info is None:
+                    self.log.warning(
+                        'received ChannelCloseRequested event for a channel that doesn\'t '
+                        'exist or has been closed already (sender=%s open_block_number=%d)'
+                        % (sender, open_block_number))
+                    closes.append((self.cm.force_close_channel, sender, open_block_number))
+                    continue
+                timeout = channel_info[2]
+                self.log.debug(
+                    'received ChannelCloseRequested event (sender %s, block number %s)',
+                    sender, open_block_number
+                )
+                if self.cm.event_channel_close_requested(
+                    sender, open_block_number, balance, timeout
+                ):
+                    # dispute by closing the channel
+                    closes.append((self.cm.close_channel, sender, open_block_number))
+
+            self.cm.set_head(
+                new_unconfirmed_head_number,
+                new_unconfirmed_head_hash,
+                new_confirmed_head_number,
+                new_confirmed_head_hash
+            )
+
+        for close, sender, open_block_number in closes:
+            try:
+                close(sender, open_block_number)
+            except InsufficientBalance:
+                self.log.fatal('Insufficient ETH balance of the receiver. '
+                               "Can't close the channel. "
+                               'Will retry once the balance is sufficient')
+                self.insufficient_balance = True
+            except Exception:
+                # the events are applied already, a failed close doesn't undo them
+                self.log.exception('failed to close the channel (sender %s, block number %s)'
+                                   % (sender, open_block_number))
+        self.unconfirmed_events.add(logs, fetched_from_block, new_unconfirmed_head_number)
+        self.unconfirmed_events.prune(new_confirmed_head_number)
+
         if not self.wait_sync_event.is_set() and new_unconfirmed_head_number == current_block:
             self.log.info('Channel info (recever: {}) sync finished, continue listen ...'.format(self.cm.receiver))
             self.wait_sync_event.set()
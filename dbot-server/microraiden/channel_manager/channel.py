@@ -1,6 +1,6 @@
 import time
 from enum import IntEnum
-from eth_utils import is_address
+from eth_utils import is_address, decode_hex
 
 
 class ChannelState(IntEnum):
@@ -11,6 +11,37 @@ class ChannelState(IntEnum):
 
 
 class Channel(object):
+    __slots__ = (
+        'receiver',
+        'sender',
+        'deposit',
+        'open_block_number',
+        'balance',
+        'state',
+        '_last_signature',
+        'settle_timeout',
+        'ctime',
+        'mtime',
+        'confirmed',
+        '_unconfirmed_topups'
+    )
+
+    FIELDS = (
+        'receiver',
+        'sender',
+        'deposit',
+        'open_block_number',
+        'balance',
+        'state',
+        'last_signature',
+        'settle_timeout',
+        'ctime',
+        'mtime',
+        'confirmed',
+        'unconfirmed_topups'
+    )
+    """tuple: names of the attributes exported by `to_dict`"""
+
     def __init__(self,
                  receiver: str,
                  sender: str,
@@ -20,6 +51,10 @@ class Channel(object):
         """
         A channel between two parties.
 
+        Channels use `__slots__`, keep the last signature as bytes and create their
+        topup map only when it is needed, since receivers may keep hundreds of thousands
+        of them in memory.
+
         Args:
             receiver (str): receiver address
             sender (str): sender address
@@ -37,14 +72,50 @@ class Channel(object):
 
         self.balance = 0  # how much of the deposit has been spent
         self.state = ChannelState.UNDEFINED
-        self.last_signature = None
+        self._last_signature = None  # 65 bytes, hex encoded by `last_signature`
         # if set, this is the absolute block_number the channel can be settled
         self.settle_timeout = -1
         self.ctime = time.time()  # channel creation time
         self.mtime = self.ctime
         self.confirmed = False
 
-        self.unconfirmed_topups = {}  # txhash to added deposit
+        self._unconfirmed_topups = None  # txhash to added deposit, created on first use
+
+    @property
+    def last_signature(self) -> str:
+        """
+        Returns:
+            str: hex encoded signature of the last balance proof, None if there is none
+        """
+        if self._last_signature is None:
+            return None
+        return '0x' + self._last_signature.hex()
+
+    @last_signature.setter
+    def last_signature(self, value: str) -> None:
+        self._last_signature = None if value is None else decode_hex(value)
+
+    @property
+    def unconfirmed_topups(self) -> dict:
+        """
+        Returns:
+            dict: txhash => added deposit of topups that are not confirmed yet
+        """
+        if self._unconfirmed_topups is None:
+            self._unconfirmed_topups = {}
+        return self._unconfirmed_topups
+
+    @unconfirmed_topups.setter
+    def unconfirmed_topups(self, value: dict) -> None:
+        self._unconfirmed_topups = value or None
+
+    @property
+    def has_unconfirmed_topups(self) -> bool:
+        """
+        Returns:
+            bool: True if there are unconfirmed topups, without creating the topup map
+        """
+        return bool(self._unconfirmed_topups)
 
     @property
     def is_closed(self) -> bool:
@@ -65,20 +136,25 @@ class Channel(object):
         Returns:
             int: sum of all deposits, including unconfirmed ones
         """
-        return self.deposit + sum(self.unconfirmed_topups.values())
+        if not self._unconfirmed_topups:
+            return self.deposit
+        return self.deposit + sum(self._unconfirmed_topups.values())
 
     def to_dict(self) -> dict:
         """
         Returns:
             dict: Channel object serialized as a dict
         """
-        return self.__dict__
+        ret = {field: getattr(self, field) for field in self.FIELDS[:-1]}
+        # read the topup map without creating it on channels that have none
+        ret['unconfirmed_topups'] = self._unconfirmed_topups or {}
+        return ret
 
     @classmethod
     def from_dict(cls, state: dict):
-        ret = cls(None, None, None, None)
-        assert (set(state) - set(ret.__dict__)) == set()
+        assert (set(state) - set(cls.FIELDS)) == set()
+        ret = cls(state['receiver'], state['sender'], state['deposit'],
+                  state['open_block_number'])
         for k, v in state.items():
-            if k in ret.__dict__.keys():
-                setattr(ret, k, v)
+            setattr(ret, k, v)
         return ret
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+
+from web3.contract import Contract
+
+from microraiden.utils import call_contract_batch
+
+
+class ChannelInfoCache(object):
+    """`getChannelInfo` of the channel manager contract, read in batches and cached.
+
+    A result is cached per channel with the block number it was read at. It answers
+    requests about events up to that block: the settle block of a channel is set once by
+    its close request and the channel only disappears when it is settled, so a later read
+    returns the same settle block or no channel at all.
+    """
+    size = 4096
+    # calls per JSON-RPC batch, nodes limit the size of a batch
+    batch_size = 500
+
+    def __init__(self, contract: Contract):
+        self.contract = contract
+        # (sender, receiver, open_block_number) => (block number read at, info)
+        self._infos = OrderedDict()
+
+    def get_many(self, channels, block_number: int) -> dict:
+        """Read the info of channels that isn't cached for their block yet at `block_number`.
+
+        Args:
+            channels (list): (sender, receiver, open_block_number, event_block_number) of
+                every channel, the info is read at `event_block_number` or later
+            block_number (int): block to read uncached infos at
+        Returns:
+            dict: (sender, receiver, open_block_number) => tuple of `getChannelInfo`,
+                None if the channel doesn't exist
+        """
+        infos = dict()
+        missing = OrderedDict()
+        for sender, receiver, open_block_number, event_block_number in channels:
+            key = sender, receiver, open_block_number
+            cached = self._infos.get(key)
+            if cached is not None and cached[0] >= event_block_number:
+                self._infos.move_to_end(key)
+                infos[key] = cached[1]
+            else:
+                missing[key] = None
+        missing = list(missing)
+        for i in range(0, len(missing), self.batch_size):
+            keys = missing[i:i + self.batch_size]
+            outputs = call_contract_batch(self.contract, 'getChannelInfo',
+                                          [list(key) for key in keys], block_number)
+            for key, info in zip(keys, outputs):
+                infos[key] = info
+                self._infos[key] = block_number, info
+                self._infos.move_to_end(key)
+        while len(self._infos) > self.size:
+            self._infos.popitem(last=False)
+        return infos
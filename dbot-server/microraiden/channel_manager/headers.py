@@ -0,0 +1,128 @@
+from collections import namedtuple, deque
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from microraiden.utils import batch_request
+
+Header = namedtuple('Header', ['number', 'hash', 'parent_hash'])
+
+
+def make_header(block) -> Header:
+    """Header of a block returned by web3 or of a raw JSON-RPC block."""
+    number = block['number']
+    if isinstance(number, str):
+        number = int(number, 16)
+    return Header(number, HexBytes(block['hash']), HexBytes(block['parentHash']))
+
+
+class HeaderCache(object):
+    """Ring buffer of the most recent block headers of the canonical chain.
+
+    `update` fetches the latest block and walks back over parent hashes until it reaches
+    a known header, so only new blocks (or blocks replaced by a reorganization) are
+    fetched from the node; the parents it expects to be new are fetched with one batch
+    request. Headers outside of the buffer are fetched on every access.
+    """
+
+    def __init__(self, web3: Web3, size: int = 128):
+        assert size > 0
+        self.web3 = web3
+        self.size = size
+        # contiguous headers in ascending block order
+        self._headers = deque(maxlen=size)
+
+    def _fetch(self, block_identifier):
+        block = self.web3.eth.getBlock(block_identifier)
+        if block is None:
+            return None
+        return make_header(block)
+
+    def _fetch_many(self, numbers: list):
+        responses = batch_request(
+            self.web3,
+            [('eth_getBlockByNumber', [hex(number), False]) for number in numbers]
+        )
+        return [
+            make_header(response['result']) if response.get('result') else None
+            for response in responses
+        ]
+
+    def get(self, number: int):
+        """
+        Returns:
+            Header: cached header of block `number`, None if it is not in the buffer
+        """
+        if not self._headers or not self._headers[0].number <= number <= self._headers[-1].number:
+            return None
+        return self._headers[number - self._headers[0].number]
+
+    def header(self, number: int):
+        """
+        Returns:
+            Header: header of the canonical block `number`, None if it doesn't exist
+        """
+        header = self.get(number)
+        if header is None:
+            header = self._fetch(number)
+        return header
+
+    def is_canonical(self, number: int, block_hash) -> bool:
+        """
+        Returns:
+            bool: True if `block_hash` is the hash of block `number` of the canonical chain
+        """
+        header = self.header(number)
+        return header is not None and header.hash == HexBytes(block_hash)
+
+    @property
+    def latest(self):
+        """Header: most recent cached header, None if the buffer is empty"""
+        return self._headers[-1] if self._headers else None
+
+    def update(self, depth: int = 1, latest: Header = None):
+        """Fetch the latest block and all blocks that are new since the last update.
+
+        Args:
+            depth (int, optional): keep at least this many blocks up to the latest one
+            latest (Header, optional): header of the latest block if it is already known,
+                e.g. from a newHeads notification
+        Returns:
+            Header: header of the latest block
+        """
+        depth = min(depth, self.size)
+        if latest is None:
+            latest = self._fetch('latest')
+        if self._headers and latest.number - self._headers[-1].number > self.size:
+            self._headers.clear()
+        new = [latest]
+        # parents that are new unless a reorganization replaced the buffered blocks
+        if self._headers:
+            n_parents = latest.number - self._headers[-1].number - 1
+        else:
+            n_parents = depth - 1
+        n_parents = min(n_parents, latest.number, self.size - 1)
+        if n_parents > 1:
+            numbers = range(latest.number - 1, latest.number - 1 - n_parents, -1)
+            for parent in self._fetch_many(numbers):
+                if parent is None or parent.hash != new[-1].parent_hash:
+                    # the chain changed while fetching, walk back block by block
+                    break
+                new.append(parent)
+        while len(new) < self.size and new[-1].number > 0:
+            child = new[-1]
+            parent = self.get(child.number - 1)
+            if parent is not None and parent.hash == child.parent_hash:
+                break
+            below_buffer = not self._headers or child.number - 1 < self._headers[0].number
+            if below_buffer and len(new) >= depth:
+                break
+            # the parent is a new block or has been replaced by a reorganization
+            new.append(self._fetch(child.number - 1))
+        lowest = new[-1].number
+        while self._headers and self._headers[-1].number >= lowest:
+            self._headers.pop()
+        if self._headers and self._headers[-1].number + 1 != lowest:
+            self._headers.clear()
+        self._headers.extend(reversed(new))
+        return latest
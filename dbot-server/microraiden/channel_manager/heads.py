@@ -0,0 +1,204 @@
+"""Push notifications of new blocks with an `eth_subscribe('newHeads')` subscription."""
+import json
+import logging
+from urllib.parse import urlparse
+
+import gevent
+import gevent.event
+import websocket
+from gevent import socket, ssl
+
+from .headers import Header, make_header
+
+
+class WebsocketStream(object):
+    """Client end of a WebSocket connection that sends and receives text messages.
+
+    The protocol is handled by `websocket-client` on a gevent socket, so that waiting for
+    a message only blocks the calling greenlet.
+    """
+
+    def __init__(self, uri: str, timeout: float):
+        parts = urlparse(uri)
+        secure = parts.scheme == 'wss'
+        self.sock = socket.create_connection(
+            (parts.hostname, parts.port or (443 if secure else 80)), timeout)
+        if secure:
+            context = ssl.create_default_context()
+            self.sock = context.wrap_socket(self.sock, server_hostname=parts.hostname)
+        try:
+            self.ws = websocket.create_connection(uri, timeout=timeout, socket=self.sock)
+        except websocket.WebSocketException as e:
+            self.sock.close()
+            raise ConnectionError('websocket handshake with %s failed: %s' % (uri, e))
+        # notifications arrive at the pace of new blocks
+        self.ws.settimeout(None)
+
+    def send(self, message: str):
+        try:
+            self.ws.send(message)
+        except websocket.WebSocketException as e:
+            raise ConnectionError(str(e))
+
+    def recv(self):
+        """
+        Returns:
+            str: next text message, control frames are handled on the way
+        """
+        try:
+            message = self.ws.recv()
+        except websocket.WebSocketException as e:
+            raise ConnectionError(str(e))
+        if not message:
+            # the node sent a close frame
+            raise ConnectionError('connection closed by the node')
+        return message
+
+    def close(self):
+        self.sock.close()
+
+
+class IPCStream(object):
+    """Connection to the IPC socket of a node, a stream of concatenated JSON messages."""
+
+    def __init__(self, path: str, timeout: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path)
+        self.sock.settimeout(None)
+        self._buffer = ''
+        self._decoder = json.JSONDecoder()
+
+    def send(self, message: str):
+        self.sock.sendall(message.encode())
+
+    def recv(self):
+        while True:
+            data = self._buffer.lstrip()
+            if data:
+                try:
+                    message, end = self._decoder.raw_decode(data)
+                except ValueError:
+                    pass
+                else:
+                    self._buffer = data[end:]
+                    return json.dumps(message)
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise ConnectionError('connection closed by the node')
+            self._buffer += chunk.decode()
+
+    def close(self):
+        self.sock.close()
+
+
+class NewHeads(gevent.Greenlet):
+    """Follows the new blocks of a node with an `eth_subscribe('newHeads')` subscription.
+
+    The subscription is made over a WebSocket (ws://, wss://) or IPC endpoint. Pollers
+    `wait` for the next head instead of sleeping a fixed interval, so they process a
+    block as soon as the node has it. While the subscription is down, `wait` returns
+    after the poller's own interval and the subscription is retried every
+    `reconnect_interval` seconds.
+    """
+    reconnect_interval = 10
+    connect_timeout = 10
+    # poll at least this often while subscribed, in case the subscription stalls
+    max_idle_interval = 30
+
+    def __init__(self, endpoint_uri: str):
+        gevent.Greenlet.__init__(self)
+        self.endpoint_uri = endpoint_uri
+        self.log = logging.getLogger('new_heads')
+        # header of the most recent notification
+        self.head = None
+        self.subscribed = False
+        self.running = False
+        self._stream = None
+        self._new_head = gevent.event.Event()
+
+    def _connect(self):
+        if urlparse(self.endpoint_uri).scheme in ('ws', 'wss'):
+            return WebsocketStream(self.endpoint_uri, self.connect_timeout)
+        return IPCStream(self.endpoint_uri, self.connect_timeout)
+
+    def _run(self):
+        self.running = True
+        while self.running:
+            try:
+                self._follow()
+            except (OSError, ValueError, KeyError) as e:
+                if self.running:
+                    self.log.warning(
+                        'newHeads subscription at %s failed (%s), polling for new blocks. '
+                        'Retrying in %d seconds.' %
+                        (self.endpoint_uri, e, self.reconnect_interval)
+                    )
+            finally:
+                self._set_subscribed(False)
+            if self.running:
+                gevent.sleep(self.reconnect_interval)
+        self.log.info('stopped following new blocks at %s' % self.endpoint_uri)
+
+    def _follow(self):
+        self._stream = stream = self._connect()
+        try:
+            stream.send(json.dumps({
+                'jsonrpc': '2.0',
+                'id': 1,
+                'method': 'eth_subscribe',
+                'params': ['newHeads']
+            }))
+            subscription = None
+            while self.running:
+                message = json.loads(stream.recv())
+                if message.get('id') == 1:
+                    if 'error' in message:
+                        raise ValueError(message['error'])
+                    subscription = message['result']
+                    self.log.info('following new blocks at %s' % self.endpoint_uri)
+                    self._set_subscribed(True)
+                elif (message.get('method') == 'eth_subscription' and
+                        message['params']['subscription'] == subscription):
+                    self._notify(make_header(message['params']['result']))
+        finally:
+            self._stream = None
+            stream.close()
+
+    def _wake(self):
+        new_head, self._new_head = self._new_head, gevent.event.Event()
+        new_head.set()
+
+    def _notify(self, header: Header):
+        self.head = header
+        self._wake()
+
+    def _set_subscribed(self, subscribed: bool):
+        if self.subscribed != subscribed:
+            self.subscribed = subscribed
+            # waiters switch between the idle and the poll interval
+            self._wake()
+
+    def stop(self):
+        self.running = False
+        if self._stream is not None:
+            self._stream.close()
+
+    def wait(self, latest: Header, poll_interval: float):
+        """Wait for a head other than `latest`.
+
+        Args:
+            latest (Header): most recent header the caller has processed, or None
+            poll_interval (float): seconds to wait while there is no subscription
+        Returns:
+            Header: the new head, None if the caller has to poll the node for it
+        """
+        head = self.head
+        if self.subscribed and head is not None and head != latest and \
+                (latest is None or head.number >= latest.number):
+            return head
+        new_head = self._new_head
+        new_head.wait(self.max_idle_interval if self.subscribed else poll_interval)
+        if new_head.is_set() and self.subscribed:
+            return self.head
+        return None
@@ -0,0 +1,37 @@
+"""Per-channel locks for serializing payments on the same channel."""
+from contextlib import contextmanager
+
+import gevent.lock
+
+
+class ChannelLocks(object):
+    """Lock table keyed by (sender, open_block_number).
+
+    A lock is created when a channel is first locked and dropped again once no greenlet
+    holds or waits for it, so the table only grows with the number of channels that are
+    in use at the same time. Locks are reentrant, a greenlet holding a channel lock can
+    lock the same channel again.
+    """
+
+    def __init__(self):
+        # (sender, open_block_number) => [lock, number of holders and waiters]
+        self._locks = dict()
+
+    @contextmanager
+    def lock(self, sender: str, open_block_number: int):
+        """Hold the lock of a channel for the duration of the block."""
+        key = sender, open_block_number
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [gevent.lock.RLock(), 0]
+        entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
@@ -16,7 +16,8 @@ from web3 import Web3
 from web3.contract import Contract
 
 from microraiden.utils import (
-    verify_balance_proof,
+    BalanceProofVerifier,
+    CryptoExecutor,
     privkey_to_addr,
     sign_close,
     create_signed_contract_transaction
@@ -35,8 +36,13 @@ from microraiden.exceptions import (
     ReceiverAddrMismatchPrivateKey
 )
 from .state import ChannelManagerState
+from .store import ChannelStateStore
 from .blockchain import Blockchain
+from .watcher import ChainWatcher
+from .heads import NewHeads
 from .channel import Channel, ChannelState
+from .locks import ChannelLocks
+from .proofs import VerifiedProofs
 
 log = logging.getLogger(__name__)
 
@@ -51,14 +57,21 @@ class ChannelManager(gevent.Greenlet):
             receiver: str,
             private_key: str,
             state_filename: str = None,
-            n_confirmations=1
+            n_confirmations=1,
+            state_options: dict = None,
+            state_store: ChannelStateStore = None,
+            chain_watcher: ChainWatcher = None,
+            new_heads: NewHeads = None,
+            crypto_executor: CryptoExecutor = None
     ) -> None:
         gevent.Greenlet.__init__(self)
         self.blockchain = Blockchain(
             web3,
             channel_manager_contract,
             self,
-            n_confirmations=n_confirmations
+            n_confirmations=n_confirmations,
+            watcher=chain_watcher,
+            new_heads=new_heads
         )
         pk_address = privkey_to_addr(private_key)
         bytecode = web3.eth.getCode(Web3.toChecksumAddress(receiver))
@@ -80,15 +93,33 @@ class ChannelManager(gevent.Greenlet):
                         receiver, pk_address))
             self.receiver = pk_address
         self.private_key = private_key
+        self.channel_locks = ChannelLocks()
         self.channel_manager_contract = channel_manager_contract
+        self.balance_proof_verifier = BalanceProofVerifier(
+            self.receiver,
+            channel_manager_contract.address
+        )
+        # signature recovery and signing run here, off the hub if it has a thread pool
+        self.crypto_executor = crypto_executor or CryptoExecutor()
+        # signers of recent proofs, a resent or re-verified proof is recovered once
+        self.verified_proofs = VerifiedProofs()
         self.n_confirmations = n_confirmations
         self.log = logging.getLogger('channel_manager')
         network_id = int(web3.version.network)
+        state_options = state_options or {}
+        self.state_store = state_store
 
-        if state_filename not in (None, ':memory:') and os.path.isfile(state_filename):
-            self.state = ChannelManagerState.load(state_filename)
+        if state_store is not None:
+            # the state of all receivers is kept in one database, locked by the store
+            self.state = state_store.open_state(
+                self.receiver,
+                network_id,
+                channel_manager_contract.address
+            )
+        elif state_filename not in (None, ':memory:') and os.path.isfile(state_filename):
+            self.state = ChannelManagerState.load(state_filename, **state_options)
         else:
-            self.state = ChannelManagerState(state_filename)
+            self.state = ChannelManagerState(state_filename, **state_options)
             self.state.setup_db(
                 network_id,
                 channel_manager_contract.address,
@@ -96,7 +127,7 @@ class ChannelManager(gevent.Greenlet):
             )
 
         assert self.state is not None
-        if state_filename not in (None, ':memory:'):
+        if state_store is None and state_filename not in (None, ':memory:'):
             self.lock_state = filelock.FileLock(state_filename + '.lock')
             try:
                 self.lock_state.acquire(timeout=0)
@@ -125,9 +156,18 @@ class ChannelManager(gevent.Greenlet):
         self.blockchain.start()
 
     def stop(self):
+        if getattr(self, 'stopped', False):
+            return
         if self.blockchain.running:
             self.blockchain.stop()
             self.blockchain.join()
+        # the state is not set if the constructor failed
+        if getattr(self, 'state', None) is not None:
+            if self.state_store is not None:
+                self.state_store.release(self.state)
+            else:
+                self.state.flush()
+        self.stopped = True
 
     def set_head(self,
                  unconfirmed_head_number: int,
@@ -180,8 +220,14 @@ class ChannelManager(gevent.Greenlet):
         settle_timeout: int
     ):
         """Notify the channel manager that a the closing of a channel has been requested.
+
+        A close request with less than the registered balance is not applied; the caller
+        disputes it with `close_channel`, which sends a transaction and should not be
+        called while a state transaction is open.
         Params:
-            settle_timeout (int):   settle timeout in blocks"""
+            settle_timeout (int):   settle timeout in blocks
+        Returns:
+            bool: True if the close request must be disputed"""
         assert is_checksum_address(sender)
         assert settle_timeout >= 0
         if (sender, open_block_number) not in self.channels:
@@ -190,13 +236,13 @@ class ChannelManager(gevent.Greenlet):
                 sender,
                 open_block_number
             )
-            return
+            return False
         c = self.channels[sender, open_block_number]
         if c.balance > balance:
             self.log.warning('sender tried to cheat, sending challenge '
                              '(sender %s, block number %s)',
                              sender, open_block_number)
-            self.close_channel(sender, open_block_number)  # dispute by closing the channel
+            return True
         else:
             self.log.info('valid channel close request received '
                           '(sender %s, block number %s, timeout %d)',
@@ -206,6 +252,7 @@ class ChannelManager(gevent.Greenlet):
             c.confirmed = True
             c.mtime = time.time()
         self.state.set_channel(c)
+        return False
 
     def event_channel_settled(self, sender, open_block_number):
         """Notify the channel manager that a channel has been settled."""
@@ -248,7 +295,8 @@ class ChannelManager(gevent.Greenlet):
             )
             return None
         c.deposit += added_deposit
-        c.unconfirmed_topups.pop(txhash, None)
+        if c.has_unconfirmed_topups:
+            c.unconfirmed_topups.pop(txhash, None)
         c.mtime = time.time()
         self.state.set_channel(c)
 
@@ -270,12 +318,15 @@ class ChannelManager(gevent.Greenlet):
         c = self.channels[sender, open_block_number]
         if c.last_signature is None:
             raise NoBalanceProofReceived('Cannot close a channel without a balance proof.')
+        # payments may arrive while the signature is computed
+        balance, balance_sig = c.balance, c.last_signature
         # send closing tx
-        closing_sig = sign_close(
+        closing_sig = self.crypto_executor.submit(
+            sign_close,
             self.private_key,
             sender,
             open_block_number,
-            c.balance,
+            balance,
             self.channel_manager_contract.address
         )
 
@@ -286,8 +337,8 @@ class ChannelManager(gevent.Greenlet):
             [
                 self.state.receiver,
                 open_block_number,
-                c.balance,
-                decode_hex(c.last_signature),
+                balance,
+                decode_hex(balance_sig),
                 closing_sig
             ]
         )
@@ -337,11 +388,12 @@ class ChannelManager(gevent.Greenlet):
             raise InvalidBalanceProof('Requested closing balance does not match latest one.')
         #  c.is_closed = True
         c.mtime = time.time()
-        receiver_sig = sign_close(
+        receiver_sig = self.crypto_executor.submit(
+            sign_close,
             self.private_key,
             sender,
             open_block_number,
-            c.balance,
+            balance,
             self.channel_manager_contract.address
         )
         self.state.set_channel(c)
@@ -351,7 +403,7 @@ class ChannelManager(gevent.Greenlet):
 
     def get_locked_balance(self):
         """Get the balance in all channels combined."""
-        return sum([c.balance for c in self.channels.values()])
+        return self.state.locked_balance
 
     #  def get_liquid_balance(self):
     #      """Get the balance of the receiver in the token contract (not locked in channels)."""
@@ -376,27 +428,42 @@ class ChannelManager(gevent.Greenlet):
                 '(sender=%s, open_block_number=%d)' % (sender, open_block_number))
         try:
             c = self.channels[sender, open_block_number]
-            print(c.to_dict())
         except KeyError:
             raise NoOpenChannel('Channel does not exist or has been closed'
                                 '(sender=%s, open_block_number=%s)' % (sender, open_block_number))
         if c.is_closed:
             raise NoOpenChannel('Channel closing has been requested already.')
 
-        if not is_same_address(
-                verify_balance_proof(
-                    self.receiver,
-                    open_block_number,
-                    balance,
-                    decode_hex(signature),
-                    self.channel_manager_contract.address
-                ),
-                sender
-        ):
+        signature = decode_hex(signature)
+        signer = self.verified_proofs.get(balance, signature)
+        if signer is None:
+            signer = self.crypto_executor.submit(
+                self.balance_proof_verifier.verify_balance_proof,
+                balance,
+                signature
+            )
+            self.verified_proofs.add(balance, signature, signer)
+        if not is_same_address(signer, sender):
             raise InvalidBalanceProof('Recovered signer does not match the sender')
         return c
 
-    def register_payment(self, sender: str, open_block_number: int, balance: int, signature: str):
+    def lock_channel(self, sender: str, open_block_number: int):
+        """Context manager holding the lock of a channel.
+
+        Payments on the same channel are linearized by it, payments on different channels
+        do not wait for each other.
+        """
+        return self.channel_locks.lock(sender, open_block_number)
+
+    def register_payment(
+        self,
+        sender: str,
+        open_block_number: int,
+        balance: int,
+        signature: str,
+        expected_balance: int = None,
+        min_balance: int = None
+    ):
         """Register a payment.
         Method will try to reconstruct (verify) balance update data
         with a signature sent by the client.
@@ -406,30 +473,43 @@ class ChannelManager(gevent.Greenlet):
             open_block_number (int):    block the channel was opened in
             balance (int):              updated balance
             signature(str):             balance proof to verify
+            expected_balance (int):     if set, the payment is only registered if
+                                        the current balance of the channel equals it
+            min_balance (int):          if set, the balance only has to be greater than
+                                        this instead of the current balance, a paid
+                                        session returns its unused credit this way
         """
         assert is_checksum_address(sender)
-        c = self.verify_balance_proof(sender, open_block_number, balance, signature)
-        if balance <= c.balance:
-            raise InvalidBalanceAmount('The balance must not decrease.')
-        if balance > c.deposit:
-            raise InvalidBalanceProof('Balance must not be greater than deposit')
-        received = balance - c.balance
-        c.balance = balance
-        c.last_signature = signature
-        c.mtime = time.time()
-        self.state.set_channel(c)
+        with self.lock_channel(sender, open_block_number):
+            c = self.verify_balance_proof(sender, open_block_number, balance, signature)
+            if expected_balance is None:
+                expected_balance = c.balance
+            if min_balance is None:
+                min_balance = expected_balance
+            if balance <= min_balance:
+                raise InvalidBalanceAmount('The balance must not decrease.')
+            if balance > c.deposit:
+                raise InvalidBalanceProof('Balance must not be greater than deposit')
+            received = balance - expected_balance
+            if self.state.compare_and_set_balance(
+                    sender, open_block_number, expected_balance, balance, signature
+            ) is None:
+                raise InvalidBalanceAmount('The balance has been changed by another payment.')
         self.log.debug('registered payment (sender %s, block number %s, new balance %s)',
                        c.sender, open_block_number, balance)
         return c.sender, received
 
     def reset_unconfirmed(self):
         """Forget all unconfirmed channels and topups to allow for a clean resync."""
-        self.state.del_unconfirmed_channels()
-        for channel in self.channels.values():
-            channel.unconfirmed_topups.clear()
-            self.state.set_channel(channel)
-        self.state.unconfirmed_head_number = self.state.confirmed_head_number
-        self.state.unconfirmed_head_hash = self.state.confirmed_head_hash
+        with self.state.transaction():
+            self.state.del_unconfirmed_channels()
+            for channel in list(self.channels.values()):
+                channel.unconfirmed_topups = None
+                self.state.set_channel(channel)
+            self.state.update_sync_state(
+                unconfirmed_head_number=self.state.confirmed_head_number,
+                unconfirmed_head_hash=self.state.confirmed_head_hash
+            )
 
     @property
     def channels(self):
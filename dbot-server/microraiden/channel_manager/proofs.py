@@ -0,0 +1,38 @@
+from collections import OrderedDict
+
+
+class VerifiedProofs(object):
+    """Bounded LRU of the signers recovered from the balance proofs of one receiver.
+
+    A proof is keyed by its signature and balance, the other fields of the signed
+    message are the receiver and contract, which are the same for all proofs of a
+    channel manager. Clients that resend a proof, and a payment that is verified before
+    and while it is registered, recover the signer once.
+    """
+    size = 16384
+
+    def __init__(self, size: int = None):
+        if size is not None:
+            self.size = size
+        # (signature, balance) => signer address
+        self._signers = OrderedDict()
+
+    def __len__(self):
+        return len(self._signers)
+
+    def get(self, balance: int, signature: bytes):
+        """
+        Returns:
+            str: signer recovered from the proof, None if the proof isn't cached
+        """
+        key = signature, balance
+        signer = self._signers.get(key)
+        if signer is not None:
+            self._signers.move_to_end(key)
+        return signer
+
+    def add(self, balance: int, signature: bytes, signer: str):
+        self._signers[signature, balance] = signer
+        self._signers.move_to_end((signature, balance))
+        if len(self._signers) > self.size:
+            self._signers.popitem(last=False)
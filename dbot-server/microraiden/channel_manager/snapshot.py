@@ -0,0 +1,192 @@
+"""Snapshots of a receiver's channel state, to restore or move a receiver without a resync.
+
+A snapshot holds the confirmed channels and the confirmed head of a state. It is a gzipped
+JSON document with the sha256 of its canonical encoding, so a truncated or edited file is
+rejected on import. Unconfirmed channels and topups are not included; after an import they
+are synced again from the block after the checkpoint.
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+
+from eth_utils import encode_hex, is_same_address
+from hexbytes import HexBytes
+from web3 import Web3
+
+from microraiden.exceptions import InvalidStateSnapshot
+from .state import ChannelManagerState
+from .channel import Channel, ChannelState
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 'dbot-channel-state'
+SNAPSHOT_VERSION = 1
+
+# columns of a channel row in the snapshot, deposit and balance are decimal strings
+CHANNEL_COLUMNS = (
+    'sender',
+    'open_block_number',
+    'deposit',
+    'balance',
+    'state',
+    'last_signature',
+    'settle_timeout',
+    'ctime',
+    'mtime'
+)
+
+
+def _canonical(body: dict) -> bytes:
+    return json.dumps(body, sort_keys=True, separators=(',', ':')).encode()
+
+
+def _channel_row(channel: Channel):
+    return [
+        channel.sender,
+        channel.open_block_number,
+        str(channel.deposit),
+        str(channel.balance),
+        channel.state.value,
+        channel.last_signature,
+        channel.settle_timeout,
+        channel.ctime,
+        channel.mtime
+    ]
+
+
+def _row_channel(receiver: str, row: list):
+    fields = dict(zip(CHANNEL_COLUMNS, row))
+    channel = Channel(receiver, fields['sender'], int(fields['deposit']),
+                      fields['open_block_number'])
+    channel.balance = int(fields['balance'])
+    channel.state = ChannelState(fields['state'])
+    channel.last_signature = fields['last_signature']
+    channel.settle_timeout = fields['settle_timeout']
+    channel.ctime = fields['ctime']
+    channel.mtime = fields['mtime']
+    channel.confirmed = True
+    return channel
+
+
+def export_snapshot(state: ChannelManagerState, filename: str):
+    """Write the confirmed channels and the confirmed head of `state` to `filename`.
+
+    Deferred balance updates are flushed first. The file is replaced atomically and is
+    readable by the owner only, since it contains the balance proofs of the channels.
+
+    Returns:
+        dict: the snapshot as written
+    """
+    if state.confirmed_head_number is None or state.confirmed_head_hash is None:
+        raise InvalidStateSnapshot('state of %s has not been synced yet' % state.receiver)
+    state.flush()
+    channels = sorted(state.channels.values(),
+                      key=lambda channel: (channel.sender, channel.open_block_number))
+    body = {
+        'network_id': state.network_id,
+        'contract_address': state.contract_address,
+        'receiver': state.receiver,
+        'confirmed_head_number': state.confirmed_head_number,
+        'confirmed_head_hash': encode_hex(HexBytes(state.confirmed_head_hash)),
+        'created': time.time(),
+        'columns': list(CHANNEL_COLUMNS),
+        'channels': [_channel_row(channel) for channel in channels]
+    }
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'version': SNAPSHOT_VERSION,
+        'sha256': hashlib.sha256(_canonical(body)).hexdigest(),
+        'body': body
+    }
+    tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    fd = os.open(tmp_filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as fh, gzip.GzipFile(fileobj=fh, mode='wb') as gz:
+            gz.write(_canonical(snapshot))
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
+    log.info('exported %d channels of %s at block %d to %s' % (
+        len(channels), state.receiver, state.confirmed_head_number, filename))
+    return snapshot
+
+
+def read_snapshot(filename: str):
+    """Read and verify a snapshot written by `export_snapshot`.
+
+    Returns:
+        dict: body of the snapshot
+    Raises:
+        InvalidStateSnapshot: the file isn't a snapshot or its checksum doesn't match
+    """
+    try:
+        with gzip.open(filename, 'rb') as gz:
+            snapshot = json.loads(gz.read().decode())
+    except (OSError, EOFError, ValueError) as e:
+        raise InvalidStateSnapshot('%s is not a readable snapshot: %s' % (filename, e))
+    if not isinstance(snapshot, dict) or snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise InvalidStateSnapshot('%s is not a channel state snapshot' % filename)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise InvalidStateSnapshot('unsupported snapshot version %s' % snapshot.get('version'))
+    body = snapshot.get('body')
+    if not isinstance(body, dict) or \
+            hashlib.sha256(_canonical(body)).hexdigest() != snapshot.get('sha256'):
+        raise InvalidStateSnapshot('checksum of %s does not match' % filename)
+    if body['columns'] != list(CHANNEL_COLUMNS):
+        raise InvalidStateSnapshot('unexpected channel columns %s' % body['columns'])
+    return body
+
+
+def verify_snapshot_chain(web3: Web3, snapshot: dict):
+    """Check that the checkpoint of a snapshot is a block of the node's canonical chain.
+
+    Raises:
+        InvalidStateSnapshot: the snapshot is of another network or its checkpoint block
+            has been replaced by a reorg
+    """
+    network_id = int(web3.version.network)
+    if network_id != snapshot['network_id']:
+        raise InvalidStateSnapshot('snapshot is of network %d, the node is on network %d' %
+                                   (snapshot['network_id'], network_id))
+    block = web3.eth.getBlock(snapshot['confirmed_head_number'])
+    if block is None or HexBytes(block['hash']) != HexBytes(snapshot['confirmed_head_hash']):
+        raise InvalidStateSnapshot('checkpoint block %d %s is not on the canonical chain' %
+                                   (snapshot['confirmed_head_number'],
+                                    snapshot['confirmed_head_hash']))
+
+
+def import_snapshot(state: ChannelManagerState, snapshot: dict):
+    """Load a snapshot into a state without channels and set its heads to the checkpoint.
+
+    The state must have been set up for the receiver and contract of the snapshot. Channel
+    events after the checkpoint are synced when the channel manager is started.
+
+    Raises:
+        InvalidStateSnapshot: the snapshot is of another receiver, contract or network,
+            or the state has channels already
+    """
+    for field, same in (('receiver', is_same_address),
+                        ('contract_address', is_same_address),
+                        ('network_id', int.__eq__)):
+        if not same(getattr(state, field), snapshot[field]):
+            raise InvalidStateSnapshot('snapshot %s %s does not match the state %s %s' %
+                                       (field, snapshot[field], field, getattr(state, field)))
+    if state.n_channels > 0:
+        raise InvalidStateSnapshot('state of %s has %d channels, refusing to overwrite them' %
+                                   (state.receiver, state.n_channels))
+    head_hash = HexBytes(snapshot['confirmed_head_hash'])
+    with state.transaction():
+        for row in snapshot['channels']:
+            state.add_channel(_row_channel(state.receiver, row))
+        state.update_sync_state(
+            confirmed_head_number=snapshot['confirmed_head_number'],
+            confirmed_head_hash=head_hash,
+            unconfirmed_head_number=snapshot['confirmed_head_number'],
+            unconfirmed_head_hash=head_hash
+        )
+    log.info('imported %d channels of %s, resuming at block %d' % (
+        len(snapshot['channels']), state.receiver, snapshot['confirmed_head_number']))
@@ -3,7 +3,16 @@
 # import shutil
 import sqlite3
 import os
+import sys
+import time
 import logging
+from collections import Counter
+from contextlib import contextmanager
+from enum import Enum
+from types import MappingProxyType
+
+import gevent
+import gevent.lock
 from eth_utils import is_address
 
 from microraiden.utils import check_permission_safety
@@ -71,102 +80,448 @@ INSERT INTO `syncstate` VALUES (
 );
 """
 
+# secondary indexes for channel listings, sender lookups are served by the primary key;
+# listings of all states are read in (sender, open_block_number) order without a sort
+INDEX_CREATION_SQL = """
+CREATE INDEX IF NOT EXISTS `channels_state`
+    ON `channels` (`confirmed`, `state`, `sender`, `open_block_number`);
+CREATE INDEX IF NOT EXISTS `channels_sender`
+    ON `channels` (`confirmed`, `sender`, `open_block_number`);
+"""
+
 UPDATE_METADATA_SQL = """
 UPDATE `metadata` SET
-    `network_id` = ?,
-    `contract_address` = ?,
-    `receiver` = ?;
+    `network_id` = :network_id,
+    `contract_address` = :contract_address,
+    `receiver` = :receiver;
+"""
+
+SELECT_METADATA_SQL = """
+SELECT `network_id`, `contract_address`, `receiver` FROM `metadata`;
+"""
+
+SELECT_SYNCSTATE_SQL = """
+SELECT `confirmed_head_number`, `confirmed_head_hash`,
+       `unconfirmed_head_number`, `unconfirmed_head_hash`
+FROM `syncstate`;
 """
 
 UPDATE_SYNCSTATE_SQL = {
-    'confirmed_head_number': 'UPDATE `syncstate` SET `confirmed_head_number` = ?;',
-    'confirmed_head_hash': 'UPDATE `syncstate` SET `confirmed_head_hash` = ?;',
-    'unconfirmed_head_number': 'UPDATE `syncstate` SET `unconfirmed_head_number` = ?;',
-    'unconfirmed_head_hash': 'UPDATE `syncstate` SET `unconfirmed_head_hash` = ?;'
+    'confirmed_head_number': 'UPDATE `syncstate` SET `confirmed_head_number` = :value;',
+    'confirmed_head_hash': 'UPDATE `syncstate` SET `confirmed_head_hash` = :value;',
+    'unconfirmed_head_number': 'UPDATE `syncstate` SET `unconfirmed_head_number` = :value;',
+    'unconfirmed_head_hash': 'UPDATE `syncstate` SET `unconfirmed_head_hash` = :value;'
 }
 
 ADD_CHANNEL_SQL = """
-INSERT OR REPLACE INTO `channels` VALUES (
-    ?,
-    ?,
-    ?,
-    ?,
-    ?,
-    ?,
-    ?,
-    ?,
-    ?,
-    ?
+INSERT OR REPLACE INTO `channels` (
+    `sender`,
+    `open_block_number`,
+    `deposit`,
+    `balance`,
+    `last_signature`,
+    `settle_timeout`,
+    `mtime`,
+    `ctime`,
+    `state`,
+    `confirmed`
+) VALUES (
+    :sender,
+    :open_block_number,
+    :deposit,
+    :balance,
+    :last_signature,
+    :settle_timeout,
+    :mtime,
+    :ctime,
+    :state,
+    :confirmed
 )
 """
 
 UPDATE_CHANNEL_SQL = """
 UPDATE `channels` SET
-    `deposit` = ?,
-    `balance` = ?,
-    `last_signature` = ?,
-    `settle_timeout` = ?,
-    `mtime` = ?,
-    `state` = ?
-WHERE `sender` = ? AND `open_block_number` = ?;
+    `deposit` = :deposit,
+    `balance` = :balance,
+    `last_signature` = :last_signature,
+    `settle_timeout` = :settle_timeout,
+    `mtime` = :mtime,
+    `state` = :state
+WHERE `sender` = :sender AND `open_block_number` = :open_block_number;
+"""
+
+UPDATE_BALANCE_SQL = """
+UPDATE `channels` SET
+    `balance` = :balance,
+    `last_signature` = :last_signature,
+    `mtime` = :mtime
+WHERE `sender` = :sender AND `open_block_number` = :open_block_number;
+"""
+
+SET_CHANNEL_STATE_SQL = """
+UPDATE `channels` SET `state` = :state
+WHERE `sender` = :sender AND `open_block_number` = :open_block_number;
+"""
+
+CHANNEL_ROWID_SQL = """
+SELECT rowid FROM `channels` WHERE `sender` = :sender AND `open_block_number` = :open_block_number;
+"""
+
+# payment journal, every balance proof received is appended here in `WriteMode.JOURNAL`
+# and folded into `channels` by the compactor; `compacted_id` is the last folded record
+JOURNAL_CREATION_SQL = """
+-- balance is TEXT so that uint256 values are stored without numeric conversion
+CREATE TABLE IF NOT EXISTS `payments` (
+    `id`                INTEGER         PRIMARY KEY AUTOINCREMENT,
+    `sender`            CHAR(42)        NOT NULL,
+    `open_block_number` INTEGER         NOT NULL,
+    `balance`           TEXT            NOT NULL,
+    `signature`         CHAR(132)       NOT NULL,
+    `mtime`             INTEGER         NOT NULL
+);
+CREATE TABLE IF NOT EXISTS `journalstate` (
+    `compacted_id`      INTEGER         NOT NULL
+);
+INSERT INTO `journalstate` SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM `journalstate`);
+"""
+
+APPEND_PAYMENT_SQL = """
+INSERT INTO `payments` (`sender`, `open_block_number`, `balance`, `signature`, `mtime`)
+VALUES (:sender, :open_block_number, :balance, :last_signature, :mtime);
+"""
+
+JOURNAL_TAIL_SQL = """
+SELECT `id`, `sender`, `open_block_number`, `balance`, `signature`, `mtime` FROM `payments`
+WHERE `id` > (SELECT `compacted_id` FROM `journalstate`)
+ORDER BY `id`;
 """
 
 DEL_CHANNEL_SQL = """
-DELETE FROM `channels` WHERE `sender` = ? AND `open_block_number` = ?"""
+DELETE FROM `channels` WHERE `sender` = :sender AND `open_block_number` = :open_block_number"""
+
+# statements used by `ChannelManagerState`, named parameters that a statement does not
+# use are ignored, so states sharing a database can pass their scope with every statement
+CHANNEL_STATE_SQL = MappingProxyType({
+    'update_metadata': UPDATE_METADATA_SQL,
+    'select_metadata': SELECT_METADATA_SQL,
+    'select_syncstate': SELECT_SYNCSTATE_SQL,
+    'update_syncstate': UPDATE_SYNCSTATE_SQL,
+    'add_channel': ADD_CHANNEL_SQL,
+    'update_balance': UPDATE_BALANCE_SQL,
+    'set_channel_state': SET_CHANNEL_STATE_SQL,
+    'channel_rowid': CHANNEL_ROWID_SQL,
+    'del_channel': DEL_CHANNEL_SQL,
+    'del_unconfirmed_channels': 'DELETE FROM `channels` WHERE `confirmed` = 0',
+    'select_channels': 'SELECT rowid, * FROM `channels`',
+    'select_topups': 'SELECT `channel_rowid`, `txhash`, `deposit` FROM `topups`',
+    # condition of `query_channels`, followed by its optional filters
+    'query_channels': 'SELECT `sender`, `open_block_number` FROM `channels` '
+                      'WHERE `confirmed` = :confirmed',
+    'append_payment': APPEND_PAYMENT_SQL,
+    'journal_tail': JOURNAL_TAIL_SQL,
+    'advance_journal': 'UPDATE `journalstate` SET `compacted_id` = :compacted_id'
+})
+
+
+class WriteMode(Enum):
+    """How payments are written to the state database."""
+    # every payment is committed (and synced to disk) before it is accepted
+    STRICT = 'strict'
+    # WAL journal, payments are committed and synced to disk together every
+    # `commit_interval` seconds
+    GROUP = 'group'
+    # every payment is appended to the `payments` journal before it is accepted,
+    # the journal is folded into `channels` every `compact_interval` seconds
+    JOURNAL = 'journal'
+
+
+def connect_state_db(filename: str, write_mode):
+    """Open a state database and configure its journal for `write_mode`."""
+    conn = sqlite3.connect(filename, isolation_level="EXCLUSIVE")
+    conn.row_factory = dict_factory
+    if filename not in (None, ':memory:'):
+        os.chmod(filename, 0o600)
+    if write_mode in (WriteMode.GROUP, WriteMode.JOURNAL):
+        # every commit is synced, a group commit syncs all payments of its interval at once
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = FULL')
+    else:
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.execute('PRAGMA synchronous = FULL')
+    return conn
 
 
 class ChannelManagerState(object):
-    """The part of the channel manager state that needs to persist."""
+    """The part of the channel manager state that needs to persist.
+
+    Channels are kept in an in-memory index keyed by (sender, open_block_number) that is
+    loaded once from the database. The index is authoritative for reads; every change goes
+    through `set_channel`/`del_channel` and is written through to the database.
+
+    Writes are committed one by one, unless they happen inside a `transaction()` block,
+    in which case they are committed together when the outermost block exits.
+
+    In `WriteMode.GROUP` balance updates from `set_balance` are only applied in memory and
+    written by a background greenlet in one transaction every `commit_interval` seconds,
+    which bounds the payments that can be lost on a crash to that window.
+
+    In `WriteMode.JOURNAL` balance updates are appended to the `payments` table, which also
+    serves as an audit trail of all balance proofs. A background greenlet folds new records
+    into `channels` every `compact_interval` seconds, and records that were not folded yet
+    are replayed when the channels are loaded.
+
+    Aggregates over the confirmed channels (see `stats`) are maintained incrementally
+    whenever a channel is written, so reading them does not depend on the channel count.
+    """
 
-    def __init__(self, filename):
+    # statements used to access the database, see `CHANNEL_STATE_SQL`
+    sql = CHANNEL_STATE_SQL
+    # named parameters passed with every statement
+    _scope = MappingProxyType({})
+
+    def __init__(
+        self,
+        filename,
+        write_mode: WriteMode = WriteMode.STRICT,
+        commit_interval: float = 0.05,
+        compact_interval: float = 10
+    ):
         self.filename = filename
-        self.conn = sqlite3.connect(self.filename, isolation_level="EXCLUSIVE")
-        self.conn.row_factory = dict_factory
-        if filename not in (None, ':memory:'):
-            os.chmod(filename, 0o600)
+        self.write_mode = WriteMode(write_mode)
+        self.commit_interval = commit_interval
+        self.compact_interval = compact_interval
+        self.conn = self._connect()
+        self._metadata = None
+        self._sync_state = None
+        self._confirmed_channels = dict()
+        self._unconfirmed_channels = dict()
+        self._reset_aggregates()
+        self._transaction_lock = gevent.lock.RLock()
+        self._transaction_depth = 0
+        self._pending_balances = dict()
+        self._flusher = None
+        self._compactor = None
+
+    def _connect(self):
+        return connect_state_db(self.filename, self.write_mode)
+
+    def _execute(self, statement: str, **params):
+        """Execute the statement `self.sql[statement]` with named parameters."""
+        return self._execute_sql(self.sql[statement], **params)
+
+    def _execute_sql(self, sql: str, **params):
+        params.update(self._scope)
+        return self.conn.execute(sql, params)
 
     def setup_db(self, network_id: int, contract_address: str, receiver: str):
         """Initialize an empty database."""
         assert is_address(receiver)
         self.conn.executescript(DB_CREATION_SQL)
-        self.conn.execute(UPDATE_METADATA_SQL, [network_id, contract_address, receiver])
+        self._execute('update_metadata', network_id=network_id,
+                      contract_address=contract_address, receiver=receiver)
         self.conn.commit()
+        self.conn.executescript(JOURNAL_CREATION_SQL)
+        self.conn.executescript(INDEX_CREATION_SQL)
+        self._load_metadata()
+        self._load_sync_state()
+
+    @contextmanager
+    def transaction(self):
+        """Group all writes made inside the block into a single database transaction.
+
+        Blocks can be nested; the changes are committed when the outermost block exits.
+        If the block raises, the transaction is rolled back and the in-memory state is
+        reloaded from the database. Writes from other greenlets wait until the
+        transaction is finished.
+        """
+        with self._transaction_lock:
+            self._transaction_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.conn.rollback()
+                    self._reload()
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.commit()
+
+    def _commit(self):
+        """Commit pending writes unless a `transaction()` is in progress."""
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def _reload(self):
+        """Reload the in-memory state after a rollback, keeping unflushed balances."""
+        self._load_sync_state()
+        self._load_channels()
+        for key, pending in self._pending_balances.items():
+            channel = self._confirmed_channels.get(key) or self._unconfirmed_channels.get(key)
+            if channel is not None:
+                channel.balance = pending.balance
+                channel.last_signature = pending.last_signature
+                channel.mtime = pending.mtime
+                self._account(channel)
+
+    def set_balance(self, channel: Channel):
+        """Store a new balance proof of a channel.
+
+        Only `balance`, `last_signature` and `mtime` are written. In `WriteMode.GROUP` the
+        write is deferred to the next group commit, in `WriteMode.JOURNAL` it is appended
+        to the payment journal.
+        """
+        assert self.channel_exists(channel.sender, channel.open_block_number)
+        self._account(channel)
+        if self.write_mode is WriteMode.GROUP:
+            self._pending_balances[channel.sender, channel.open_block_number] = channel
+            if self._flusher is None:
+                self._flusher = gevent.spawn_later(self.commit_interval, self._group_commit)
+            return
+        with self._transaction_lock:
+            if self.write_mode is WriteMode.JOURNAL:
+                self._execute(
+                    'append_payment',
+                    sender=channel.sender,
+                    open_block_number=channel.open_block_number,
+                    balance=str(channel.balance),
+                    last_signature=channel.last_signature,
+                    mtime=channel.mtime
+                )
+                if self._compactor is None:
+                    self._compactor = gevent.spawn_later(self.compact_interval, self._compact)
+            else:
+                self._write_balance(channel)
+            self._commit()
+
+    def compare_and_set_balance(
+        self,
+        sender: str,
+        open_block_number: int,
+        expected_balance: int,
+        balance: int,
+        signature: str
+    ):
+        """Replace the balance of a channel only if it still equals `expected_balance`.
+
+        The check, the in-memory update and the write through `set_balance` happen in one
+        transaction; if the write fails, the channel is reloaded with its previous balance.
+        Returns:
+            Channel: the updated channel, or None if the balance has changed meanwhile
+        """
+        with self.transaction():
+            channel = self.get_channel(sender, open_block_number)
+            if channel.balance != expected_balance:
+                return None
+            channel.balance = balance
+            channel.last_signature = signature
+            channel.mtime = time.time()
+            self.set_balance(channel)
+        return channel
+
+    def _write_balance(self, channel: Channel):
+        self._execute(
+            'update_balance',
+            balance=str(channel.balance),
+            last_signature=channel.last_signature,
+            mtime=channel.mtime,
+            sender=channel.sender,
+            open_block_number=channel.open_block_number
+        )
+
+    def _group_commit(self):
+        self._flusher = None
+        try:
+            self.flush()
+        except sqlite3.Error:
+            log.exception('group commit of %d balance updates failed, retrying' %
+                          len(self._pending_balances))
+            self._flusher = gevent.spawn_later(self.commit_interval, self._group_commit)
+
+    def flush(self):
+        """Write all deferred balance updates to the database."""
+        with self._transaction_lock:
+            if not self._pending_balances:
+                return
+            with self.transaction():
+                for channel in self._pending_balances.values():
+                    self._write_balance(channel)
+            self._pending_balances.clear()
+
+    def _compact(self):
+        self._compactor = None
+        try:
+            self.compact()
+        except sqlite3.Error:
+            log.exception('compaction of the payment journal failed, retrying')
+            self._compactor = gevent.spawn_later(self.compact_interval, self._compact)
+
+    def compact(self):
+        """Fold payment journal records that were not compacted yet into `channels`.
+
+        Records are kept in the journal; only the compaction mark is advanced.
+        Returns:
+            int: number of folded records
+        """
+        with self._transaction_lock:
+            with self.transaction():
+                records = self._execute('journal_tail').fetchall()
+                if not records:
+                    return 0
+                latest = {(r['sender'], r['open_block_number']): r for r in records}
+                for r in latest.values():
+                    self._execute(
+                        'update_balance',
+                        balance=r['balance'],
+                        last_signature=r['signature'],
+                        mtime=r['mtime'],
+                        sender=r['sender'],
+                        open_block_number=r['open_block_number']
+                    )
+                self._execute('advance_journal', compacted_id=records[-1]['id'])
+            log.debug('compacted %d payment journal records of %d channels' %
+                      (len(records), len(latest)))
+            return len(records)
+
+    def _replay_journal(self):
+        """Apply journal records that were not compacted yet to the in-memory channels."""
+        for r in self._execute('journal_tail').fetchall():
+            key = r['sender'], r['open_block_number']
+            channel = self._confirmed_channels.get(key) or self._unconfirmed_channels.get(key)
+            if channel is not None:
+                channel.balance = int(r['balance'])
+                channel.last_signature = r['signature']
+                channel.mtime = r['mtime']
+                self._account(channel)
+
+    def _load_metadata(self):
+        """Read the metadata row once; it never changes after `setup_db`."""
+        c = self._execute('select_metadata')
+        self._metadata = MappingProxyType(c.fetchone())
+        assert c.fetchone() is None
 
     @property
     def contract_address(self):
         """The address of the channel manager contract."""
-        c = self.conn.cursor()
-        c.execute('SELECT `contract_address` FROM `metadata`;')
-        contract_address = c.fetchone()['contract_address']
-        assert c.fetchone() is None
-        return contract_address
+        return self._metadata['contract_address']
 
     @property
     def receiver(self):
         """The receiver address."""
-        c = self.conn.cursor()
-        c.execute('SELECT `receiver` FROM `metadata`;')
-        receiver = c.fetchone()['receiver']
-        assert c.fetchone() is None
-        return receiver
+        return self._metadata['receiver']
 
     @property
     def network_id(self):
         """Network the state uses."""
-        c = self.conn.cursor()
-        c.execute('SELECT `network_id` FROM `metadata`;')
-        network_id = c.fetchone()['network_id']
-        assert c.fetchone() is None
-        return network_id
+        return self._metadata['network_id']
 
-    @property
-    def _sync_state(self):
-        c = self.conn.cursor()
-        c.execute('SELECT * FROM `syncstate`;')
+    def _load_sync_state(self):
+        c = self._execute('select_syncstate')
         state = c.fetchone()
         assert c.fetchone() is None
         assert len(state) == 4
-        return state
+        self._sync_state = state
 
     @property
     def confirmed_head_number(self):
@@ -212,28 +567,27 @@ class ChannelManagerState(object):
         unconfirmed_head_hash=None
     ):
         """Update block numbers and hashes of confirmed and unconfirmed head."""
-        if confirmed_head_number is not None:
-            sql = UPDATE_SYNCSTATE_SQL['confirmed_head_number']
-            self.conn.execute(sql, [confirmed_head_number])
-        if confirmed_head_hash is not None:
-            sql = UPDATE_SYNCSTATE_SQL['confirmed_head_hash']
-            self.conn.execute(sql, [confirmed_head_hash])
-        if unconfirmed_head_number is not None:
-            sql = UPDATE_SYNCSTATE_SQL['unconfirmed_head_number']
-            self.conn.execute(sql, [unconfirmed_head_number])
-        if unconfirmed_head_hash is not None:
-            sql = UPDATE_SYNCSTATE_SQL['unconfirmed_head_hash']
-            self.conn.execute(sql, [unconfirmed_head_hash])
-        self.conn.commit()
+        values = {
+            'confirmed_head_number': confirmed_head_number,
+            'confirmed_head_hash': confirmed_head_hash,
+            'unconfirmed_head_number': unconfirmed_head_number,
+            'unconfirmed_head_hash': unconfirmed_head_hash
+        }
+        with self._transaction_lock:
+            for field, value in values.items():
+                if value is not None:
+                    self._execute_sql(self.sql['update_syncstate'][field], value=value)
+            self._commit()
+            self._sync_state.update(
+                (field, value) for field, value in values.items() if value is not None
+            )
 
     @property
     def n_channels(self):
         """Returns:
             int: count of all channels, regardless of their state
         """
-        c = self.conn.cursor()
-        c.execute('SELECT COUNT(*) as count FROM `channels`')
-        return c.fetchone()['count']
+        return len(self._confirmed_channels) + len(self._unconfirmed_channels)
 
     @property
     def n_open_channels(self):
@@ -241,25 +595,17 @@ class ChannelManagerState(object):
         Returns:
             int: count of open channels
         """
-        c = self.conn.cursor()
-        c.execute('SELECT COUNT(*) as count FROM `channels` WHERE `state` = ?',
-                  [ChannelState.OPEN.value])
-        return c.fetchone()['count']
+        return sum(1 for channel in self._iter_channels()
+                   if channel.state == ChannelState.OPEN)
 
     def get_channels(self, confirmed=True):
         """
         Args:
             confirmed (bool, optional): return confirmed channels only. Default is True.
         Returns:
-            dict: map of channels, (sender, open_block_number) => Channel
+            Mapping: read-only map of channels, (sender, open_block_number) => Channel
         """
-        ret = dict()
-        c = self.conn.cursor()
-        c.execute('SELECT rowid, * FROM `channels` WHERE `confirmed` = ?', [confirmed])
-        for result in c.fetchall():
-            channel = self.result_to_channel(result)
-            ret[result['sender'], result['open_block_number']] = channel
-        return ret
+        return MappingProxyType(self._index(confirmed))
 
     @property
     def channels(self):
@@ -272,19 +618,157 @@ class ChannelManagerState(object):
     @property
     def pending_channels(self):
         """Get list of channels in a CLOSE_PENDING state"""
-        ret = dict()
-        c = self.conn.cursor()
-        c.execute('SELECT rowid, * FROM `channels` WHERE `state` = ?',
-                  [ChannelState.CLOSE_PENDING.value])
-        for result in c.fetchall():
-            channel = self.result_to_channel(result)
-            ret[result['sender'], result['open_block_number']] = channel
+        return {
+            (channel.sender, channel.open_block_number): channel
+            for channel in self._iter_channels()
+            if channel.state == ChannelState.CLOSE_PENDING
+        }
+
+    def query_channels(
+        self,
+        sender: str = None,
+        states: list = None,
+        confirmed: bool = True,
+        after: tuple = None,
+        limit: int = None
+    ):
+        """Select channels in (sender, open_block_number) order.
+
+        Filters and pagination are evaluated by the database using its indexes, the
+        channels themselves are returned from the in-memory index.
+        Args:
+            sender (str, optional): return channels of this sender only
+            states (list, optional): return channels in one of these `ChannelState`s only
+            confirmed (bool, optional): return confirmed channels only. Default is True.
+            after (tuple, optional): (sender, open_block_number) cursor, return only
+                channels ordered after it
+            limit (int, optional): maximum number of channels to return
+        Returns:
+            list: list of Channel
+        """
+        sql = self.sql['query_channels']
+        params = {'confirmed': confirmed}
+        if sender is not None:
+            sql += ' AND `sender` = :sender'
+            params['sender'] = sender
+        if states:
+            names = ['state%d' % i for i in range(len(states))]
+            sql += ' AND `state` IN ({})'.format(', '.join(':' + name for name in names))
+            params.update(zip(names, (ChannelState(state).value for state in states)))
+        if after is not None:
+            # a row value comparison, unlike the equivalent OR, is a range of the index
+            sql += ' AND (`sender`, `open_block_number`) > (:after_sender, :after_block)'
+            params.update(after_sender=after[0], after_block=after[1])
+        sql += ' ORDER BY `sender`, `open_block_number`'
+        if limit is not None:
+            sql += ' LIMIT :limit'
+            params['limit'] = limit
+        index = self._index(confirmed)
+        ret = []
+        for result in self._execute_sql(sql, **params).fetchall():
+            channel = index.get((result['sender'], result['open_block_number']))
+            if channel is not None:
+                ret.append(channel)
         return ret
 
-    def result_to_channel(self, result: dict):
+    @property
+    def stats(self):
+        """Aggregates over all confirmed channels.
+
+        Returns:
+            dict: `balance_sum`, `deposit_sum`, `open_channels`, `pending_channels`
+                (closing has been requested) and `unique_senders`
+        """
+        ret = dict(self._aggregates)
+        ret['unique_senders'] = len(self._senders)
+        return ret
+
+    @property
+    def locked_balance(self):
+        """Sum of the balances of all confirmed channels."""
+        return self._aggregates['balance_sum']
+
+    def _reset_aggregates(self):
+        self._aggregates = {
+            'balance_sum': 0,
+            'deposit_sum': 0,
+            'open_channels': 0,
+            'pending_channels': 0
+        }
+        self._senders = Counter()
+        # (sender, open_block_number) => (balance, deposit, is_closed) as last accounted
+        self._accounted = dict()
+
+    def _account(self, channel: Channel):
+        """Update the aggregates with the current values of a channel."""
+        key = channel.sender, channel.open_block_number
+        self._unaccount(key)
+        if not channel.confirmed:
+            return
+        accounted = channel.balance, channel.deposit, channel.is_closed
+        self._accounted[key] = accounted
+        self._aggregates['balance_sum'] += accounted[0]
+        self._aggregates['deposit_sum'] += accounted[1]
+        self._aggregates['pending_channels' if accounted[2] else 'open_channels'] += 1
+        self._senders[channel.sender] += 1
+
+    def _unaccount(self, key):
+        """Remove the contribution of a channel from the aggregates."""
+        accounted = self._accounted.pop(key, None)
+        if accounted is None:
+            return
+        self._aggregates['balance_sum'] -= accounted[0]
+        self._aggregates['deposit_sum'] -= accounted[1]
+        self._aggregates['pending_channels' if accounted[2] else 'open_channels'] -= 1
+        self._senders[key[0]] -= 1
+        if self._senders[key[0]] == 0:
+            del self._senders[key[0]]
+
+    def _index(self, confirmed: bool) -> dict:
+        return self._confirmed_channels if confirmed else self._unconfirmed_channels
+
+    def _iter_channels(self):
+        yield from self._confirmed_channels.values()
+        yield from self._unconfirmed_channels.values()
+
+    def _cache_channel(self, channel: Channel):
+        """Put channel into the in-memory index, moving it between the confirmed and
+        unconfirmed maps if its confirmation status changed."""
+        key = channel.sender, channel.open_block_number
+        self._index(not channel.confirmed).pop(key, None)
+        self._index(channel.confirmed)[key] = channel
+        self._account(channel)
+
+    def _load_channels(self):
+        """Populate the in-memory index from the database.
+
+        Channels and topups are read with one query each and joined in Python, so the
+        cost does not depend on the number of statements per channel.
+        """
+        self._confirmed_channels.clear()
+        self._unconfirmed_channels.clear()
+        self._reset_aggregates()
+        topups = dict()
+        for result in self._execute('select_topups').fetchall():
+            topups.setdefault(result['channel_rowid'], {})[result['txhash']] = \
+                int(result['deposit'])
+        for result in self._execute('select_channels').fetchall():
+            channel = self.result_to_channel(result, topups.get(result['rowid'], {}))
+            self._cache_channel(channel)
+        self._replay_journal()
+
+    def result_to_channel(self, result: dict, unconfirmed_topups: dict = None):
         """Helper function to serialize one row of `channels` table into a channel object
+
+        Args:
+            result (dict): row of the `channels` table, including its rowid
+            unconfirmed_topups (dict, optional): preloaded topups of the channel. If not
+                given, they are read from the database.
         """
-        channel = Channel(self.receiver, result['sender'],
+        if unconfirmed_topups is None:
+            unconfirmed_topups = self.get_unconfirmed_topups(result['rowid'])
+        # senders repeat across channels, share one string object per sender
+        channel = Channel(self.receiver, sys.intern(result['sender']),
                           int(result['deposit']),
                           result['open_block_number'])
         channel.balance = int(result['balance'])
@@ -293,23 +777,19 @@ class ChannelManagerState(object):
         channel.settle_timeout = result['settle_timeout']
         channel.mtime = result['mtime']
         channel.ctime = result['ctime']
-        channel.unconfirmed_topups = self.get_unconfirmed_topups(result['rowid'])
-        channel.confirmed = result['confirmed']
+        channel.unconfirmed_topups = unconfirmed_topups
+        channel.confirmed = bool(result['confirmed'])
         return channel
 
     def get_channel_rowid(self, sender: str, open_block_number: int):
-        sender = sender
-        c = self.conn.cursor()
-        result = c.execute(
-            'SELECT rowid from `channels` WHERE sender = ? AND open_block_number = ?',
-            [sender, open_block_number]
-        )
+        result = self._execute('channel_rowid', sender=sender,
+                               open_block_number=open_block_number)
         return result.fetchone()['rowid']
 
     def get_unconfirmed_topups(self, channel_rowid: int):
         c = self.conn.cursor()
         c.execute('SELECT * FROM topups WHERE channel_rowid = ?', [channel_rowid])
-        return {result['txhash']: result['deposit'] for result in c.fetchall()}
+        return {result['txhash']: int(result['deposit']) for result in c.fetchall()}
 
     def set_channel(self, channel: Channel):
         """Update channel state"""
@@ -317,15 +797,8 @@ class ChannelManagerState(object):
 
     def channel_exists(self, sender: str, open_block_number: int):
         """Return true if channel(sender, open_block_number) exists"""
-        c = self.conn.cursor()
-        sql = 'SELECT 1 FROM `channels` WHERE `sender` = ? AND `open_block_number` == ?'
-        c.execute(sql, [sender, open_block_number])
-        result = c.fetchone()
-        if result is None:
-            return False
-        elif result['1']:
-            return True
-        assert False
+        key = sender, open_block_number
+        return key in self._confirmed_channels or key in self._unconfirmed_channels
 
     def set_unconfirmed_topups(self, channel_rowid: int, topups: dict):
         assert channel_rowid is not None and isinstance(channel_rowid, int)
@@ -339,44 +812,52 @@ class ChannelManagerState(object):
         assert channel.open_block_number > 0
         assert channel.state is not ChannelState.UNDEFINED
         assert is_address(channel.sender)
-        params = [
-            channel.sender,
-            channel.open_block_number,
-            str(channel.deposit),
-            str(channel.balance),
-            channel.last_signature,
-            channel.settle_timeout,
-            channel.mtime,
-            channel.ctime,
-            channel.state.value,
-            channel.confirmed
-        ]
-        self.conn.execute(ADD_CHANNEL_SQL, params)
-        rowid = self.get_channel_rowid(channel.sender, channel.open_block_number)
-        self.set_unconfirmed_topups(rowid, channel.unconfirmed_topups)
-        self.conn.commit()
+        params = dict(
+            sender=channel.sender,
+            open_block_number=channel.open_block_number,
+            deposit=str(channel.deposit),
+            balance=str(channel.balance),
+            last_signature=channel.last_signature,
+            settle_timeout=channel.settle_timeout,
+            mtime=channel.mtime,
+            ctime=channel.ctime,
+            state=channel.state.value,
+            confirmed=channel.confirmed
+        )
+        with self._transaction_lock:
+            self._execute('add_channel', **params)
+            rowid = self.get_channel_rowid(channel.sender, channel.open_block_number)
+            self.set_unconfirmed_topups(
+                rowid, channel.unconfirmed_topups if channel.has_unconfirmed_topups else {}
+            )
+            self._commit()
+            self._cache_channel(channel)
 
     def get_channel(self, sender: str, open_block_number: int):
         assert is_address(sender)
         assert open_block_number > 0
-        # TODO unconfirmed topups
-        c = self.conn.cursor()
-        sql = 'SELECT rowid,* FROM `channels` WHERE `sender` = ? AND `open_block_number` = ?'
-        c.execute(sql, [sender, open_block_number])
-        result = c.fetchone()
-        assert c.fetchone() is None
-        return self.result_to_channel(result)
+        key = sender, open_block_number
+        channel = self._confirmed_channels.get(key) or self._unconfirmed_channels.get(key)
+        assert channel is not None
+        return channel
 
     def del_channel(self, sender: str, open_block_number: int):
         assert is_address(sender)
         assert open_block_number > 0
         assert self.channel_exists(sender, open_block_number)
-        self.conn.execute(DEL_CHANNEL_SQL, [sender, open_block_number])
-        self.conn.commit()
+        with self._transaction_lock:
+            self._execute('del_channel', sender=sender, open_block_number=open_block_number)
+            self._commit()
+            self._confirmed_channels.pop((sender, open_block_number), None)
+            self._unconfirmed_channels.pop((sender, open_block_number), None)
+            self._unaccount((sender, open_block_number))
 
     @classmethod
-    def load(cls, filename: str, check_permissions=True):
-        """Load a previously stored state."""
+    def load(cls, filename: str, check_permissions=True, **kwargs):
+        """Load a previously stored state.
+
+        Additional keyword arguments are passed to the constructor.
+        """
         assert filename and isinstance(filename, str)
         if filename != ':memory:':
             if os.path.isfile(filename) is False:
@@ -384,21 +865,30 @@ class ChannelManagerState(object):
                 return None
             if check_permissions and not check_permission_safety(filename):
                 raise InsecureStateFile(filename)
-        ret = cls(filename)
+        ret = cls(filename, **kwargs)
+        ret.conn.executescript(JOURNAL_CREATION_SQL)
+        ret.conn.executescript(INDEX_CREATION_SQL)
+        ret._load_metadata()
+        ret._load_sync_state()
+        ret._load_channels()
         log.debug("loaded saved state. head_number=%s receiver=%s" %
                   (ret.confirmed_head_number, ret.receiver))
         # for sender, block in ret.channels.keys():
         #     log.debug("loaded channel info from the saved state sender=%s open_block=%s" %
         #               (sender, block))
+        log.debug("loaded %d channels into memory" % ret.n_channels)
         return ret
 
     def del_unconfirmed_channels(self):
-        self.conn.execute('DELETE FROM `channels` WHERE `confirmed` = 0')
-        self.conn.commit()
+        with self._transaction_lock:
+            self._execute('del_unconfirmed_channels')
+            self._commit()
+            self._unconfirmed_channels.clear()
 
     def set_channel_state(self, sender: str, open_block_number: int, state: ChannelState):
         assert is_address(sender)
-        sender = sender
-        self.conn.execute('UPDATE `channels` SET `state` = ?'
-                          'WHERE `sender` = ? AND `open_block_number` = ?',
-                          [state, sender, open_block_number])
+        self._execute('set_channel_state', state=state.value, sender=sender,
+                      open_block_number=open_block_number)
+        channel = self.get_channel(sender, open_block_number)
+        channel.state = state
+        self._account(channel)
@@ -0,0 +1,352 @@
+"""Consolidated state database shared by the channel managers of many receivers."""
+import os
+import logging
+from contextlib import contextmanager
+from types import MappingProxyType
+
+import filelock
+import gevent.lock
+from eth_utils import is_address
+
+from microraiden.utils import check_permission_safety
+from microraiden.exceptions import (
+    InsecureStateFile,
+    SharedStateFile,
+    StateFileLocked
+)
+from .state import (
+    ChannelManagerState,
+    WriteMode,
+    CHANNEL_STATE_SQL,
+    connect_state_db
+)
+
+log = logging.getLogger(__name__)
+
+
+# same tables as a per-receiver state database, with every row keyed by its receiver;
+# topups reference the globally unique rowid of their channel
+SHARED_DB_CREATION_SQL = """
+CREATE TABLE IF NOT EXISTS `metadata` (
+    `receiver`         CHAR(42)        PRIMARY KEY,
+    `network_id`       INTEGER,
+    `contract_address` CHAR(42)
+);
+CREATE TABLE IF NOT EXISTS `syncstate` (
+    `receiver`                CHAR(42) PRIMARY KEY,
+    `confirmed_head_number`   INTEGER,
+    `confirmed_head_hash`     CHAR(66),
+    `unconfirmed_head_number` INTEGER,
+    `unconfirmed_head_hash`   CHAR(66)
+);
+CREATE TABLE IF NOT EXISTS `channels` (
+    `receiver`          CHAR(42)        NOT NULL,
+    `sender`            CHAR(42)        NOT NULL,
+    `open_block_number` INTEGER         NOT NULL,
+    `deposit`           DECIMAL(78,0)   NOT NULL,
+    `balance`           DECIMAL(78,0)   NOT NULL,
+    `last_signature`    CHAR(132),
+    `settle_timeout`    INTEGER         NOT NULL,
+    `mtime`             INTEGER         NOT NULL,
+    `ctime`             INTEGER         NOT NULL,
+    `state`             INTEGER         NOT NULL,
+    `confirmed`         BOOL            NOT NULL,
+    PRIMARY KEY (`receiver`, `sender`, `open_block_number`)
+);
+CREATE TABLE IF NOT EXISTS `topups` (
+    `channel_rowid`     INTEGER,
+    `txhash`            CHAR(66)        NOT NULL,
+    `deposit`           DECIMAL(78,0)   NOT NULL,
+    PRIMARY KEY (`channel_rowid`, `txhash`),
+    FOREIGN KEY (`channel_rowid`) REFERENCES channels (rowid)
+        ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS `payments` (
+    `id`                INTEGER         PRIMARY KEY AUTOINCREMENT,
+    `receiver`          CHAR(42)        NOT NULL,
+    `sender`            CHAR(42)        NOT NULL,
+    `open_block_number` INTEGER         NOT NULL,
+    `balance`           TEXT            NOT NULL,
+    `signature`         CHAR(132)       NOT NULL,
+    `mtime`             INTEGER         NOT NULL
+);
+CREATE TABLE IF NOT EXISTS `journalstate` (
+    `receiver`          CHAR(42)        PRIMARY KEY,
+    `compacted_id`      INTEGER         NOT NULL
+);
+CREATE INDEX IF NOT EXISTS `channels_state`
+    ON `channels` (`receiver`, `confirmed`, `state`, `sender`, `open_block_number`);
+CREATE INDEX IF NOT EXISTS `channels_sender`
+    ON `channels` (`receiver`, `confirmed`, `sender`, `open_block_number`);
+CREATE INDEX IF NOT EXISTS `payments_receiver` ON `payments` (`receiver`, `id`);
+"""
+
+ADD_RECEIVER_SQL = (
+    'INSERT INTO `metadata` VALUES (:receiver, :network_id, :contract_address);',
+    'INSERT INTO `syncstate` VALUES (:receiver, NULL, NULL, NULL, NULL);',
+    'INSERT INTO `journalstate` VALUES (:receiver, 0);'
+)
+
+SHARED_STATE_SQL = MappingProxyType(dict(
+    CHANNEL_STATE_SQL,
+    select_metadata="""
+SELECT `network_id`, `contract_address`, `receiver` FROM `metadata`
+WHERE `receiver` = :receiver;
+""",
+    select_syncstate="""
+SELECT `confirmed_head_number`, `confirmed_head_hash`,
+       `unconfirmed_head_number`, `unconfirmed_head_hash`
+FROM `syncstate` WHERE `receiver` = :receiver;
+""",
+    update_syncstate={
+        field: 'UPDATE `syncstate` SET `{}` = :value WHERE `receiver` = :receiver;'.format(field)
+        for field in CHANNEL_STATE_SQL['update_syncstate']
+    },
+    add_channel="""
+INSERT OR REPLACE INTO `channels` (
+    `receiver`,
+    `sender`,
+    `open_block_number`,
+    `deposit`,
+    `balance`,
+    `last_signature`,
+    `settle_timeout`,
+    `mtime`,
+    `ctime`,
+    `state`,
+    `confirmed`
+) VALUES (
+    :receiver,
+    :sender,
+    :open_block_number,
+    :deposit,
+    :balance,
+    :last_signature,
+    :settle_timeout,
+    :mtime,
+    :ctime,
+    :state,
+    :confirmed
+)
+""",
+    update_balance="""
+UPDATE `channels` SET
+    `balance` = :balance,
+    `last_signature` = :last_signature,
+    `mtime` = :mtime
+WHERE `receiver` = :receiver AND `sender` = :sender AND `open_block_number` = :open_block_number;
+""",
+    set_channel_state="""
+UPDATE `channels` SET `state` = :state
+WHERE `receiver` = :receiver AND `sender` = :sender AND `open_block_number` = :open_block_number;
+""",
+    channel_rowid="""
+SELECT rowid FROM `channels`
+WHERE `receiver` = :receiver AND `sender` = :sender AND `open_block_number` = :open_block_number;
+""",
+    del_channel="""
+DELETE FROM `channels`
+WHERE `receiver` = :receiver AND `sender` = :sender AND `open_block_number` = :open_block_number
+""",
+    del_unconfirmed_channels='DELETE FROM `channels` '
+                             'WHERE `receiver` = :receiver AND `confirmed` = 0',
+    select_channels='SELECT rowid, * FROM `channels` WHERE `receiver` = :receiver',
+    select_topups="""
+SELECT `channel_rowid`, `txhash`, `topups`.`deposit` FROM `topups`
+JOIN `channels` ON `channels`.rowid = `topups`.`channel_rowid`
+WHERE `channels`.`receiver` = :receiver
+""",
+    query_channels='SELECT `sender`, `open_block_number` FROM `channels` '
+                   'WHERE `receiver` = :receiver AND `confirmed` = :confirmed',
+    append_payment="""
+INSERT INTO `payments`
+    (`receiver`, `sender`, `open_block_number`, `balance`, `signature`, `mtime`)
+VALUES (:receiver, :sender, :open_block_number, :balance, :last_signature, :mtime);
+""",
+    journal_tail="""
+SELECT `id`, `sender`, `open_block_number`, `balance`, `signature`, `mtime` FROM `payments`
+WHERE `receiver` = :receiver
+    AND `id` > (SELECT `compacted_id` FROM `journalstate` WHERE `receiver` = :receiver)
+ORDER BY `id`;
+""",
+    advance_journal='UPDATE `journalstate` SET `compacted_id` = :compacted_id '
+                    'WHERE `receiver` = :receiver'
+))
+
+
+class SharedChannelManagerState(ChannelManagerState):
+    """State of one receiver, stored in a `ChannelStateStore` shared with other receivers.
+
+    The in-memory index is kept per receiver as in `ChannelManagerState`; the connection,
+    its transaction and the write lock belong to the store.
+    """
+
+    sql = SHARED_STATE_SQL
+
+    def __init__(self, store, receiver: str):
+        assert is_address(receiver)
+        self.store = store
+        self._scope = MappingProxyType({'receiver': receiver})
+        super().__init__(store.filename, **store.state_options)
+        self._transaction_lock = store.lock
+
+    def _connect(self):
+        return self.store.conn
+
+    def setup_db(self, network_id: int, contract_address: str, receiver: str):
+        """Add the receiver to the shared database."""
+        assert receiver == self._scope['receiver']
+        with self.transaction():
+            for statement in ADD_RECEIVER_SQL:
+                self._execute_sql(statement, network_id=network_id,
+                                  contract_address=contract_address)
+        self._load_metadata()
+        self._load_sync_state()
+
+    @contextmanager
+    def transaction(self):
+        with self.store.transaction(self):
+            yield self
+
+    def _commit(self):
+        self.store.commit(self)
+
+    @classmethod
+    def load(cls, filename, check_permissions=True, **kwargs):
+        raise SharedStateFile('the state of a receiver in a shared database is '
+                              'loaded with ChannelStateStore.open_state()')
+
+
+class ChannelStateStore(object):
+    """A single state database for the channel managers of all receivers on a server.
+
+    All receivers share one connection, so that a server hosting many receivers holds one
+    database file, one set of prepared statements and one writer. Every receiver gets its
+    own `SharedChannelManagerState` from `open_state`.
+
+    A transaction of the store spans all receivers; a write of one receiver waits until
+    the transaction of another one is finished.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        check_permissions=True,
+        **state_options
+    ):
+        """
+        Args:
+            filename (str): path to the database, it is created if it doesn't exist
+            check_permissions (bool, optional): refuse to open an existing database
+                that is accessible by other users
+            state_options: keyword arguments for `ChannelManagerState`, the same
+                for all receivers
+        """
+        assert filename and isinstance(filename, str)
+        if filename != ':memory:':
+            if check_permissions and os.path.isfile(filename) and \
+                    not check_permission_safety(filename):
+                raise InsecureStateFile(filename)
+            self.lock_state = filelock.FileLock(filename + '.lock')
+            try:
+                self.lock_state.acquire(timeout=0)
+            except filelock.Timeout:
+                raise StateFileLocked("state file %s is locked by another process" %
+                                      filename)
+        self.filename = filename
+        self.state_options = state_options
+        self.write_mode = WriteMode(state_options.get('write_mode', WriteMode.STRICT))
+        self.conn = connect_state_db(filename, self.write_mode)
+        self.conn.executescript(SHARED_DB_CREATION_SQL)
+        self.lock = gevent.lock.RLock()
+        self.states = dict()
+        self._transaction_depth = 0
+        # states that have written in the current transaction
+        self._participants = set()
+
+    def has_state(self, receiver: str) -> bool:
+        """
+        Returns:
+            bool: True if the state of `receiver` is stored in the database
+        """
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM `metadata` WHERE `receiver` = ?',
+                                     [receiver]).fetchone() is not None
+
+    def open_state(self, receiver: str, network_id: int, contract_address: str):
+        """Load the state of a receiver, adding the receiver if it isn't stored yet.
+
+        Returns:
+            SharedChannelManagerState: state of the receiver
+        """
+        with self.lock:
+            if receiver in self.states:
+                raise StateFileLocked("state of receiver %s is already in use" % receiver)
+            state = SharedChannelManagerState(self, receiver)
+            exists = state._execute('select_metadata').fetchone() is not None
+            if exists:
+                state._load_metadata()
+                state._load_sync_state()
+                state._load_channels()
+                log.debug("loaded %d channels of receiver %s into memory" %
+                          (state.n_channels, receiver))
+            else:
+                state.setup_db(network_id, contract_address, receiver)
+            self.states[receiver] = state
+            return state
+
+    def release(self, state: SharedChannelManagerState):
+        """Flush the state of a receiver and allow it to be opened again."""
+        with self.lock:
+            if self.states.get(state.receiver) is not state:
+                # released already, the receiver may have been opened again since
+                return
+            state.flush()
+            del self.states[state.receiver]
+
+    @contextmanager
+    def transaction(self, state: SharedChannelManagerState = None):
+        """Transaction of the shared connection, see `ChannelManagerState.transaction`.
+
+        If the transaction is rolled back, every state that has written in it is reloaded.
+        """
+        with self.lock:
+            self._transaction_depth += 1
+            if state is not None:
+                self._participants.add(state)
+            try:
+                yield self
+            except BaseException:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0:
+                    self.conn.rollback()
+                    participants, self._participants = self._participants, set()
+                    for participant in participants:
+                        participant._reload()
+                raise
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.commit()
+                self._participants.clear()
+
+    def commit(self, state: SharedChannelManagerState):
+        """Commit pending writes unless a transaction is in progress."""
+        if self._transaction_depth == 0:
+            self.conn.commit()
+        else:
+            self._participants.add(state)
+
+    def flush(self):
+        """Write the deferred balance updates of all receivers."""
+        with self.transaction():
+            for state in list(self.states.values()):
+                state.flush()
+
+    def close(self):
+        """Flush the states that are still open, close the database and release its lock."""
+        with self.lock:
+            self.flush()
+            self.states.clear()
+            self.conn.close()
+        if hasattr(self, 'lock_state'):
+            self.lock_state.release()
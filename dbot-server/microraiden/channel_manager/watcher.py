@@ -0,0 +1,168 @@
+import logging
+
+import gevent
+import requests
+from web3 import Web3
+from web3.contract import Contract
+from eth_utils import to_checksum_address
+
+from microraiden.utils import get_contract_logs, supports_batch
+from .blockchain import CHANNEL_EVENTS, fetch_head_and_logs
+from .headers import HeaderCache, Header
+from .channel_info import ChannelInfoCache
+from .heads import NewHeads
+
+
+class ChainWatcher(gevent.Greenlet):
+    """Watches the channel manager contract for all receivers of a server.
+
+    Every poll fetches the events of all subscribed receivers with a single request and
+    relays them to the `Blockchain` of each receiver. Reorganizations are checked against
+    the watcher's `HeaderCache`. With a `NewHeads` subscription, every new block is
+    processed as soon as the node announces it. A `Blockchain` created with a
+    watcher does its initial sync alone and subscribes once it is synced, so adding or
+    removing a receiver does not add or remove a poller.
+    """
+    poll_interval = 2
+
+    def __init__(self, web3: Web3, channel_manager_contract: Contract,
+                 new_heads: NewHeads = None):
+        gevent.Greenlet.__init__(self)
+        self.web3 = web3
+        self.channel_manager_contract = channel_manager_contract
+        self.log = logging.getLogger('chain_watcher')
+        # receiver address => Blockchain
+        self.subscribers = dict()
+        self.headers = HeaderCache(web3)
+        self.channel_info = ChannelInfoCache(channel_manager_contract)
+        self.new_heads = new_heads
+        self.running = False
+
+    def subscribe(self, blockchain):
+        """Relay the events of the blockchain's receiver to it from the next poll on."""
+        self.subscribers[blockchain.cm.state.receiver] = blockchain
+
+    def unsubscribe(self, blockchain):
+        receiver = blockchain.cm.state.receiver
+        if self.subscribers.get(receiver) is blockchain:
+            del self.subscribers[receiver]
+
+    def _run(self):
+        self.running = True
+        self.log.info('starting polling channel info of all receivers from blockchain, '
+                      'interval {}s'.format(self.poll_interval))
+        latest = None
+        while self.running:
+            try:
+                self._update(latest)
+            except requests.exceptions.ConnectionError:
+                endpoint = self.web3.currentProvider.endpoint_uri
+                self.log.warning(
+                    'Ethereum node (%s) refused connection. Retrying in %d seconds.' %
+                    (endpoint, self.poll_interval)
+                )
+                for blockchain in list(self.subscribers.values()):
+                    blockchain.is_connected.clear()
+                gevent.sleep(self.poll_interval)
+                latest = None
+                continue
+            except Exception:
+                # the watcher serves all receivers, it keeps polling whatever fails
+                self.log.exception('failed to poll channel events of all receivers, '
+                                   'retrying in %d seconds' % self.poll_interval)
+                gevent.sleep(self.poll_interval)
+                latest = None
+                continue
+            latest = self.wait_for_head()
+        self.log.info('stopped polling channel info of all receivers from blockchain')
+
+    def stop(self):
+        self.running = False
+
+    def wait_for_head(self):
+        """See `Blockchain.wait_for_head`."""
+        if self.new_heads is None:
+            gevent.sleep(self.poll_interval)
+            return None
+        return self.new_heads.wait(self.headers.latest, self.poll_interval)
+
+    def _update(self, latest: Header = None):
+        if not self.subscribers:
+            return
+        prefetched_logs = None
+        if latest is None and supports_batch(self.web3):
+            # the events of new blocks usually start after the unconfirmed heads
+            prefetch_from = min(blockchain.cm.state.unconfirmed_head_number
+                                for blockchain in self.subscribers.values()) + 1
+            latest, prefetched_logs = fetch_head_and_logs(
+                self.channel_manager_contract,
+                prefetch_from,
+                [blockchain.cm.state.receiver for blockchain in self.subscribers.values()]
+            )
+        depth = max(blockchain.n_confirmations for blockchain in self.subscribers.values()) + 1
+        current_block = self.headers.update(depth, latest).number
+        updates = []
+        for blockchain in list(self.subscribers.values()):
+            if blockchain.insufficient_balance:
+                blockchain.insufficient_balance_recover()
+            try:
+                filters = blockchain.get_update_filters(current_block, self.headers)
+            except requests.exceptions.ConnectionError:
+                raise
+            except Exception:
+                self.log.exception('failed to check the sync state (receiver: %s)' %
+                                   blockchain.cm.state.receiver)
+                continue
+            if filters is not None:
+                updates.append((blockchain, filters, blockchain.get_fetch_range(filters)))
+        if not updates:
+            return
+
+        fetches = [(blockchain, fetch_range)
+                   for blockchain, _, fetch_range in updates if fetch_range is not None]
+        logs = []
+        if fetches and prefetched_logs is not None and \
+                all(from_block >= prefetch_from for _, (from_block, _) in fetches):
+            logs = prefetched_logs
+        elif fetches:
+            logs = get_contract_logs(
+                self.channel_manager_contract,
+                CHANNEL_EVENTS,
+                from_block=min(from_block for _, (from_block, _) in fetches),
+                to_block=max(to_block for _, (_, to_block) in fetches),
+                argument_filters={
+                    '_receiver_address': [blockchain.cm.state.receiver
+                                          for blockchain, _ in fetches]
+                }
+            )
+        receiver_logs = dict()
+        for log in logs:
+            receiver = to_checksum_address(log['args']['_receiver_address'])
+            receiver_logs.setdefault(receiver, []).append(log)
+
+        # read the settle blocks of all closed channels with one batch
+        close_requests = []
+        for blockchain, filters, _ in updates:
+            receiver = to_checksum_address(blockchain.cm.state.receiver)
+            close_requests.extend(
+                blockchain.get_close_requests(filters, receiver_logs.get(receiver, [])))
+        try:
+            self.channel_info.get_many(close_requests, current_block)
+        except requests.exceptions.ConnectionError:
+            raise
+        except Exception:
+            # every receiver reads the infos it is missing in `apply_update`
+            self.log.exception('failed to read the info of closed channels')
+
+        for blockchain, filters, _ in updates:
+            receiver = to_checksum_address(blockchain.cm.state.receiver)
+            try:
+                blockchain.apply_update(current_block, filters, receiver_logs.get(receiver, []),
+                                        self.headers)
+            except requests.exceptions.ConnectionError:
+                raise
+            except Exception:
+                # the receiver keeps its sync state and retries the range on the next poll
+                self.log.exception('failed to apply channel events (receiver: %s)' % receiver)
+                continue
+            blockchain.is_connected.set()
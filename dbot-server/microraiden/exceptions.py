@@ -57,6 +57,11 @@ class StateFileLocked(StateFileException):
     pass
 
 
+class SharedStateFile(StateFileException):
+    """The state belongs to a shared database and is opened by its store."""
+    pass
+
+
 class InsecureStateFile(StateFileException):
     """Permissions of the state file do not match (0600 is expected)."""
     pass
@@ -65,3 +70,8 @@ class InsecureStateFile(StateFileException):
 class NetworkIdMismatch(StateFileException):
     """RPC endpoint and database have different network id."""
     pass
+
+
+class InvalidStateSnapshot(StateFileException):
+    """State snapshot is corrupted or doesn't belong to the receiver."""
+    pass
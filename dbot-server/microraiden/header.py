@@ -15,6 +15,9 @@ class HTTPHeaders(object):
     GATEWAY_PATH = 'RDN-Gateway-Path'
     COST = 'RDN-Cost'
     OPEN_BLOCK = 'RDN-Open-Block'
+    SESSION = 'RDN-Session'
+    SESSION_TICKET = 'RDN-Session-Ticket'
+    CREDIT = 'RDN-Credit'
 
 # errors
     INSUF_CONFS = 'RDN-Insufficient-Confirmations'
@@ -10,7 +10,13 @@ import logging
 from web3 import Web3, HTTPProvider
 from web3.contract import Contract
 
-from microraiden.channel_manager import ChannelManager
+from microraiden.channel_manager import (
+    ChannelManager,
+    ChannelStateStore,
+    ChainWatcher,
+    NewHeads
+)
+from microraiden.utils import CryptoExecutor
 from microraiden.exceptions import (
     StateReceiverAddrMismatch,
     StateContractAddrMismatch
@@ -42,7 +48,12 @@ def make_channel_manager(
         private_key: str,
         channel_manager_address: str,
         state_filename: str,
-        web3: Web3
+        web3: Web3,
+        state_options: dict = None,
+        state_store: ChannelStateStore = None,
+        chain_watcher: ChainWatcher = None,
+        new_heads: NewHeads = None,
+        crypto_executor: CryptoExecutor = None
 ) -> ChannelManager:
     """
     Args:
@@ -50,6 +61,15 @@ def make_channel_manager(
         channel_manager_address (str): channel manager contract to use
         state_filename (str): path to the channel manager state database
         web3 (Web3): web3 provider
+        state_options (dict, optional): keyword arguments for `ChannelManagerState`
+        state_store (ChannelStateStore, optional): keep the state in this shared database
+            instead of `state_filename`
+        chain_watcher (ChainWatcher, optional): follow the chain with this shared watcher
+            once the initial sync is finished
+        new_heads (NewHeads, optional): process new blocks as soon as this subscription
+            announces them instead of polling every few seconds
+        crypto_executor (CryptoExecutor, optional): recover and sign balance proofs with
+            this executor instead of on the hub
     Returns:
         ChannelManager: intialized and synced channel manager
 
@@ -63,7 +83,12 @@ def make_channel_manager(
             channel_manager_contract,
             receiver,
             private_key,
-            state_filename=state_filename
+            state_filename=state_filename,
+            state_options=state_options,
+            state_store=state_store,
+            chain_watcher=chain_watcher,
+            new_heads=new_heads,
+            crypto_executor=crypto_executor
         )
     except StateReceiverAddrMismatch as e:
         log.error(
@@ -5,7 +5,7 @@ from collections import defaultdict
 from microraiden.utils import sign_close
 from eth_utils import encode_hex, is_address, to_checksum_address
 
-from microraiden.channel_manager import Channel, ChannelManager
+from microraiden.channel_manager import Channel, ChannelManager, ChannelState
 from microraiden.exceptions import NoOpenChannel, InvalidBalanceProof
 from microraiden.exceptions import (
     NoBalanceProofReceived,
@@ -24,67 +24,79 @@ class ChannelManagementStats(Resource):
         self.channel_manager = channel_manager
 
     def get(self):
-        deposit_sum = sum([c.deposit for c in self.channel_manager.channels.values()])
-        unique_senders = {}
-        open_channels = []
-        pending_channels = []
-        for k, v in self.channel_manager.channels.items():
-            unique_senders[k[0]] = 1
-            if v.is_closed is True:
-                pending_channels.append(v)
-            else:
-                open_channels.append(v)
+        stats = self.channel_manager.state.stats
         contract_address = self.channel_manager.channel_manager_contract.address
-        return {'balance_sum': self.channel_manager.get_locked_balance(),
-                'deposit_sum': deposit_sum,
-                'open_channels': len(open_channels),
-                'pending_channels': len(pending_channels),
-                'unique_senders': len(unique_senders),
+        return {'balance_sum': stats['balance_sum'],
+                'deposit_sum': stats['deposit_sum'],
+                'open_channels': stats['open_channels'],
+                'pending_channels': stats['pending_channels'],
+                'unique_senders': stats['unique_senders'],
                 'liquid_balance': self.channel_manager.get_liquid_balance(),
                 'contract_address': contract_address,
                 'receiver_address': self.channel_manager.receiver,
                 'manager_abi': self.channel_manager.channel_manager_contract.abi,
-                'sync_block': self.channel_manager.blockchain.sync_start_block
+                'sync_block': self.channel_manager.blockchain.sync_start_block,
+                'sync_progress': self.channel_manager.blockchain.sync_progress.to_dict()
                 }
 
 
+def channel_cursor(value):
+    """Parse a channel listing cursor in the `<sender>:<open_block_number>` format."""
+    sender, _, open_block_number = value.partition(':')
+    if not is_address(sender) or not open_block_number.isdigit():
+        raise ValueError('invalid channel cursor')
+    return to_checksum_address(sender), int(open_block_number)
+
+
 class ChannelManagementListChannels(Resource):
+    MAX_LIMIT = 1000
+    """int: maximum number of channels returned in one page"""
+
     def __init__(self, channel_manager: ChannelManager):
         super(ChannelManagementListChannels, self).__init__()
         self.channel_manager = channel_manager
 
-    def get_all_channels(self, channel_status='all', condition=lambda k, v: True):
-        return [v.to_dict() for k, v in self.channel_manager.channels.items()
-                if (condition(k, v))]
+    def get_all_channels(self, sender=None, channel_status='all', limit=None, cursor=None):
+        return [c.to_dict() for c in self.channel_manager.state.query_channels(
+            sender=sender,
+            states=self.get_channel_states(channel_status),
+            after=cursor,
+            limit=limit
+        )]
 
-    def get_channel_filter(self, channel_status='all'):
+    def get_channel_states(self, channel_status='all'):
         if channel_status == 'open' or channel_status == 'opened':
-            return lambda c: c.is_closed is False
+            return [ChannelState.OPEN]
         elif channel_status == 'closed':
-            return lambda c: c.is_closed is True
+            return [ChannelState.CLOSED, ChannelState.CLOSE_PENDING]
         else:
-            return lambda c: True
+            return None
 
     def get(self, sender_address=None):
         parser = reqparse.RequestParser()
         parser.add_argument('status', type=str, help='filter channels by a status', default='all',
                             choices=('closed', 'opened', 'open', 'all'))
+        parser.add_argument('limit', type=int, help='maximum number of channels to return')
+        parser.add_argument('cursor', type=channel_cursor,
+                            help='return channels after this cursor (see Next-Cursor header)')
         args = parser.parse_args()
-        channel_filter = self.get_channel_filter(args['status'])
+        limit = args['limit']
+        if limit is not None:
+            limit = max(1, min(limit, self.MAX_LIMIT))
 
         # if sender exists, return all open blocks
         if sender_address is not None and is_address(sender_address):
-            ret = self.get_all_channels(
-                condition=lambda k, v:
-                (k[0] == to_checksum_address(sender_address) and
-                 channel_filter(v))
-            )
-
+            sender = to_checksum_address(sender_address)
         # if sender is not specified, return all open channels
         else:
-            ret = self.get_all_channels(condition=lambda k, v:
-                                             channel_filter(v))
-        return ret, 200
+            sender = None
+        ret = self.get_all_channels(sender, args['status'], limit, args['cursor'])
+
+        headers = {}
+        if limit is not None and len(ret) == limit:
+            last = ret[-1]
+            headers['Next-Cursor'] = '{}:{}'.format(last['sender'], last['open_block_number'])
+        return ret, 200, headers
 
     def delete(self, sender_address):
         parser = reqparse.RequestParser()
@@ -43,6 +43,10 @@ class RequestData:
             price = int(price)
         self.price = price
 
+        # a session is requested with any value but '0'
+        self.session = headers.get(header.SESSION, '0') != '0'
+        self.session_ticket = headers.get(header.SESSION_TICKET, None)
+
     @property
     def price(self):
         return self._price
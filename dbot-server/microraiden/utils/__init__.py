@@ -18,6 +18,7 @@ from .crypto import (
     get_balance_message,
     sign_balance_proof,
     verify_balance_proof,
+    BalanceProofVerifier,
     sign_close,
     verify_closing_sig
 )
@@ -28,11 +29,32 @@ from .contract import (
     create_signed_contract_transaction,
     create_contract_transaction,
     create_transaction_data,
+    call_contract_batch,
     get_logs,
+    get_contract_logs,
+    make_contract_logs_filter,
+    decode_contract_logs,
     get_event_blocking,
     wait_for_transaction
 )
 
+from .events import (
+    EventLog,
+    EventDecoders,
+    get_event_decoders
+)
+
+from .executor import (
+    CryptoExecutor,
+    ThreadPoolCryptoExecutor
+)
+
+from .provider import (
+    PooledHTTPProvider,
+    supports_batch,
+    batch_request
+)
+
 from .private_key import (
     check_permission_safety,
     get_private_key
@@ -63,6 +85,7 @@ __all__ = [
     get_balance_message,
     sign_balance_proof,
     verify_balance_proof,
+    BalanceProofVerifier,
     sign_close,
     verify_closing_sig,
 
@@ -71,10 +94,25 @@ __all__ = [
     create_signed_contract_transaction,
     create_contract_transaction,
     create_transaction_data,
+    call_contract_batch,
     get_logs,
+    get_contract_logs,
+    make_contract_logs_filter,
+    decode_contract_logs,
     get_event_blocking,
     wait_for_transaction,
 
+    EventLog,
+    EventDecoders,
+    get_event_decoders,
+
+    CryptoExecutor,
+    ThreadPoolCryptoExecutor,
+
+    PooledHTTPProvider,
+    supports_batch,
+    batch_request,
+
     check_permission_safety,
     get_private_key,
 
@@ -2,14 +2,20 @@ from typing import List, Any, Union, Dict
 
 import gevent
 import rlp
-from eth_utils import decode_hex, encode_hex
+from eth_abi import encode_single, decode_abi
+from eth_abi.exceptions import DecodingError
+from eth_utils import decode_hex, encode_hex, event_abi_to_log_topic
 from ethereum.transactions import Transaction
 from web3 import Web3
-from web3.contract import Contract
+from web3.contract import Contract, find_matching_fn_abi
+from web3.utils.abi import get_abi_output_types, map_abi_data
+from web3.utils.normalizers import BASE_RETURN_NORMALIZERS
 
 from microraiden.config import NETWORK_CFG
 from microraiden.utils import privkey_to_addr, sign_transaction
 from microraiden.utils.populus_compat import LogFilter
+from microraiden.utils.events import get_event_decoders
+from microraiden.utils.provider import batch_request
 
 DEFAULT_TIMEOUT = 60
 DEFAULT_RETRY_INTERVAL = 3
@@ -165,6 +171,54 @@ def create_transaction_data(contract: Contract, func_name: str, args: List[Any])
     return decode_hex(data)
 
 
+def call_contract_batch(
+        contract: Contract,
+        func_name: str,
+        args_list: List[List[Any]],
+        block_identifier: Union[int, str] = 'latest'
+):
+    """Call a constant function of the contract with several sets of arguments.
+
+    The calls are sent as one JSON-RPC batch if the provider supports it, see
+    `batch_request`.
+
+    Returns:
+        list: outputs in the order of `args_list` as `contract.call()` returns them,
+            None for calls that reverted
+    Raises:
+        ValueError: the node failed a call for another reason
+    """
+    if not args_list:
+        return []
+    if isinstance(block_identifier, int):
+        block_identifier = hex(block_identifier)
+    fn_abi = find_matching_fn_abi(contract.abi, func_name, args_list[0])
+    output_types = get_abi_output_types(fn_abi)
+    responses = batch_request(contract.web3, [
+        ('eth_call', [
+            {'to': contract.address, 'data': contract.encodeABI(func_name, args=args)},
+            block_identifier
+        ])
+        for args in args_list
+    ])
+    outputs = []
+    for response in responses:
+        if 'error' in response:
+            if 'revert' not in str(response['error']).lower():
+                raise ValueError(response['error'])
+            outputs.append(None)
+            continue
+        try:
+            output = decode_abi(output_types, decode_hex(response['result']))
+        except DecodingError:
+            # an empty result, the call reverted
+            outputs.append(None)
+            continue
+        output = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, output)
+        outputs.append(output[0] if len(output) == 1 else output)
+    return outputs
+
+
 def get_logs(
         contract: Contract,
         event_name: str,
@@ -172,19 +226,15 @@ def get_logs(
         to_block: Union[int, str] = 'pending',
         argument_filters: Dict[str, Any] = None
 ):
-    event_abi = [
-        abi_element for abi_element in contract.abi
-        if abi_element['type'] == 'event' and abi_element['name'] == event_name
-    ]
-    assert len(event_abi) == 1, 'No event found matching name {}.'.format(event_name)
-    event_abi = event_abi[0]
+    decoder = get_event_decoders(contract).by_name.get(event_name)
+    assert decoder is not None, 'No event found matching name {}.'.format(event_name)
 
     if argument_filters is None:
         argument_filters = {}
 
     tmp_filter = LogFilter(
         contract.web3,
-        [event_abi],
+        [decoder.event_abi],
         contract.address,
         event_name,
         from_block,
@@ -196,9 +246,84 @@ def get_logs(
     return logs
 
 
+def get_contract_logs(
+        contract: Contract,
+        event_names: List[str],
+        from_block: Union[int, str] = 0,
+        to_block: Union[int, str] = 'pending',
+        argument_filters: Dict[str, Any] = None
+):
+    """Fetch the logs of several events with a single `eth_getLogs` request.
+
+    Logs are decoded locally into `EventLog` records, which are read like the logs of
+    `get_logs`, ordered by block number and log index. Argument filters are limited to
+    indexed arguments that have the same position in all events; a list of values
+    matches any of them.
+    """
+    filter_params = make_contract_logs_filter(
+        contract,
+        event_names,
+        from_block,
+        to_block,
+        argument_filters
+    )
+    return decode_contract_logs(contract, _get_logs_raw(contract, filter_params))
+
+
+def make_contract_logs_filter(
+        contract: Contract,
+        event_names: List[str],
+        from_block: Union[int, str] = 0,
+        to_block: Union[int, str] = 'pending',
+        argument_filters: Dict[str, Any] = None
+):
+    """Filter parameters of `eth_getLogs` for `get_contract_logs`, e.g. for a batch request.
+
+    Block numbers are hex encoded, so that the filter can be sent as is.
+    """
+    decoders = get_event_decoders(contract).by_name
+    event_abis = [decoders[name].event_abi for name in event_names if name in decoders]
+    assert len(event_abis) == len(event_names), \
+        'No events found matching names {}.'.format(event_names)
+
+    topics = [[encode_hex(event_abi_to_log_topic(event_abi)) for event_abi in event_abis]]
+    for name, value in (argument_filters or {}).items():
+        positions = set()
+        for event_abi in event_abis:
+            indexed = [arg for arg in event_abi['inputs'] if arg['indexed']]
+            position = [arg['name'] for arg in indexed].index(name)
+            positions.add((position + 1, indexed[position]['type']))
+        assert len(positions) == 1, \
+            'Argument {} is not indexed at the same position in all events.'.format(name)
+        position, arg_type = positions.pop()
+        topics.extend([None] * (position + 1 - len(topics)))
+        if isinstance(value, (list, tuple)):
+            topics[position] = [encode_hex(encode_single(arg_type, v)) for v in value]
+        else:
+            topics[position] = encode_hex(encode_single(arg_type, value))
+
+    return {
+        'fromBlock': hex(from_block) if isinstance(from_block, int) else from_block,
+        'toBlock': hex(to_block) if isinstance(to_block, int) else to_block,
+        'address': contract.address,
+        'topics': topics
+    }
+
+
+def decode_contract_logs(contract: Contract, logs: list):
+    """Decode logs of the contract's events, see `get_contract_logs`.
+
+    The logs can be formatted by web3 or JSON-RPC results as the node returns them.
+    """
+    decoders = get_event_decoders(contract)
+    formatted_logs = [decoders.decode(log) for log in logs]
+    formatted_logs.sort(key=lambda log: (log.block_number, log.log_index))
+    return formatted_logs
+
+
 def _get_logs_raw(contract: Contract, filter_params: Dict[str, Any]):
     """For easy patching."""
-    return contract.web3._requestManager.request_blocking('eth_getLogs', [filter_params])
+    return contract.web3.eth.getLogs(filter_params)
 
 
 def get_event_blocking(
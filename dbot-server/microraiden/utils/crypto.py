@@ -171,6 +171,37 @@ def get_balance_message(
     ])
 
 
+class BalanceProofVerifier(object):
+    """Verifies the balance proofs of one receiver and channel manager contract.
+
+    The typed data message of a balance proof differs from proof to proof only by the
+    balance. The schema hash and the packed message id, receiver and contract are computed
+    once, so a proof is hashed by packing its balance and two keccak256 calls.
+    """
+
+    def __init__(self, receiver: str, contract_address: str):
+        self.receiver = receiver
+        self.contract_address = contract_address
+        self._schema_hash = keccak256(
+            'string message_id',
+            'address receiver',
+            'uint256 balance',
+            'address contract'
+        )
+        self._data_prefix = pack('Sender balance proof signature', receiver)
+        self._data_suffix = pack(contract_address)
+
+    def get_balance_message(self, balance: int) -> bytes:
+        """Same as `get_balance_message` for the verifier's receiver and contract."""
+        assert isinstance(balance, int) and 0 <= balance < 1 << 256
+        data = self._data_prefix + balance.to_bytes(32, 'big') + self._data_suffix
+        return keccak(self._schema_hash + keccak(data))
+
+    def verify_balance_proof(self, balance: int, balance_sig: bytes) -> str:
+        """Same as `verify_balance_proof` for the verifier's receiver and contract."""
+        return addr_from_sig(balance_sig, self.get_balance_message(balance))
+
+
 def sign_balance_proof(
         privkey: str, receiver: str, open_block_number: int, balance: int, contract_address: str
 ) -> bytes:
@@ -0,0 +1,200 @@
+"""Event decoders compiled once per contract ABI."""
+import weakref
+from functools import lru_cache
+
+from eth_utils import event_abi_to_log_topic, to_checksum_address
+from hexbytes import HexBytes
+from web3.contract import Contract
+from web3.utils.events import get_event_data
+from web3.middleware.pythonic import log_entry_formatter
+
+
+class EventLog(object):
+    """A decoded log, the lightweight counterpart of the dicts returned by web3.
+
+    Fields can be read as attributes or with the keys of web3's log entries, so that
+    `log['blockNumber']` and `log.block_number` are the same.
+    """
+
+    __slots__ = (
+        'event',
+        'args',
+        'address',
+        'block_number',
+        'block_hash',
+        'transaction_hash',
+        'transaction_index',
+        'log_index'
+    )
+
+    KEYS = {
+        'event': 'event',
+        'args': 'args',
+        'address': 'address',
+        'blockNumber': 'block_number',
+        'blockHash': 'block_hash',
+        'transactionHash': 'transaction_hash',
+        'transactionIndex': 'transaction_index',
+        'logIndex': 'log_index'
+    }
+
+    def __init__(
+            self,
+            event,
+            args,
+            address,
+            block_number,
+            block_hash,
+            transaction_hash,
+            transaction_index,
+            log_index
+    ):
+        self.event = event
+        self.args = args
+        self.address = address
+        self.block_number = block_number
+        self.block_hash = block_hash
+        self.transaction_hash = transaction_hash
+        self.transaction_index = transaction_index
+        self.log_index = log_index
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, self.KEYS[key])
+        except KeyError:
+            raise KeyError(key)
+
+    def __repr__(self):
+        return '<EventLog {} block={} index={} {}>'.format(
+            self.event, self.block_number, self.log_index, self.args)
+
+
+@lru_cache(maxsize=65536)
+def _checksum_address(value: bytes):
+    # senders and receivers recur, checksumming hashes the address every time
+    return to_checksum_address(value)
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+
+def _to_int(value):
+    if isinstance(value, str):
+        return int(value, 16)
+    return value
+
+
+def _word_decoder(abi_type: str):
+    """Decoder of a 32 byte word of a static type, None if the type isn't supported."""
+    if '[' in abi_type:
+        # arrays, e.g. uint256[] or address[2], are not a single word
+        return None
+    if abi_type == 'address':
+        return lambda word: _checksum_address(word[12:])
+    if abi_type == 'bool':
+        return lambda word: word[-1] == 1
+    if abi_type == 'bytes32':
+        return bytes
+    if abi_type.startswith('uint'):
+        return lambda word: int.from_bytes(word, 'big')
+    if abi_type.startswith('int'):
+        return lambda word: int.from_bytes(word, 'big', signed=True)
+    return None
+
+
+class EventDecoder(object):
+    """Decoder of one event, with the positions and types of its arguments resolved.
+
+    Events with dynamic arguments are decoded by web3's `get_event_data`.
+    """
+
+    def __init__(self, event_abi: dict):
+        self.event_abi = event_abi
+        self.name = event_abi['name']
+        self.topic = event_abi_to_log_topic(event_abi)
+        indexed = [arg for arg in event_abi['inputs'] if arg['indexed']]
+        data = [arg for arg in event_abi['inputs'] if not arg['indexed']]
+        self.topic_args = [(arg['name'], _word_decoder(arg['type'])) for arg in indexed]
+        self.data_args = [(arg['name'], _word_decoder(arg['type'])) for arg in data]
+        self.compiled = not event_abi.get('anonymous') and all(
+            decoder is not None for _, decoder in self.topic_args + self.data_args)
+
+    def decode_args(self, log):
+        """
+        Returns:
+            dict: arguments of the event, as `get_event_data` decodes them
+        """
+        if not self.compiled:
+            if isinstance(log['logIndex'], str):
+                log = log_entry_formatter(log)
+            return get_event_data(self.event_abi, log)['args']
+        topics = log['topics']
+        if len(topics) != len(self.topic_args) + 1:
+            raise ValueError('Expected {0} log topics.  Got {1}'.format(
+                len(self.topic_args), len(topics) - 1))
+        args = {}
+        for (name, decoder), topic in zip(self.topic_args, topics[1:]):
+            args[name] = decoder(_to_bytes(topic))
+        data = _to_bytes(log['data'])
+        for i, (name, decoder) in enumerate(self.data_args):
+            args[name] = decoder(data[32 * i:32 * i + 32])
+        return args
+
+    def decode(self, log):
+        """Decode a log entry, formatted by web3 or as returned by the node.
+
+        Returns:
+            EventLog: the decoded log
+        """
+        block_hash = log['blockHash']
+        transaction_hash = log['transactionHash']
+        return EventLog(
+            self.name,
+            self.decode_args(log),
+            log['address'],
+            _to_int(log['blockNumber']),
+            None if block_hash is None else HexBytes(block_hash),
+            None if transaction_hash is None else HexBytes(transaction_hash),
+            _to_int(log['transactionIndex']),
+            _to_int(log['logIndex'])
+        )
+
+
+class EventDecoders(object):
+    """Decoders of all events of a contract ABI, keyed by the event topic."""
+
+    def __init__(self, abi: list):
+        self.by_topic = {}
+        self.by_name = {}
+        for abi_element in abi:
+            if abi_element['type'] != 'event':
+                continue
+            decoder = EventDecoder(abi_element)
+            self.by_topic[decoder.topic] = decoder
+            self.by_name[decoder.name] = decoder
+
+    def decode(self, log):
+        """
+        Returns:
+            EventLog: the decoded log
+        Raises:
+            KeyError: the log isn't an event of the ABI
+        """
+        return self.by_topic[_to_bytes(log['topics'][0])].decode(log)
+
+
+_contract_decoders = weakref.WeakKeyDictionary()
+
+
+def get_event_decoders(contract: Contract):
+    """
+    Returns:
+        EventDecoders: decoders of the contract's events, built on the first call
+    """
+    decoders = _contract_decoders.get(contract)
+    if decoders is None:
+        decoders = _contract_decoders[contract] = EventDecoders(contract.abi)
+    return decoders
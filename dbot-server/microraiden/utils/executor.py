@@ -0,0 +1,102 @@
+"""Executors for the CPU bound signature functions of `microraiden.utils.crypto`."""
+from typing import Callable, List
+
+import gevent
+import gevent.event
+import gevent.threadpool
+
+
+class CryptoExecutor(object):
+    """Runs signature recovery and signing in the calling greenlet.
+
+    Base class and default of the executors: the work runs on the gevent hub, so other
+    greenlets wait until it is done.
+    """
+
+    def submit(self, func: Callable, *args):
+        """Run `func(*args)` and return its result once it is done.
+
+        Only the calling greenlet waits for the result.
+        """
+        return func(*args)
+
+    def map(self, func: Callable, args_list: List[tuple]) -> list:
+        """
+        Returns:
+            list: results of `func(*args)` for every `args` of `args_list`
+        """
+        return [func(*args) for args in args_list]
+
+    def close(self):
+        pass
+
+
+def _run_batch(calls: list):
+    results = []
+    for func, args in calls:
+        try:
+            results.append((True, func(*args)))
+        except Exception as e:
+            results.append((False, e))
+    return results
+
+
+class ThreadPoolCryptoExecutor(CryptoExecutor):
+    """Runs signature recovery and signing in a pool of native threads.
+
+    coincurve releases the GIL while it computes, so the work of concurrent requests is
+    spread over the cores while the hub keeps serving other greenlets. Calls submitted
+    during one iteration of the event loop are handed to the pool together, in batches
+    of up to `batch_size` calls, so a burst of requests costs few thread switches.
+    """
+    batch_size = 64
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size (int): number of threads
+        """
+        assert size > 0
+        self.pool = gevent.threadpool.ThreadPool(size)
+        self._pending = []
+
+    def submit(self, func: Callable, *args):
+        result = gevent.event.AsyncResult()
+        if not self._pending:
+            gevent.get_hub().loop.run_callback(self._dispatch)
+        self._pending.append((func, args, result))
+        return result.get()
+
+    def _dispatch(self):
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self.batch_size):
+            gevent.spawn(self._run, pending[i:i + self.batch_size])
+
+    def _run(self, batch: list):
+        try:
+            outcomes = self.pool.apply(_run_batch, ([(func, args) for func, args, _ in batch],))
+        except BaseException as e:
+            for _, _, result in batch:
+                result.set_exception(e)
+            raise
+        for (_, _, result), (ok, value) in zip(batch, outcomes):
+            if ok:
+                result.set(value)
+            else:
+                result.set_exception(value)
+
+    def map(self, func: Callable, args_list: List[tuple]) -> list:
+        batches = [
+            [(func, args) for args in args_list[i:i + self.batch_size]]
+            for i in range(0, len(args_list), self.batch_size)
+        ]
+        results = []
+        for outcomes in self.pool.imap(_run_batch, batches):
+            for ok, value in outcomes:
+                if not ok:
+                    raise value
+                results.append(value)
+        return results
+
+    def close(self):
+        self.pool.kill()
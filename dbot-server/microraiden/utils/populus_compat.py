@@ -2,6 +2,8 @@ from web3.utils.filters import construct_event_filter_params
 import functools
 from web3.utils.events import get_event_data
 
+from microraiden.utils.events import EventDecoder
+
 
 class LogFilter:
     def __init__(
@@ -33,6 +35,7 @@ class LogFilter:
 
         self.event_abi = event_abi[0]
         assert self.event_abi
+        self.decoder = EventDecoder(self.event_abi)
 
         filters = filters if filters else {}
 
@@ -63,7 +66,7 @@ class LogFilter:
         return formatted_logs
 
     def set_log_data(self, log):
-        log['args'] = get_event_data(self.event_abi, log)['args']
+        log['args'] = self.decoder.decode_args(log)
         log['event'] = self.event_name
         return log
 
@@ -0,0 +1,127 @@
+from types import MappingProxyType
+from typing import List, Tuple, Any
+
+import requests
+from eth_utils import to_bytes, to_text
+from web3 import Web3, HTTPProvider
+from web3.utils.encoding import FriendlyJsonSerde
+
+# seconds to wait for the response of a method, other methods wait `timeout` seconds
+DEFAULT_METHOD_TIMEOUTS = MappingProxyType({
+    'eth_getLogs': 60,
+    'eth_call': 20,
+    'eth_estimateGas': 20
+})
+
+
+class PooledHTTPProvider(HTTPProvider):
+    """`HTTPProvider` with a keep-alive connection pool, per-method timeouts and batches.
+
+    The shared session of `HTTPProvider` keeps at most 10 idle connections and opens a new
+    one for every concurrent request beyond that. This provider keeps up to `pool_size`
+    connections open; greenlets wait for a free connection instead of opening more.
+    """
+
+    def __init__(
+            self,
+            endpoint_uri: str = None,
+            pool_size: int = 16,
+            timeout: float = 10,
+            method_timeouts: dict = None,
+            request_kwargs: dict = None
+    ):
+        """
+        Args:
+            endpoint_uri (str, optional): URI of the node's JSON-RPC endpoint
+            pool_size (int, optional): maximum number of connections to the node
+            timeout (float, optional): default seconds to wait for a response
+            method_timeouts (dict, optional): timeouts of single methods, in addition to
+                `DEFAULT_METHOD_TIMEOUTS`
+            request_kwargs (dict, optional): keyword arguments for `requests.Session.post`
+        """
+        super().__init__(endpoint_uri, request_kwargs)
+        self.timeout = timeout
+        self.method_timeouts = dict(DEFAULT_METHOD_TIMEOUTS, **(method_timeouts or {}))
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            pool_block=True
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _post(self, data: bytes, timeout: float):
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault('timeout', timeout)
+        response = self.session.post(self.endpoint_uri, data=data, **kwargs)
+        response.raise_for_status()
+        return response.content
+
+    def make_request(self, method, params):
+        self.logger.debug("Making request HTTP. URI: %s, Method: %s",
+                          self.endpoint_uri, method)
+        raw_response = self._post(
+            self.encode_rpc_request(method, params),
+            self.method_timeouts.get(method, self.timeout)
+        )
+        return self.decode_rpc_response(raw_response)
+
+    def make_batch_request(self, calls: List[Tuple[str, Any]]):
+        """Send several requests in one JSON-RPC batch.
+
+        Args:
+            calls (list): (method, params) of every request
+        Returns:
+            list: JSON-RPC responses in the order of `calls`, results are unformatted
+        """
+        if not calls:
+            return []
+        batch = [
+            {
+                'jsonrpc': '2.0',
+                'method': method,
+                'params': params or [],
+                'id': next(self.request_counter)
+            }
+            for method, params in calls
+        ]
+        self.logger.debug("Making batch request HTTP. URI: %s, Methods: %s",
+                          self.endpoint_uri, [method for method, _ in calls])
+        raw_response = self._post(
+            to_bytes(text=FriendlyJsonSerde().json_encode(batch)),
+            max(self.method_timeouts.get(method, self.timeout) for method, _ in calls)
+        )
+        responses = FriendlyJsonSerde().json_decode(to_text(raw_response))
+        if not isinstance(responses, list):
+            # nodes answer a batch they can't process with a single error
+            raise ValueError(responses.get('error', responses))
+        by_id = {response.get('id'): response for response in responses}
+        return [
+            by_id.get(request['id'], {'error': 'missing response in batch'})
+            for request in batch
+        ]
+
+
+def supports_batch(web3: Web3) -> bool:
+    """
+    Returns:
+        bool: True if the provider of `web3` sends batch requests in one round trip
+    """
+    return hasattr(web3.providers[0], 'make_batch_request')
+
+
+def batch_request(web3: Web3, calls: List[Tuple[str, Any]]):
+    """Send JSON-RPC requests as one batch if the provider supports it, else one by one.
+
+    The requests bypass the web3 middlewares, so results are returned as the node sends them.
+
+    Args:
+        calls (list): (method, params) of every request
+    Returns:
+        list: JSON-RPC responses in the order of `calls`
+    """
+    provider = web3.providers[0]
+    if supports_batch(web3):
+        return provider.make_batch_request(calls)
+    return [provider.make_request(method, params) for method, params in calls]
@@ -3,6 +3,12 @@
 
 import unittest
 from test_hello import *
+from test_snapshot import *
+from test_session import *
+from test_sync import *
+from test_state import *
+from test_crypto import *
+from test_events import *
 
 
 if __name__ == '__main__':
@@ -0,0 +1,21 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests that run a `JSONRPCNode` in the test process.
+
+The node is a gevent server, so blocking clients such as the HTTP provider of web3 only
+reach it with the standard library patched. The patching is done here, before anything
+else is imported, and only applies to the tests of this suite:
+
+    cd tests && python gevent_suite.py
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import unittest
+from test_new_heads import *
+from test_services import *
+from test_paywall import *
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Local stand-in for the JSON-RPC interface of an Ethereum node.
+
+Serves a chain of empty blocks over HTTP, WebSocket and IPC, with `eth_subscribe('newHeads')`
+notifications for every block that is mined or reorganized.
+
+    node = JSONRPCNode(ipc_path='/tmp/node.ipc')
+    node.start()
+    node.mine(3)
+    node.reorg(2)
+    node.stop()
+"""
+import os
+import json
+import base64
+import struct
+import hashlib
+import itertools
+
+from gevent import socket
+from gevent.server import StreamServer
+
+# RFC 6455, kept apart from the client so that the tests check it against the protocol
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+OPCODE_TEXT = 0x1
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+
+class Connection(object):
+    """A WebSocket or IPC client of the node."""
+
+    def __init__(self, sock, websocket=False):
+        self.sock = sock
+        self.websocket = websocket
+        self.buffer = b''
+        self.subscriptions = set()
+
+    def receive(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError('connection closed')
+        self.buffer += chunk
+
+    def read(self, n):
+        while len(self.buffer) < n:
+            self.receive()
+        data, self.buffer = self.buffer[:n], self.buffer[n:]
+        return data
+
+    def recv(self):
+        if not self.websocket:
+            decoder = json.JSONDecoder()
+            while True:
+                data = self.buffer.decode().lstrip()
+                if data:
+                    try:
+                        message, end = decoder.raw_decode(data)
+                    except ValueError:
+                        pass
+                    else:
+                        self.buffer = data[end:].encode()
+                        return message
+                self.receive()
+        while True:
+            b0, b1 = self.read(2)
+            opcode, n = b0 & 0x0f, b1 & 0x7f
+            if n == 126:
+                n, = struct.unpack('!H', self.read(2))
+            elif n == 127:
+                n, = struct.unpack('!Q', self.read(8))
+            mask = self.read(4)
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self.read(n)))
+            if opcode == OPCODE_CLOSE:
+                raise ConnectionError('connection closed')
+            if opcode == OPCODE_PING:
+                self.send_frame(OPCODE_PONG, payload)
+            elif opcode == OPCODE_TEXT:
+                return json.loads(payload.decode())
+
+    def send_frame(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack('!BB', 0x80 | opcode, n)
+        elif n < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, n)
+        self.sock.sendall(header + payload)
+
+    def send(self, message):
+        data = json.dumps(message).encode()
+        if self.websocket:
+            self.send_frame(OPCODE_TEXT, data)
+        else:
+            self.sock.sendall(data)
+
+
+class JSONRPCNode(object):
+    """JSON-RPC node with a chain of empty blocks that only changes on request."""
+
+    def __init__(self, host='127.0.0.1', port=0, ipc_path=None, network_id=1):
+        self.network_id = network_id
+        self.blocks = []
+        self.connections = set()
+        self.requests = []
+        self._ids = itertools.count(1)
+        self._forks = itertools.count(1)
+        self.server = StreamServer((host, port), self._handle)
+        self.ipc_path = ipc_path
+        self.ipc_server = None
+        if ipc_path is not None:
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(ipc_path)
+            listener.listen(16)
+            self.ipc_server = StreamServer(listener, self._handle_ipc)
+        self._append_block(0)
+
+    @property
+    def http_uri(self):
+        return 'http://%s:%d' % self.server.address
+
+    @property
+    def ws_uri(self):
+        return 'ws://%s:%d' % self.server.address
+
+    def start(self):
+        self.server.start()
+        if self.ipc_server is not None:
+            self.ipc_server.start()
+
+    def stop(self):
+        self.server.stop()
+        if self.ipc_server is not None:
+            self.ipc_server.stop()
+            os.unlink(self.ipc_path)
+        for connection in list(self.connections):
+            connection.sock.close()
+
+    def _append_block(self, fork):
+        number = len(self.blocks)
+        block_hash = '0x' + hashlib.sha256(b'%d:%d' % (fork, number)).hexdigest()
+        self.blocks.append({
+            'number': hex(number),
+            'hash': block_hash,
+            'parentHash': self.blocks[-1]['hash'] if self.blocks else '0x' + '00' * 32,
+            'timestamp': hex(number),
+            'transactions': [],
+            'logsBloom': '0x' + '00' * 256,
+            'gasLimit': hex(8000000),
+            'gasUsed': '0x0',
+            'miner': '0x' + '00' * 20,
+            'difficulty': '0x1',
+            'totalDifficulty': hex(number + 1),
+            'extraData': '0x',
+            'nonce': '0x' + '00' * 8,
+            'sha3Uncles': '0x' + '00' * 32,
+            'stateRoot': '0x' + '00' * 32,
+            'transactionsRoot': '0x' + '00' * 32,
+            'receiptsRoot': '0x' + '00' * 32,
+            'size': '0x0',
+            'uncles': []
+        })
+        self._announce(self.blocks[-1])
+
+    def mine(self, n=1):
+        """Append `n` blocks and announce them to the newHeads subscribers."""
+        for _ in range(n):
+            self._append_block(0)
+
+    def reorg(self, depth, n=None):
+        """Replace the last `depth` blocks by `n` (default `depth`) blocks of a new fork."""
+        fork = next(self._forks)
+        del self.blocks[len(self.blocks) - depth:]
+        for _ in range(depth if n is None else n):
+            self._append_block(fork)
+
+    def _announce(self, block):
+        for connection in list(self.connections):
+            for subscription in connection.subscriptions:
+                try:
+                    connection.send({
+                        'jsonrpc': '2.0',
+                        'method': 'eth_subscription',
+                        'params': {'subscription': subscription, 'result': block}
+                    })
+                except OSError:
+                    self.connections.discard(connection)
+
+    def _block(self, identifier):
+        if identifier == 'latest':
+            return self.blocks[-1]
+        if identifier == 'earliest':
+            return self.blocks[0]
+        if identifier.startswith('0x') and len(identifier) == 66:
+            return next((b for b in self.blocks if b['hash'] == identifier), None)
+        number = int(identifier, 16)
+        return self.blocks[number] if number < len(self.blocks) else None
+
+    def call(self, method, params, connection=None):
+        """Result of a JSON-RPC request."""
+        self.requests.append(method)
+        if method == 'net_version':
+            return str(self.network_id)
+        if method == 'eth_blockNumber':
+            return hex(len(self.blocks) - 1)
+        if method in ('eth_getBlockByNumber', 'eth_getBlockByHash'):
+            return self._block(params[0])
+        if method == 'eth_getLogs':
+            return []
+        if method == 'eth_getCode':
+            return '0x'
+        if method == 'eth_subscribe' and connection is not None and params == ['newHeads']:
+            subscription = hex(next(self._ids))
+            connection.subscriptions.add(subscription)
+            return subscription
+        if method == 'eth_unsubscribe' and connection is not None:
+            found = params[0] in connection.subscriptions
+            connection.subscriptions.discard(params[0])
+            return found
+        raise ValueError('method not supported: %s' % method)
+
+    def _respond(self, request, connection=None):
+        try:
+            response = {'result': self.call(request['method'], request.get('params', []),
+                                            connection)}
+        except ValueError as e:
+            response = {'error': {'code': -32601, 'message': str(e)}}
+        response.update(jsonrpc='2.0', id=request.get('id'))
+        return response
+
+    def _serve(self, connection):
+        self.connections.add(connection)
+        try:
+            while True:
+                connection.send(self._respond(connection.recv(), connection))
+        except OSError:
+            pass
+        finally:
+            self.connections.discard(connection)
+
+    def _handle_ipc(self, sock, address):
+        self._serve(Connection(sock))
+
+    def _handle(self, sock, address):
+        connection = Connection(sock)
+        while b'\r\n\r\n' not in connection.buffer:
+            try:
+                connection.receive()
+            except OSError:
+                return
+        head, connection.buffer = connection.buffer.split(b'\r\n\r\n', 1)
+        lines = head.decode('latin-1').split('\r\n')
+        headers = dict(
+            (name.strip().lower(), value.strip())
+            for name, value in (line.split(':', 1) for line in lines[1:] if ':' in line)
+        )
+        if headers.get('upgrade', '').lower() == 'websocket':
+            accept = base64.b64encode(hashlib.sha1(
+                (headers['sec-websocket-key'] + WEBSOCKET_GUID).encode()).digest()).decode()
+            sock.sendall((
+                'HTTP/1.1 101 Switching Protocols\r\n'
+                'Upgrade: websocket\r\n'
+                'Connection: Upgrade\r\n'
+                'Sec-WebSocket-Accept: %s\r\n\r\n' % accept
+            ).encode())
+            connection.websocket = True
+            self._serve(connection)
+            return
+        body = connection.read(int(headers.get('content-length', 0)))
+        request = json.loads(body.decode())
+        if isinstance(request, list):
+            response = [self._respond(r) for r in request]
+        else:
+            response = self._respond(request)
+        data = json.dumps(response).encode()
+        sock.sendall((
+            'HTTP/1.1 200 OK\r\n'
+            'Content-Type: application/json\r\n'
+            'Content-Length: %d\r\n'
+            'Connection: close\r\n\r\n' % len(data)
+        ).encode() + data)
+        sock.close()
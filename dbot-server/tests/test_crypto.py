@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+
+from eth_utils import is_same_address
+from web3 import Web3
+
+from microraiden.utils import (
+    privkey_to_addr,
+    sign_balance_proof,
+    verify_balance_proof,
+    get_balance_message
+)
+from microraiden.utils.crypto import BalanceProofVerifier
+
+SENDER_KEY = '0x' + '5a' * 32
+SENDER = privkey_to_addr(SENDER_KEY)
+RECEIVER = privkey_to_addr('0x' + '77' * 32)
+CONTRACT = Web3.toChecksumAddress('0x' + '22' * 20)
+
+
+class BalanceProofVerifierTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = BalanceProofVerifier(RECEIVER, CONTRACT)
+
+    def test_same_message(self):
+        for balance in (0, 1, 10 ** 18, (1 << 256) - 1):
+            assert self.verifier.get_balance_message(balance) == \
+                get_balance_message(RECEIVER, 5, balance, CONTRACT)
+
+    def test_recovers_sender(self):
+        for balance in (0, 123, 10 ** 18):
+            sig = sign_balance_proof(SENDER_KEY, RECEIVER, 5, balance, CONTRACT)
+            signer = self.verifier.verify_balance_proof(balance, sig)
+            assert is_same_address(signer, SENDER)
+            assert signer == verify_balance_proof(RECEIVER, 5, balance, sig, CONTRACT)
+
+    def test_tampered_proof(self):
+        sig = sign_balance_proof(SENDER_KEY, RECEIVER, 5, 123, CONTRACT)
+        assert not is_same_address(self.verifier.verify_balance_proof(124, sig), SENDER)
+        tampered = bytearray(sig)
+        tampered[10] ^= 1
+        assert not is_same_address(
+            self.verifier.verify_balance_proof(123, bytes(tampered)), SENDER)
+        tampered = bytearray(sig)
+        tampered[64] = 30
+        with self.assertRaises(ValueError):
+            self.verifier.verify_balance_proof(123, bytes(tampered))
+
+    def test_other_receiver_or_contract(self):
+        sig = sign_balance_proof(SENDER_KEY, RECEIVER, 5, 123, CONTRACT)
+        for verifier in (BalanceProofVerifier(SENDER, CONTRACT),
+                         BalanceProofVerifier(RECEIVER, RECEIVER)):
+            assert not is_same_address(verifier.verify_balance_proof(123, sig), SENDER)
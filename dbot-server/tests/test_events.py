@@ -0,0 +1,25 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+
+from microraiden.utils.events import EventDecoder
+
+
+def event_abi(*types):
+    return {
+        'name': 'Event',
+        'type': 'event',
+        'anonymous': False,
+        'inputs': [{'name': 'arg%d' % i, 'type': type_, 'indexed': False}
+                   for i, type_ in enumerate(types)]
+    }
+
+
+class EventDecoderTestCase(unittest.TestCase):
+
+    def test_static_words_are_compiled(self):
+        assert EventDecoder(event_abi('address', 'uint256', 'int8', 'bool', 'bytes32')).compiled
+
+    def test_arrays_are_decoded_by_web3(self):
+        for array_type in ('uint256[]', 'int32[]', 'uint8[2]', 'address[]'):
+            assert not EventDecoder(event_abi('uint256', array_type)).compiled
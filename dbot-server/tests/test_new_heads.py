@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+import gevent
+from web3 import Web3, HTTPProvider
+
+from microraiden.channel_manager.heads import NewHeads
+from microraiden.channel_manager.headers import HeaderCache
+from jsonrpc_node import JSONRPCNode
+
+
+class NewHeadsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.node = JSONRPCNode(ipc_path=os.path.join(self.tmpdir, 'node.ipc'))
+        self.node.start()
+        self.node.mine(10)
+
+    def tearDown(self):
+        self.node.stop()
+        os.rmdir(self.tmpdir)
+
+    def follow(self, endpoint_uri):
+        new_heads = NewHeads(endpoint_uri)
+        new_heads.reconnect_interval = 0.1
+        new_heads.start()
+        with gevent.Timeout(5):
+            while not new_heads.subscribed:
+                gevent.sleep(0.01)
+        self.addCleanup(new_heads.kill)
+        self.addCleanup(new_heads.stop)
+        return new_heads
+
+    def check_new_blocks(self, new_heads):
+        self.node.mine()
+        head = new_heads.wait(None, 5)
+        assert head.number == 11
+        assert head.hash.hex() == self.node.blocks[11]['hash']
+        # a head that arrived before waiting is returned right away
+        self.node.mine()
+        with gevent.Timeout(0.1):
+            assert new_heads.wait(head, 5).number == 12
+
+    def test_websocket(self):
+        self.check_new_blocks(self.follow(self.node.ws_uri))
+
+    def test_ipc(self):
+        self.check_new_blocks(self.follow(self.node.ipc_path))
+
+    def test_reorg_updates_header_cache(self):
+        new_heads = self.follow(self.node.ws_uri)
+        headers = HeaderCache(Web3(HTTPProvider(self.node.http_uri)))
+        latest = headers.update(3)
+        self.node.reorg(2, 3)
+        head = None
+        while head is None or head.number < 11:
+            head = new_heads.wait(latest, 5)
+        n_requests = len(self.node.requests)
+        assert headers.update(3, head) == head
+        # only the replaced blocks are fetched, the head came with the notification
+        assert self.node.requests[n_requests:] == ['eth_getBlockByNumber'] * 2
+        assert headers.is_canonical(9, self.node.blocks[9]['hash'])
+        assert headers.is_canonical(10, self.node.blocks[10]['hash'])
+
+    def test_fallback_to_polling(self):
+        new_heads = self.follow(self.node.ws_uri)
+        self.node.stop()
+        with gevent.Timeout(5):
+            while new_heads.subscribed:
+                gevent.sleep(0.01)
+        # without a subscription the poll interval is waited and the caller polls
+        with gevent.Timeout(1):
+            assert new_heads.wait(None, 0.1) is None
+        self.node = JSONRPCNode(ipc_path=self.node.ipc_path, port=self.node.server.address[1])
+        self.node.start()
+        with gevent.Timeout(5):
+            while not new_heads.subscribed:
+                gevent.sleep(0.01)
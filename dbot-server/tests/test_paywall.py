@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+
+from eth_utils import encode_hex
+from web3 import Web3, HTTPProvider
+from werkzeug.datastructures import EnvironHeaders
+
+from dbot.service import Paywall
+from microraiden import HTTPHeaders
+from microraiden.channel_manager import ChannelManager, Channel, ChannelState
+from microraiden.config import NETWORK_CFG
+from microraiden.make_helpers import make_channel_manager_contract
+from microraiden.utils import privkey_to_addr, sign_balance_proof
+from jsonrpc_node import JSONRPCNode
+
+RECEIVER_KEY = '0x' + '77' * 32
+SENDER_KEY = '0x' + '5a' * 32
+RECEIVER = privkey_to_addr(RECEIVER_KEY)
+SENDER = privkey_to_addr(SENDER_KEY)
+OPEN_BLOCK_NUMBER = 5
+PRICE = 10
+
+
+class PaywallSessionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.node = JSONRPCNode()
+        self.node.start()
+        web3 = Web3(HTTPProvider(self.node.http_uri))
+        self.contract = make_channel_manager_contract(web3, NETWORK_CFG.channel_manager_address)
+        self.channel_manager = ChannelManager(web3, self.contract, RECEIVER, RECEIVER_KEY,
+                                              state_filename=':memory:')
+        channel = Channel(RECEIVER, SENDER, 1000, OPEN_BLOCK_NUMBER)
+        channel.state = ChannelState.OPEN
+        channel.confirmed = True
+        self.channel_manager.state.add_channel(channel)
+        self.channel_manager.blockchain.is_connected.set()
+        self.paywall = Paywall(self.channel_manager, sessions=True)
+
+    def tearDown(self):
+        self.channel_manager.stop()
+        self.node.stop()
+
+    def call(self, balance=None, session=False, ticket=None):
+        environ = {}
+        if balance is not None:
+            signature = sign_balance_proof(SENDER_KEY, RECEIVER, OPEN_BLOCK_NUMBER, balance,
+                                           self.contract.address)
+            environ.update({
+                'HTTP_RDN_BALANCE': str(balance),
+                'HTTP_RDN_OPEN_BLOCK': str(OPEN_BLOCK_NUMBER),
+                'HTTP_RDN_SENDER_ADDRESS': SENDER,
+                'HTTP_RDN_BALANCE_SIGNATURE': encode_hex(signature)
+            })
+        if session:
+            environ['HTTP_RDN_SESSION'] = '1'
+        if ticket is not None:
+            environ['HTTP_RDN_SESSION_TICKET'] = ticket
+        return self.paywall.access(PRICE, EnvironHeaders(environ))
+
+    @property
+    def balance(self):
+        return self.channel_manager.channels[SENDER, OPEN_BLOCK_NUMBER].balance
+
+    def test_session_ticket_spends_credit(self):
+        ret, code, headers = self.call(50, session=True)
+        assert code == 200
+        assert headers[HTTPHeaders.CREDIT] == 40
+        ticket = headers[HTTPHeaders.SESSION_TICKET]
+        for credit in (30, 20, 10, 0):
+            ret, code, headers = self.call(ticket=ticket)
+            assert code == 200
+            assert headers[HTTPHeaders.CREDIT] == credit
+            ticket = headers[HTTPHeaders.SESSION_TICKET]
+
+        # out of credit, the next call needs a balance proof
+        ret, code, headers = self.call(ticket=ticket)
+        assert code == 402
+        assert ret == 'Insufficient credit'
+        assert headers[HTTPHeaders.CREDIT] == 0
+        assert HTTPHeaders.SESSION_TICKET not in headers
+        assert self.balance == 50
+
+    def test_used_ticket_is_refused(self):
+        ret, code, headers = self.call(50, session=True)
+        ticket = headers[HTTPHeaders.SESSION_TICKET]
+        assert self.call(ticket=ticket)[1] == 200
+        ret, code, headers = self.call(ticket=ticket)
+        assert code == 402
+        assert ret == 'Invalid session ticket'
+
+    def test_final_proof_settles_session(self):
+        ret, code, headers = self.call(50, session=True)
+        ret, code, headers = self.call(ticket=headers[HTTPHeaders.SESSION_TICKET])
+        ticket = headers[HTTPHeaders.SESSION_TICKET]
+        # two calls consumed 20, the final proof pays 10 for its own call
+        ret, code, headers = self.call(30)
+        assert code == 200
+        assert self.balance == 30
+        assert len(self.paywall.paid_sessions) == 0
+        assert self.call(ticket=ticket)[1] == 402
+
+    def test_proof_above_session_keeps_credit(self):
+        self.call(50, session=True)
+        ret, code, headers = self.call(60)
+        assert code == 200
+        assert headers[HTTPHeaders.CREDIT] == 40
+        ret, code, headers = self.call(ticket=headers[HTTPHeaders.SESSION_TICKET])
+        assert code == 200
+        assert headers[HTTPHeaders.CREDIT] == 30
+        # the proof of the consumed balance, 30, and the price of its call
+        assert self.call(40)[1] == 200
+        assert self.balance == 40
+
+    def test_replayed_proof_is_refused(self):
+        ret, code, headers = self.call(50, session=True)
+        ticket = headers[HTTPHeaders.SESSION_TICKET]
+        for session in (True, False):
+            ret, code, headers = self.call(50, session=session)
+            assert code == 402
+            assert ret == 'Invalid Balance Amount'
+            assert HTTPHeaders.SESSION_TICKET not in headers
+        # the session of the sender is untouched
+        assert self.call(ticket=ticket)[1] == 200
+        assert self.paywall.paid_sessions.get(SENDER, OPEN_BLOCK_NUMBER).credit == 30
+
+    def test_replayed_proof_of_last_call_is_refused(self):
+        ret, code, headers = self.call(20, session=True)
+        assert headers[HTTPHeaders.CREDIT] == 10
+        ret, code, headers = self.call(20)
+        assert code == 402
+        assert self.paywall.paid_sessions.get(SENDER, OPEN_BLOCK_NUMBER).credit == 10
+        assert self.call(10)[1] == 402
+
+    def test_ticket_of_closed_channel_is_refused(self):
+        ret, code, headers = self.call(50, session=True)
+        self.channel_manager.state.set_channel_state(SENDER, OPEN_BLOCK_NUMBER,
+                                                     ChannelState.CLOSE_PENDING)
+        ret, code, headers = self.call(ticket=headers[HTTPHeaders.SESSION_TICKET])
+        assert code == 402
+        assert ret == 'Channel does not exist'
+        assert len(self.paywall.paid_sessions) == 0
+
+    def test_sessions_are_opt_in(self):
+        self.paywall.sessions = False
+        ret, code, headers = self.call(50, session=True)
+        assert code == 402
+        assert ret == 'Invalid ammount'
+        assert self.call(10)[1] == 200
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import gevent
+from web3 import Web3, HTTPProvider
+
+from dbot.service import DBotService
+from microraiden.config import NETWORK_CFG
+from microraiden.channel_manager import ChainWatcher, ChannelStateStore
+from microraiden.channel_manager.store import SharedChannelManagerState
+from microraiden.exceptions import SharedStateFile
+from microraiden.make_helpers import make_channel_manager_contract
+from microraiden.utils import privkey_to_addr
+from jsonrpc_node import JSONRPCNode
+
+PRIVATE_KEY = '0x' + '5a' * 32
+RECEIVER = privkey_to_addr(PRIVATE_KEY)
+DBOT_DATA = {
+    'info': {
+        'name': 'test',
+        'domain': 'test',
+        'addr': RECEIVER,
+        'api_host': 'http://127.0.0.1',
+        'protocol': 'http'
+    },
+    'endpoints': []
+}
+
+
+class DBotServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.node = JSONRPCNode()
+        self.node.start()
+        self.node.mine(10)
+        self.web3 = Web3(HTTPProvider(self.node.http_uri))
+        self.store = ChannelStateStore(os.path.join(self.tmpdir, 'channels.db'))
+        self.watcher = ChainWatcher(
+            self.web3,
+            make_channel_manager_contract(self.web3, NETWORK_CFG.channel_manager_address)
+        )
+
+    def tearDown(self):
+        self.store.close()
+        self.node.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def add_dbot(self):
+        service = DBotService(PRIVATE_KEY, self.web3, None, DBOT_DATA,
+                              state_store=self.store, chain_watcher=self.watcher)
+        service.start()
+        with gevent.Timeout(5):
+            while RECEIVER not in self.watcher.subscribers:
+                gevent.sleep(0.01)
+        return service
+
+    def test_add_remove_add(self):
+        service = self.add_dbot()
+        service.stop()
+        assert RECEIVER not in self.watcher.subscribers
+        assert RECEIVER not in self.store.states
+
+        # the state of the removed dbot is released and synced up to the last block
+        service = self.add_dbot()
+        assert self.watcher.subscribers[RECEIVER] is service.channel_manager.blockchain
+        assert service.channel_manager.state.unconfirmed_head_number == 10
+        service.stop()
+        assert not self.watcher.subscribers
+
+    def test_close_store(self):
+        service = self.add_dbot()
+        service.stop()
+        filename = self.store.filename
+        self.store.close()
+
+        # the lock of the database is released with it
+        self.store = ChannelStateStore(filename)
+        assert self.store.has_state(RECEIVER)
+        with self.assertRaises(SharedStateFile):
+            SharedChannelManagerState.load(filename)
+
+    def test_watcher_survives_errors(self):
+        updates = []
+
+        def update(latest=None):
+            updates.append(latest)
+            if len(updates) == 1:
+                raise ValueError('unexpected JSON-RPC error')
+
+        self.watcher.poll_interval = 0.01
+        with mock.patch.object(self.watcher, '_update', side_effect=update):
+            self.watcher.start()
+            with gevent.Timeout(5):
+                while len(updates) < 3:
+                    gevent.sleep(0.01)
+            assert not self.watcher.dead
+            self.watcher.stop()
+            self.watcher.join()
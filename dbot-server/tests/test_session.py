@@ -0,0 +1,52 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import unittest
+
+from web3 import Web3
+
+from dbot.session import PaidSessions
+
+SENDER = Web3.toChecksumAddress('0x' + '33' * 20)
+
+
+class PaidSessionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.sessions = PaidSessions(60)
+
+    def test_tickets_are_single_use(self):
+        ticket = self.sessions.open(SENDER, 5, 20, 50)
+        assert self.sessions.check(ticket) == (SENDER, 5)
+        next_ticket = self.sessions.spend(SENDER, 5, 10)
+        assert self.sessions.check(ticket) is None
+        assert self.sessions.check(next_ticket) == (SENDER, 5)
+        assert self.sessions.get(SENDER, 5).credit == 20
+
+    def test_credit_is_spent(self):
+        self.sessions.open(SENDER, 5, 20, 40)
+        assert self.sessions.spend(SENDER, 5, 10) is not None
+        assert self.sessions.spend(SENDER, 5, 20) is None
+        assert self.sessions.spend(SENDER, 5, 10) is not None
+        assert self.sessions.get(SENDER, 5).credit == 0
+        assert self.sessions.get(SENDER, 5).consumed == 40
+
+    def test_tickets_end_with_their_session(self):
+        ticket = self.sessions.open(SENDER, 5, 20, 50)
+        self.sessions.open(SENDER, 5, 50, 80)
+        assert self.sessions.check(ticket) is None
+        ticket = self.sessions.spend(SENDER, 5, 10)
+        session = self.sessions.settle(SENDER, 5)
+        assert session.consumed == 60
+        assert self.sessions.check(ticket) is None
+        assert len(self.sessions) == 0
+
+    def test_forged_tickets_are_refused(self):
+        ticket = self.sessions.open(SENDER, 5, 20, 50)
+        payload, _, mac = ticket.rpartition(':')
+        assert self.sessions.check(payload.replace(':5:', ':6:') + ':' + mac) is None
+        assert self.sessions.check(PaidSessions(60).open(SENDER, 5, 20, 50)) is None
+        assert self.sessions.check('') is None
+
+    def test_expired_tickets_are_refused(self):
+        sessions = PaidSessions(-1)
+        assert sessions.check(sessions.open(SENDER, 5, 20, 50)) is None
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import unittest
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from microraiden.channel_manager import (
+    ChannelManagerState,
+    Channel,
+    ChannelState,
+    export_snapshot,
+    read_snapshot,
+    import_snapshot
+)
+from microraiden.exceptions import InvalidStateSnapshot
+
+RECEIVER = Web3.toChecksumAddress('0x' + '11' * 20)
+CONTRACT = Web3.toChecksumAddress('0x' + '22' * 20)
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.state = self.new_state('source.db')
+        for i in range(1, 11):
+            channel = Channel(RECEIVER, Web3.toChecksumAddress('0x%040x' % i), 10 ** 18, 100 + i)
+            channel.balance = i
+            channel.state = ChannelState.OPEN
+            channel.last_signature = '0x' + 'ab' * 65
+            channel.confirmed = i <= 8
+            self.state.add_channel(channel)
+        self.state.update_sync_state(
+            confirmed_head_number=200,
+            confirmed_head_hash=HexBytes(b'\x01' * 32),
+            unconfirmed_head_number=205,
+            unconfirmed_head_hash=HexBytes(b'\x02' * 32)
+        )
+        self.filename = os.path.join(self.tmpdir, 'snapshot.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def new_state(self, name, receiver=RECEIVER):
+        state = ChannelManagerState(os.path.join(self.tmpdir, name))
+        state.setup_db(1, CONTRACT, receiver)
+        return state
+
+    def test_round_trip(self):
+        export_snapshot(self.state, self.filename)
+        state = self.new_state('restored.db')
+        import_snapshot(state, read_snapshot(self.filename))
+        state = ChannelManagerState.load(state.filename)
+        # unconfirmed channels are synced again from the checkpoint
+        assert state.n_channels == 8
+        for key, channel in self.state.channels.items():
+            assert state.channels[key].to_dict() == channel.to_dict()
+        assert state.confirmed_head_number == state.unconfirmed_head_number == 200
+        assert HexBytes(state.unconfirmed_head_hash) == HexBytes(b'\x01' * 32)
+
+    def test_tampered_snapshot(self):
+        export_snapshot(self.state, self.filename)
+        with gzip.open(self.filename) as fh:
+            snapshot = json.loads(fh.read().decode())
+        snapshot['body']['channels'][0][3] = '0'
+        with gzip.open(self.filename, 'wb') as fh:
+            fh.write(json.dumps(snapshot).encode())
+        with self.assertRaises(InvalidStateSnapshot):
+            read_snapshot(self.filename)
+
+    def test_other_receiver(self):
+        export_snapshot(self.state, self.filename)
+        state = self.new_state('other.db', Web3.toChecksumAddress('0x' + '33' * 20))
+        with self.assertRaises(InvalidStateSnapshot):
+            import_snapshot(state, read_snapshot(self.filename))
+        # channels of a state are never overwritten
+        with self.assertRaises(InvalidStateSnapshot):
+            import_snapshot(self.state, read_snapshot(self.filename))
@@ -0,0 +1,82 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import sqlite3
+import unittest
+from unittest import mock
+
+from web3 import Web3
+
+from microraiden.channel_manager import ChannelManagerState, Channel, ChannelState
+
+RECEIVER = Web3.toChecksumAddress('0x' + '11' * 20)
+SENDER = Web3.toChecksumAddress('0x' + '33' * 20)
+CONTRACT = Web3.toChecksumAddress('0x' + '22' * 20)
+SIGNATURE = '0x' + 'ab' * 65
+
+
+class CompareAndSetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.state = ChannelManagerState(':memory:')
+        self.state.setup_db(1, CONTRACT, RECEIVER)
+        channel = Channel(RECEIVER, SENDER, 100, 5)
+        channel.state = ChannelState.OPEN
+        channel.confirmed = True
+        channel.balance = 10
+        channel.last_signature = SIGNATURE
+        self.state.add_channel(channel)
+
+    def test_compare_and_set(self):
+        assert self.state.compare_and_set_balance(SENDER, 5, 20, 30, SIGNATURE) is None
+        channel = self.state.compare_and_set_balance(SENDER, 5, 10, 30, '0x' + 'cd' * 65)
+        assert channel.balance == 30
+        assert self.state.get_channel(SENDER, 5).balance == 30
+        assert int(self.state._execute('select_channels').fetchone()['balance']) == 30
+
+    def test_failed_write_keeps_balance(self):
+        channel = self.state.get_channel(SENDER, 5)
+        mtime = channel.mtime
+        with mock.patch.object(self.state, '_write_balance',
+                               side_effect=sqlite3.OperationalError('disk I/O error')):
+            with self.assertRaises(sqlite3.OperationalError):
+                self.state.compare_and_set_balance(SENDER, 5, 10, 30, '0x' + 'cd' * 65)
+        channel = self.state.get_channel(SENDER, 5)
+        assert channel.balance == 10
+        assert channel.last_signature == SIGNATURE
+        assert channel.mtime == mtime
+        # the balance of the failed write doesn't block the next payment
+        assert self.state.compare_and_set_balance(SENDER, 5, 10, 20, SIGNATURE) is not None
+
+
+class ChannelListingTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.state = ChannelManagerState(':memory:')
+        self.state.setup_db(1, CONTRACT, RECEIVER)
+        for i in range(1, 6):
+            channel = Channel(RECEIVER, Web3.toChecksumAddress('0x%040x' % (i % 3)), 100, i)
+            channel.state = ChannelState.OPEN if i % 2 else ChannelState.CLOSED
+            channel.confirmed = True
+            self.state.add_channel(channel)
+
+    def test_pages(self):
+        keys = [(c.sender, c.open_block_number) for c in self.state.query_channels()]
+        assert keys == sorted(keys)
+        pages = []
+        after = None
+        while True:
+            page = self.state.query_channels(after=after, limit=2)
+            if not page:
+                break
+            pages.extend((c.sender, c.open_block_number) for c in page)
+            after = pages[-1]
+        assert pages == keys
+
+    def test_listing_uses_index_order(self):
+        for states in ('', ' AND `state` = %d' % ChannelState.OPEN.value):
+            sql = (self.state.sql['query_channels'] + states +
+                   ' AND (`sender`, `open_block_number`) > (:after_sender, :after_block)'
+                   ' ORDER BY `sender`, `open_block_number` LIMIT 10')
+            plan = self.state.conn.execute('EXPLAIN QUERY PLAN ' + sql, {
+                'confirmed': True, 'after_sender': SENDER, 'after_block': 0}).fetchall()
+            assert 'TEMP B-TREE' not in ' '.join(row['detail'] for row in plan)
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from microraiden.channel_manager import ChannelManagerState
+from microraiden.channel_manager.blockchain import Blockchain
+from microraiden.channel_manager.headers import Header
+
+RECEIVER = Web3.toChecksumAddress('0x' + '11' * 20)
+CONTRACT = Web3.toChecksumAddress('0x' + '22' * 20)
+
+
+def block_hash(number):
+    return HexBytes(number.to_bytes(32, 'big'))
+
+
+class Headers(object):
+    """Headers of a chain that is never reorganized."""
+
+    def header(self, number):
+        return Header(number, block_hash(number), block_hash(number - 1))
+
+    def is_canonical(self, number, hash):
+        return hash == block_hash(number)
+
+
+class Manager(object):
+    """Records the channel events applied by `Blockchain`."""
+
+    def __init__(self, state):
+        self.state = state
+        self.receiver = state.receiver
+        self.channels = dict()
+        self.opened = []
+        self.unconfirmed_opened = []
+        self.topups = []
+        self.closed = []
+        self.close_error = None
+
+    def event_channel_opened(self, sender, open_block_number, deposit):
+        self.opened.append(open_block_number)
+
+    def unconfirmed_event_channel_opened(self, sender, open_block_number, deposit):
+        self.unconfirmed_opened.append(open_block_number)
+
+    def event_channel_topup(self, sender, open_block_number, txhash, added_deposit):
+        self.topups.append(txhash)
+
+    def unconfirmed_event_channel_topup(self, sender, open_block_number, txhash, added_deposit):
+        pass
+
+    def event_channel_close_requested(self, sender, open_block_number, balance, timeout):
+        # every close request is disputed
+        return True
+
+    def close_channel(self, sender, open_block_number):
+        # the transaction of the channel is sent with the state unlocked
+        self.closed.append((open_block_number, self.state._transaction_depth,
+                            self.state.confirmed_head_number))
+        if self.close_error is not None:
+            raise self.close_error
+
+    def set_head(self, unconfirmed_head_number, unconfirmed_head_hash,
+                 confirmed_head_number, confirmed_head_hash):
+        self.state.update_sync_state(unconfirmed_head_number=unconfirmed_head_number,
+                                     unconfirmed_head_hash=unconfirmed_head_hash,
+                                     confirmed_head_number=confirmed_head_number,
+                                     confirmed_head_hash=confirmed_head_hash)
+
+
+class ChannelInfos(dict):
+    """Channel infos with a settle timeout of 10 blocks for every channel."""
+
+    def get_many(self, close_requests, current_block):
+        return self
+
+    def __missing__(self, key):
+        return (0, 0, 10)
+
+
+class ChunkedBlockchain(Blockchain):
+    """Blockchain whose sync fetches the ranges from a list of logs."""
+
+    def __init__(self, manager, logs, n_confirmations, sync_chunk_size):
+        Blockchain.__init__(self, None, None, manager, n_confirmations, sync_chunk_size)
+        self.logs = logs
+        self.headers = Headers()
+        self.sync_start_block = 100
+        self.channel_info = ChannelInfos()
+        self.running = True
+
+    def _fetch_range(self, from_block, to_block):
+        return [log for log in self.logs if from_block <= log['blockNumber'] <= to_block]
+
+
+def make_log(event, number, sender, **args):
+    args.update({'_sender_address': sender, '_receiver_address': RECEIVER})
+    return {
+        'event': event,
+        'blockNumber': number,
+        'blockHash': block_hash(number),
+        'transactionHash': block_hash(number),
+        'args': args
+    }
+
+
+class SyncTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.state = ChannelManagerState(os.path.join(self.tmpdir, 'state.db'))
+        self.state.setup_db(1, CONTRACT, RECEIVER)
+        self.manager = Manager(self.state)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def sync(self, logs, n_confirmations, sync_chunk_size, current_block):
+        blockchain = ChunkedBlockchain(self.manager, logs, n_confirmations, sync_chunk_size)
+        blockchain._sync(current_block)
+        return blockchain
+
+    def test_chunk_boundaries(self):
+        sender = Web3.toChecksumAddress('0x' + '33' * 20)
+        blocks = [101, 108, 109, 110, 111, 118, 120, 121, 129, 130, 131, 138, 140]
+        logs = [make_log('ChannelCreated', number, sender, _deposit=1) for number in blocks]
+        logs += [make_log('ChannelToppedUp', number, sender, _open_block_number=101,
+                          _added_deposit=1) for number in (110, 120, 130)]
+        blockchain = self.sync(logs, 3, 10, 145)
+
+        assert self.state.confirmed_head_number == 142
+        assert self.state.unconfirmed_head_number == 145
+        assert blockchain.wait_sync_event.is_set()
+        assert self.manager.opened == blocks
+        assert self.manager.topups == [block_hash(number) for number in (110, 120, 130)]
+        assert self.manager.unconfirmed_opened == blocks
+
+    def test_chunks_shorter_than_confirmations(self):
+        sender = Web3.toChecksumAddress('0x' + '33' * 20)
+        blocks = list(range(101, 131, 3))
+        logs = [make_log('ChannelCreated', number, sender, _deposit=1) for number in blocks]
+        self.sync(logs, 5, 4, 140)
+
+        assert self.state.confirmed_head_number == 135
+        assert self.manager.opened == blocks
+
+    def test_dispute_after_commit(self):
+        sender = Web3.toChecksumAddress('0x' + '33' * 20)
+        self.manager.channels[sender, 101] = None
+        self.manager.close_error = ValueError('nonce too low')
+        logs = [make_log('ChannelCloseRequested', 105, sender, _open_block_number=101,
+                         _balance=1)]
+        self.sync(logs, 3, 10, 120)
+
+        # the failed close doesn't undo the events of its update
+        assert self.manager.closed == [(101, 0, 107)]
+        assert self.state.confirmed_head_number == 117